@@ -1,10 +1,16 @@
 # GPL # (c) 2024 Diogenes Grigonio
 # mesh operator
 
-import bpy, bmesh, random, mathutils
+import bpy, bmesh, mathutils
+import numpy as np
+from . import mesh_arrays
+from .bmesh_ops import bulk_insert, link_instances, facade_frames
+from .bmesh_ops import lod_resolution, append_polys, generated_object
+from .instrument import stage
+from .chunked import ChunkedOperator, chunks
 
 
-class BASIC_OT_bmeshCreateVertical(bpy.types.Operator):
+class BASIC_OT_bmeshCreateVertical(ChunkedOperator, bpy.types.Operator):
     """Create an object for each Vertical Face 
     using Matrices and applying Rotation Control 
     in Z Local Axis"""
@@ -46,124 +52,179 @@ class BASIC_OT_bmeshCreateVertical(bpy.types.Operator):
             ),
             default = "CENTER")
 
+    output = bpy.props.EnumProperty(
+            name="Output:",
+            items = (
+            ("MESH", "Mesh", ""),
+            ("INSTANCE", "Instances", ""),
+            ("OBJECT", "Generated Object", ""),
+            ),
+            default = "MESH")
+
+    lod = bpy.props.EnumProperty(
+            name="LOD:",
+            items = (
+            ("NONE", "None", ""),
+            ("CAMERA", "Camera", ""),
+            ("POINT", "Point", ""),
+            ),
+            default = "NONE")
+
+    lod_point = bpy.props.FloatVectorProperty(
+            name="LOD Point:",
+            default=(0.0, 0.0, 0.0),
+            size=3,
+            subtype='TRANSLATION')
+
+    lod_bands = bpy.props.FloatVectorProperty(
+            name="LOD Bands:",
+            default=(25.0, 75.0, 200.0),
+            min=0.0,
+            size=3)
+
+    chunked = bpy.props.BoolProperty(
+            name="Run in Chunks",
+            default=False)
+
+    chunk = bpy.props.IntProperty(
+            name="Chunk Size:",
+            default=1000,
+            min=1)
+
+    partial = bpy.props.BoolProperty(
+            name="Partial Update",
+            default=False)
+
     @classmethod
     def poll(cls, context):
         ob = context.active_object
         return ob and ob.type == 'MESH' and context.mode == 'OBJECT'
     
     def execute(self, context):
+        with stage("CreateNew"):
+            return self.run_steps(context)
+
+    def steps(self, context, ChunkSize):
         #variables
         FacePoint = self.point
         OffSet = self.off_set
         VertScale = self.scale
         Rotate = self.rotate
-        VertMesh = []
-
-        #BMesh Start
-        BMesh = bmesh.new()
-        BMesh.from_mesh(context.object.data)
-
-        #Get Faces
-        FaceToMesh = [f for f in BMesh.faces if len(f.verts)==4]
-
-        #Loop over the Faces
-        for Face in FaceToMesh:
-            NormalX = Face.normal[0]
-            NormalY = Face.normal[1]
-            VertGroup = [vert.co for vert in Face.verts]
-            MinZ = min([vert[2] for vert in VertGroup])
-            SizeZ = max([vert[2] for vert in VertGroup]) - MinZ
-            VertLow = [v for v in Face.verts if v.co[2]==MinZ]
-            SizeSide = VertLow[1].co - VertLow[0].co
-            VertXMax = VertLow[0].co[0]
-            VertXMin = VertLow[1].co[0]
-            
-            if round(SizeSide[1], 3)>=0:
-                VertYMax = min([VertLow[0].co[1], VertLow[1].co[1]])
-                VertYMin = max([VertLow[0].co[1], VertLow[1].co[1]])
-            else:
-                VertYMax = max([VertLow[0].co[1], VertLow[1].co[1]])
-                VertYMin = min([VertLow[0].co[1], VertLow[1].co[1]])
-
-            VertZLow = VertLow[0].co[2]
-            VertZUp = VertLow[0].co[2]+SizeZ
-            
-            #coordenadas para Point0 - 'Point0Co'
-            if FacePoint == 'XZ':
-                VertX = VertXMax+NormalX*OffSet
-                VertY = VertYMax+NormalY*OffSet
-                VertZ = VertZUp
-            elif FacePoint == 'X-Z':
-                VertX = VertXMax+NormalX*OffSet
-                VertY = VertYMax+NormalY*OffSet
-                VertZ = VertZLow
-            elif FacePoint == '-XZ':
-                VertX = VertXMin+NormalX*OffSet
-                VertY = VertYMin+NormalY*OffSet
-                VertZ = VertZUp
-            elif FacePoint == '-X-Z':
-                VertX = VertXMin+NormalX*OffSet
-                VertY = VertYMin+NormalY*OffSet
-                VertZ = VertZLow
-            elif FacePoint == 'CENTER':
-                VertX = (VertXMin-SizeSide[0]/2)+NormalX*OffSet
-                VertY = (VertYMin-SizeSide[1]/2)+NormalY*OffSet
-                VertZ = VertZLow+SizeZ/2
-            elif FacePoint == 'CENTERZ':
-                VertX = (VertXMin-SizeSide[0]/2)+NormalX*OffSet
-                VertY = (VertYMin-SizeSide[1]/2)+NormalY*OffSet
-                VertZ = VertZUp
-            elif FacePoint == 'CENTER-Z':
-                VertX = (VertXMin-SizeSide[0]/2)+NormalX*OffSet
-                VertY = (VertYMin-SizeSide[1]/2)+NormalY*OffSet
-                VertZ = VertZLow
-
-            Point0Co = (VertX, VertY, VertZ)
-
-            #Matrix Location
-            MatrixLocation = mathutils.Matrix.Translation(Point0Co)
-
-            #Matrix Scale
-            MatrixScaleX = mathutils.Matrix.Scale(VertScale[0], 4, (1, 0, 0))
-            MatrixScaleY = mathutils.Matrix.Scale(VertScale[1], 4, (0, 1, 0))
-            MatrixScaleZ = mathutils.Matrix.Scale(VertScale[2], 4, (0, 0, 1))
-            MatrixScale = MatrixScaleX*MatrixScaleY*MatrixScaleZ
-
-            #Matrix Rotation
-            RotationZ = mathutils.Euler((0, 0, Rotate), 'XYZ').to_quaternion()
-            RotationZ = RotationZ.to_matrix().to_4x4()
-            NormalOut = Face.normal
-            FaceRot = NormalOut.to_track_quat('-Z', 'Y')
-            FaceRot = FaceRot.to_matrix().to_4x4()
-            MatrixRotation = FaceRot*RotationZ
-
-            #Matrices
-            Matrix = MatrixLocation*MatrixRotation*MatrixScale
-            ObjectMatrix = context.object.matrix_basis
-
-            #Create and Transform by Matrix
-            ret = bmesh.ops.create_cone(
-                                BMesh,
-                                cap_ends=False,
-                                cap_tris=True,
-                                segments=self.resolution,
-                                diameter1=0.01,
-                                diameter2=0.7,
-                                depth=0.5,
-                                matrix=ObjectMatrix)
-
-            bmesh.ops.transform(
-                                BMesh, 
-                                matrix=Matrix, 
-                                space=ObjectMatrix, 
-                                verts=ret['verts'])
-
-            VertMesh.extend(ret['verts'])
-            del ret
-
-        #BMesh End
-        BMesh.to_mesh(context.object.data)
-        BMesh.free()
-        context.object.data.update()
 
-        return {"FINISHED"}
+        #Get Faces, quads with a flat base
+        Stages = self.sequence("CreateNew")
+        Stages.next("frames")
+        Frames = facade_frames(context.object.data)
+        Frames = Frames[Frames['quad'] & (Frames['lows']>=2)]
+        Normals = Frames['normal']
+        Low = Frames['low']
+        SizeSide = Frames['side']
+        SizeZ = Frames['size_z']
+        VertZLow = Low[:, 0, 2]
+        VertZUp = VertZLow+SizeZ
+
+        #coordenadas para Point0 - 'Point0Co'
+        if FacePoint in ('XZ', 'X-Z'):
+            VertX = Low[:, 0, 0]
+            VertY = Frames['y_max']
+        elif FacePoint in ('-XZ', '-X-Z'):
+            VertX = Low[:, 1, 0]
+            VertY = Frames['y_min']
+        else:
+            VertX = Low[:, 1, 0]-SizeSide[:, 0]/2
+            VertY = Frames['y_min']-SizeSide[:, 1]/2
+        if FacePoint in ('XZ', '-XZ', 'CENTERZ'):
+            VertZ = VertZUp
+        elif FacePoint == 'CENTER':
+            VertZ = VertZLow+SizeZ/2
+        else:
+            VertZ = VertZLow
+        Points = np.stack([VertX+Normals[:, 0]*OffSet,
+                           VertY+Normals[:, 1]*OffSet,
+                           VertZ], axis=1)
+
+        #Matrix Scale
+        Stages.next("matrices")
+        MatrixScaleX = mathutils.Matrix.Scale(VertScale[0], 4, (1, 0, 0))
+        MatrixScaleY = mathutils.Matrix.Scale(VertScale[1], 4, (0, 1, 0))
+        MatrixScaleZ = mathutils.Matrix.Scale(VertScale[2], 4, (0, 0, 1))
+        MatrixScale = MatrixScaleX*MatrixScaleY*MatrixScaleZ
+
+        #Matrix Rotation Z
+        RotationZ = mathutils.Euler((0, 0, Rotate), 'XYZ').to_quaternion()
+        RotationZ = RotationZ.to_matrix().to_4x4()
+
+        #Matrices, Location*FaceRot*RotationZ*Scale for every face
+        ObjectMatrix = np.array(context.object.matrix_basis)
+        Local = np.array(RotationZ*MatrixScale)
+        Matrices = np.matmul(mesh_arrays.translation_matrices(Points),
+                             mesh_arrays.track_matrices(Normals))
+        Matrices = np.matmul(Matrices, Local)
+
+        #Cone built once, create_cone(matrix=ObjectMatrix) and
+        #transform(space=ObjectMatrix) of the old loop folded in
+        Matrices = np.matmul(np.linalg.inv(ObjectMatrix), Matrices)
+        Matrices = np.matmul(Matrices, np.matmul(ObjectMatrix, ObjectMatrix))
+
+        #one cone per resolution, the cones of every face at its distance
+        Resolutions = lod_resolution(context, Points, self.resolution,
+                                     self.lod, self.lod_point, self.lod_bands)
+        Groups = []
+        for Resolution in sorted(set(Resolutions.tolist()), reverse=True):
+            Coords, Polys = mesh_arrays.cone(Resolution, 0.01, 0.7, 0.5)
+            Groups.append((Resolution, Coords, Polys,
+                           Matrices[Resolutions==Resolution]))
+        yield 0.1
+
+        Stages.next("output")
+        if self.output == 'INSTANCE':
+            for Resolution, Coords, Polys, Group in Groups:
+                Name = context.object.name+"_Cone"
+                if Resolution!=self.resolution:
+                    Name += "_{}".format(Resolution)
+                link_instances(context, Name, Coords, Polys, Group)
+            Stages.close()
+            return
+
+        #BMesh Start - Partial Update and the generated object leave the
+        #mesh as it is, the cones are only appended to mesh arrays at the end
+        Arrays = self.partial or self.output == 'OBJECT'
+        if not Arrays:
+            BMesh = bmesh.new()
+            BMesh.from_mesh(context.object.data)
+            Stages.BMesh = BMesh
+        yield 0.2
+
+        #one cone per matrix, a chunk of matrices at a time
+        Added, Base = [], 0
+        Start = 0.2
+        for Resolution, Coords, Polys, Group in Groups:
+            End = Start+0.7*len(Group)/len(Matrices)
+            for Chunk, Done in chunks(Group, ChunkSize, Start, End):
+                Offsets = len(Coords)*np.arange(len(Chunk))
+                ChunkPolys = Polys+Offsets[:, None, None]
+                ChunkCoords = mesh_arrays.transform_points(Chunk, Coords)
+                ChunkCoords = ChunkCoords.reshape(-1, 3)
+                if Arrays:
+                    Added.append((ChunkCoords, ChunkPolys.reshape(-1, 4)+Base))
+                    Base += len(ChunkCoords)
+                else:
+                    bulk_insert(BMesh, ChunkCoords, ChunkPolys.reshape(-1, 4))
+                yield Done
+            Start = End
+
+        #BMesh End, into the object or a new mesh of the generated object
+        if Arrays:
+            Mesh = context.object.data
+            if self.output == 'OBJECT':
+                Name = context.object.name+"_Cones"
+                Mesh = generated_object(context, Name).data
+            if Added:
+                append_polys(Mesh,
+                             np.concatenate([a[0] for a in Added]),
+                             np.concatenate([a[1] for a in Added]))
+        else:
+            BMesh.to_mesh(context.object.data)
+            BMesh.free()
+        context.object.data.update()
+        Stages.close()
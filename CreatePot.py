@@ -1,11 +1,22 @@
 # GPL # (c) 2024 Diogenes Grigonio
 # mesh operator
 
-import bpy, bmesh
+import bpy, bmesh, math
+import numpy as np
+from . import mesh_arrays, rng
+from .bmesh_ops import mesh_from_arrays, mesh_key, StageCache
+from .instrument import stage
+
+#number and name of the last 'Pot_NN' given, see pot_name
+_NAMES = {}
+
+#pot meshes by shape, shared by every pot of the same parameters
+MESHES = StageCache(64)
 
 
 class BASIC_OT_bmeshCreatePot(bpy.types.Operator):
-    """Create Pot"""
+    """Create Pot, or a batch of them in a grid, pots of the same shape
+    share one mesh"""
     bl_idname = "basic.create_pot"
     bl_label = "Create Pot"
     bl_options = {"REGISTER", "UNDO"}
@@ -36,22 +47,118 @@ class BASIC_OT_bmeshCreatePot(bpy.types.Operator):
             min=3, 
             max=24)
 
+    bake = bpy.props.BoolProperty(
+            name="Bake Modifiers",
+            default=False)
+
+    levels = bpy.props.IntProperty(
+            name="Subdivision:",
+            default=2,
+            min=0,
+            max=4)
+
+    adaptive = bpy.props.BoolProperty(
+            name="Adaptive Resolution",
+            default=False)
+
+    tolerance = bpy.props.FloatProperty(
+            name="Tolerance:",
+            default=0.002,
+            min=0.0001,
+            subtype='DISTANCE')
+
+    count = bpy.props.IntProperty(
+            name="Count:",
+            default=1,
+            min=1,
+            max=1000)
+
+    spacing = bpy.props.FloatProperty(
+            name="Spacing:",
+            default=1.5,
+            min=0.0,
+            subtype='DISTANCE')
+
+    jitter = bpy.props.IntProperty(
+            name="Jitter:",
+            default=0,
+            min=0,
+            max=50,
+            subtype='PERCENTAGE')
+
+    seed = bpy.props.IntProperty(
+            name="Seed:",
+            default=1,
+            min=1)
+
     @classmethod
     def poll(cls, context):
         return context.mode == 'OBJECT'
     
     def execute(self, context):
+        with stage("CreatePot"):
+            return self.create(context)
+
+    def create(self, context):
+        """Link 'count' pots, in a grid when there is more than one."""
 
         #variables
         data = bpy.data
-        Resolution = self.resolution
-        VertBaseCo = (self.base_width, 0.0, 0.0)
-        VertTopCo = (self.top_width, 0.0, self.size)
-        VertShapeCo = (self.shape_width, 0.0, self.shape_height)
+        Count = self.count
+        Side = math.ceil(math.sqrt(Count))
+
+        for Index, Shape in enumerate(self.shapes()):
+            #name
+            Name = pot_name(data)
+
+            #mesh, shared with the pots of the same shape
+            Key = (Shape,)
+            if self.bake:
+                Key += (self.resolution, self.levels, self.adaptive,
+                        self.tolerance)
+            MeshData = shared_mesh(Key)
+            if MeshData is None:
+                if self.bake:
+                    MeshData = self.baked_mesh(Name, Shape)
+                else:
+                    MeshData = self.profile_mesh(Name, Shape)
+                MESHES.put(Key, (MeshData.name, mesh_key(MeshData)))
 
-        #name
-        Copies = [n for n in data.objects if 'Pot' in n.name]
-        Name = "Pot_" + str("{:0>2}".format(len(Copies)+1))
+            #insere o Object na Scene
+            Object = data.objects.new(Name, MeshData)
+            Object.location = (self.spacing*(Index % Side),
+                               self.spacing*(Index // Side), 0.0)
+            context.scene.objects.link(Object)
+
+            #seleciona e deixa o Object ativo
+            context.scene.objects.active = Object
+            Object.select = True
+            if not self.bake:
+                self.add_modifiers(Object)
+
+        return {"FINISHED"}
+
+    def shapes(self):
+        """(size, shape width, shape height, top width, base width) of
+        every pot, each scaled by up to 'jitter' percent, rounded to the
+        millimetre so that pots of the same shape share a mesh."""
+        Shape = np.array([self.size, self.shape_width, self.shape_height,
+                          self.top_width, self.base_width])
+        Shapes = np.tile(Shape, (self.count, 1))
+        if self.jitter:
+            Index = np.repeat(np.arange(self.count), len(Shape))
+            Sub = np.tile(np.arange(len(Shape)), self.count)
+            Jitter = rng.uniform(self.seed, rng.STREAM_POT_JITTER, Index,
+                                 -1.0, 1.0, Sub).reshape(Shapes.shape)
+            Shapes = np.round(Shapes*(1+Jitter*self.jitter/100), 3)
+        return [tuple(Row) for Row in Shapes.tolist()]
+
+    def profile_mesh(self, Name, Shape):
+        """The three vertex profile the modifier stack turns into a pot."""
+        Size, ShapeWidth, ShapeHeight, TopWidth, BaseWidth = Shape
+        VertBaseCo = (BaseWidth, 0.0, 0.0)
+        VertTopCo = (TopWidth, 0.0, Size)
+        VertShapeCo = (ShapeWidth, 0.0, ShapeHeight)
 
         #BMesh Start
         BMesh = bmesh.new()
@@ -73,34 +180,77 @@ class BASIC_OT_bmeshCreatePot(bpy.types.Operator):
         BMesh.edges.new((VertShape,VertBase))
 
         #BMesh end
-        MeshData = data.meshes.new(name=Name)
+        MeshData = bpy.data.meshes.new(name=Name)
         BMesh.to_mesh(MeshData)
         BMesh.free()
+        return MeshData
 
-        #insere o Object na Scene
-        Object = data.objects.new(Name, MeshData)
-        context.scene.objects.link(Object)
-
-        #seleciona e deixa o Object ativo
-        context.scene.objects.active = Object
-        Object.select = True
+    def add_modifiers(self, Object):
+        Resolution = self.resolution
 
         #Create Screw Modifier
-        context.object.modifiers.new('Screw', type='SCREW')
-        context.object.modifiers['Screw'].steps = Resolution
-        context.object.modifiers['Screw'].render_steps = Resolution
+        Object.modifiers.new('Screw', type='SCREW')
+        Object.modifiers['Screw'].steps = Resolution
+        Object.modifiers['Screw'].render_steps = Resolution
 
         #Create Screw Modifier
-        context.object.modifiers.new('Solidify', type='SOLIDIFY')
-        context.object.modifiers['Solidify'].thickness = 0.05
-        context.object.modifiers['Solidify'].edge_crease_outer = 1.0
-        context.object.modifiers['Solidify'].edge_crease_inner = 1.0
-        context.object.modifiers['Solidify'].use_even_offset = True
-        context.object.modifiers['Solidify'].use_quality_normals = True
+        Object.modifiers.new('Solidify', type='SOLIDIFY')
+        Object.modifiers['Solidify'].thickness = 0.05
+        Object.modifiers['Solidify'].edge_crease_outer = 1.0
+        Object.modifiers['Solidify'].edge_crease_inner = 1.0
+        Object.modifiers['Solidify'].use_even_offset = True
+        Object.modifiers['Solidify'].use_quality_normals = True
 
         #Create SubSurface Modifier
-        context.object.modifiers.new('SubSurf', 'SUBSURF')
-        context.object.modifiers['SubSurf'].levels=2
-        context.object.modifiers['SubSurf'].render_levels=3
-        
-        return {"FINISHED"}
+        Object.modifiers.new('SubSurf', 'SUBSURF')
+        Object.modifiers['SubSurf'].levels=2
+        Object.modifiers['SubSurf'].render_levels=3
+
+    def baked_mesh(self, Name, Shape):
+        """The mesh the Screw, Solidify and SubSurf stack would give, built
+        from the profile cross-section: thickened and subdivided in 2D,
+        then turned around Z once."""
+        Size, ShapeWidth, ShapeHeight, TopWidth, BaseWidth = Shape
+        Profile = [(TopWidth, Size), (ShapeWidth, ShapeHeight),
+                   (BaseWidth, 0.0)]
+        Section, Corners = mesh_arrays.pot_section(Profile, 0.05)
+        Levels = self.levels
+        Segments = self.resolution*2**Levels
+        if self.adaptive:
+            Levels = mesh_arrays.section_levels(Section, self.tolerance)
+            Segments = mesh_arrays.ring_segments(Section[:, 0].max(),
+                                                 self.tolerance)
+        Section, Corners = mesh_arrays.subdivide_section(Section, Corners,
+                                                         Levels)
+        #SubSurf pulls the Screw ring in to its limit circle
+        if Levels:
+            Section[:, 0] *= (2+math.cos(2*math.pi/self.resolution))/3
+        Coords, Polys = mesh_arrays.revolve(Section, Segments)
+        return mesh_from_arrays(Name, Coords, Polys, Smooth=True)
+
+
+def pot_name(data):
+    """'Pot_NN' with the first free number. The objects are scanned for
+    'Pot' once, later names go on from a counter, unless the last name
+    given is gone, in another file or deleted."""
+    Last = _NAMES.get('Pot')
+    if Last is None or data.objects.get(Last[1]) is None:
+        Last = (len([n for n in data.objects if 'Pot' in n.name]), None)
+    Number = Last[0]
+    while True:
+        Number += 1
+        Name = "Pot_" + str("{:0>2}".format(Number))
+        if data.objects.get(Name) is None:
+            _NAMES['Pot'] = (Number, Name)
+            return Name
+
+
+def shared_mesh(Key):
+    """The cached mesh of 'Key', unless it was removed or edited since."""
+    Cached = MESHES.get(Key)
+    if Cached is None:
+        return None
+    MeshData = bpy.data.meshes.get(Cached[0])
+    if MeshData is None or mesh_key(MeshData)!=Cached[1]:
+        return None
+    return MeshData
@@ -1,15 +1,41 @@
 # GPL # (c) 2024 Diogenes Grigonio
 # mesh operator
 
-import bpy, bmesh, random, math
-from .bmesh_ops import curtains
+import bpy, bmesh, math
+import numpy as np
+from . import mesh_arrays, rng
+from .bmesh_ops import curtains, sample_split, stage_layer, facade_frames
+from .bmesh_ops import push_faces
+from .bmesh_ops import lod_resolution, curtain_instances, generated_object
+from .bmesh_ops import selected_face_region, region_bmesh, splice_region
+from .bmesh_ops import drop_sources, RegionError
+from .bmesh_ops import StageCache, mesh_key
+from .bmesh_ops import face_stages, material_slots, write_materials
+from .bmesh_ops import poly_verts
+from .bmesh_ops import (STAGE_GLASS, STAGE_BLACKBOX, STAGE_LIGHT,
+                        STAGE_CURTAIN_A, STAGE_CURTAIN_B)
+from .instrument import stage
+from .chunked import ChunkedOperator, chunks
 
+#BlackBox and Light INT results of the last runs, BMesh copies replayed
+#on redo, freed when they leave the cache
+STAGES = StageCache(4, bmesh.types.BMesh.free)
 
-class BASIC_OT_bmeshCreateWindow(bpy.types.Operator):
+
+@bpy.app.handlers.persistent
+def clear_stages(Dummy):
+    """The cached stages belong to the file being closed."""
+    STAGES.clear()
+
+
+class BASIC_OT_bmeshCreateWindow(ChunkedOperator, bpy.types.Operator):
     """Create an object for use in Dirt Calculation"""
     bl_idname = "basic.create_window"
     bl_label = "Create Window"
     bl_options = {"REGISTER", "UNDO"}
+
+    #a selection the partial update cannot load or write back
+    reported = (RegionError,)
     
     amount_light = bpy.props.IntProperty(
             name="Amount Light:",
@@ -45,17 +71,83 @@ class BASIC_OT_bmeshCreateWindow(bpy.types.Operator):
             ),
             default = "BOTH")
 
+    lod = bpy.props.EnumProperty(
+            name="LOD:",
+            items = (
+            ("NONE", "None", ""),
+            ("CAMERA", "Camera", ""),
+            ("POINT", "Point", ""),
+            ),
+            default = "NONE")
+
+    lod_point = bpy.props.FloatVectorProperty(
+            name="LOD Point:",
+            default=(0.0, 0.0, 0.0),
+            size=3,
+            subtype='TRANSLATION')
+
+    lod_bands = bpy.props.FloatVectorProperty(
+            name="LOD Bands:",
+            default=(25.0, 75.0, 200.0),
+            min=0.0,
+            size=3)
+
+    output = bpy.props.EnumProperty(
+            name="Output:",
+            items = (
+            ("MESH", "Mesh", ""),
+            ("OBJECT", "Generated Object", ""),
+            ),
+            default = "MESH")
+
+    curtain_output = bpy.props.EnumProperty(
+            name="Curtains:",
+            items = (
+            ("MESH", "Mesh", ""),
+            ("INSTANCE", "Instances", ""),
+            ),
+            default = "MESH")
+
+    variants = bpy.props.IntProperty(
+            name="Variants:",
+            default=4,
+            min=1,
+            max=64)
+
+    size_step = bpy.props.FloatProperty(
+            name="Size Step:",
+            default=0.05,
+            min=0.001,
+            subtype='DISTANCE')
+
+    legacy = bpy.props.BoolProperty(
+            name="Legacy Random",
+            default=False)
+
+    chunked = bpy.props.BoolProperty(
+            name="Run in Chunks",
+            default=False)
+
+    chunk = bpy.props.IntProperty(
+            name="Chunk Size:",
+            default=1000,
+            min=1)
+
+    partial = bpy.props.BoolProperty(
+            name="Partial Update",
+            default=False)
+
     @classmethod
     def poll(cls, context):
         ob = context.active_object
         return ob and ob.type == 'MESH' and context.mode == 'OBJECT'
     
     def execute(self, context):
-        
-        #BMesh Start
-        BMesh = bmesh.new()
-        BMesh.from_mesh(context.object.data)
+        with stage("CreateWindow"):
+            return self.run_steps(context)
 
+    def steps(self, context, ChunkSize):
+        
         #Variables
         data = bpy.data
         AmountLight = 1 - (self.amount_light/100)
@@ -63,144 +155,220 @@ class BASIC_OT_bmeshCreateWindow(bpy.types.Operator):
         Thick = 0.35
         CurtainResol = self.resolution
         SelfSeed = self.seed
+        Legacy = self.legacy
 
-        #Get Materials
-        GetMat = context.object.data.materials
+        #Get Materials - BlackBox, Light INT shades and Curtains by stage
         Name = context.object.name.split(':')[0]
-        Material = [[Name+":thin_RAY.002_DRV"],["001.non_material.000"],
-                    [Name+":luz_INTERNA.01"], [Name+":luz_INTERNA.02"], 
-                    [Name+":luz_INTERNA.03"], ["001.curtain.000"], ["N6"]]
-        for mat in Material:
-            GetMat.append(data.materials[mat[0]])
+        Material = [Name+":thin_RAY.002_DRV", "001.non_material.000",
+                    Name+":luz_INTERNA.01", Name+":luz_INTERNA.02", 
+                    Name+":luz_INTERNA.03", "001.curtain.000", "N6"]
+
+        #BMesh Start, from the last stage cached for this mesh and settings,
+        #or with Partial Update the selected faces alone, never cached
+        Stages = self.sequence("CreateWindow")
+        Stages.next("from_mesh")
+        Cached = not self.partial
+        #frames of the windows, 'Windows' holds the polygon of every row
+        if self.partial:
+            Region = selected_face_region(context.object.data)
+            Windows = Region['faces']
+            Frames = facade_frames(context.object.data, Windows,
+                                   Region['arrays'])
+        else:
+            Frames = facade_frames(context.object.data)
+            Windows = np.arange(len(Frames))
+        #resolution of every window by its distance, the draws stay the same
+        CurtainResol = lod_resolution(context,
+                                      mesh_arrays.frame_centers(Frames),
+                                      CurtainResol, self.lod, self.lod_point,
+                                      self.lod_bands, Fewest=4)
+        LightDone = BoxDone = None
+        if Cached:
+            MeshKey = mesh_key(context.object.data)
+            BoxKey = ('BLACKBOX', MeshKey)
+            LightKey = ('LIGHT', MeshKey, self.amount_light, SelfSeed, Legacy)
+            LightDone = STAGES.get(LightKey)
+            BoxDone = LightDone or STAGES.get(BoxKey)
+        if BoxDone:
+            BMesh = BoxDone.copy()
+            BMesh.verts.index_update()
+            BMesh.edges.index_update()
+            BMesh.faces.index_update()
+        elif self.partial:
+            BMesh = region_bmesh(context.object.data, Region)
+        else:
+            BMesh = bmesh.new()
+            BMesh.from_mesh(context.object.data)
+        Stages.BMesh = BMesh
+        Stage = stage_layer(BMesh)
+        Window = BMesh.faces.layers.int.get("window")
+        Window = Window or BMesh.faces.layers.int.new("window")
+        yield 0.05
     
         """BlackBox"""
-        #Create 
-        Faces = [f for f in BMesh.faces]
-        for f in Faces:f.copy(verts=True, edges=True)
-        NewFaces = bmesh.ops.extrude_discrete_faces(
-                BMesh,
-                faces = Faces)
-        for Face in NewFaces['faces']:
-            NormalX = Face.normal[0]*Thick
-            NormalY = Face.normal[1]*Thick
-            for vert in [v for v in Face.verts]:
-                bmesh.ops.translate(
-                    BMesh, 
-                    vec = (-NormalX, -NormalY, 0),
-                    verts = [vert])
-
-        #Apply Material (BlackBox)
-        BMesh.select_mode = {'EDGE'}
-        for face in NewFaces['faces']:
-            for vert in face.verts:
-                for edge in vert.link_edges:edge.select_set(True)
-        BMesh.select_flush(True)
-        BlackBoxFaces = [face for face in BMesh.faces if face.select]
-        for face in BlackBoxFaces:face.material_index = 1
-        Faces = [face for face in BMesh.faces 
-                if face not in BlackBoxFaces]
-        BMesh.select_mode = {'FACE'}
-        for f in BMesh.faces:f.select_set(False)
-        BMesh.select_flush(False)
+        #Create, glass copies of the faces and the boxes behind them
+        Stages.next("blackbox")
+        if not BoxDone:
+            Faces = [f for f in BMesh.faces]
+            Source = BMesh.faces.layers.int.get("source")
+            for i, f in enumerate(Faces):
+                f[Stage] = STAGE_BLACKBOX
+                f[Window] = f[Source]-1 if Source else i
+            for f in Faces:f.copy(verts=True, edges=True)[Stage] = STAGE_GLASS
+            NewFaces = bmesh.ops.extrude_discrete_faces(
+                    BMesh,
+                    faces = Faces)
+            #boxes pushed back, every vertex offset of a chunk at once
+            for Chunk, Done in chunks(NewFaces['faces'], ChunkSize, 0.05, 0.35):
+                push_faces(Chunk, Thick)
+                yield Done
+
+            #extruded faces keep the stage, their material goes by it
+            if Cached:STAGES.put(BoxKey, BMesh.copy())
 
         """Light INT"""
         ##create Face List - 'FacesLightIn'
-        FacesLightIn = Faces.copy()
-        for i in range(int(len(FacesLightIn)*AmountLight)):
-            random.seed(SelfSeed+i+1)
-            RandomElement = random.choice(FacesLightIn)
-            del FacesLightIn[FacesLightIn.index(RandomElement)]
-        for f in FacesLightIn:f.copy(verts=True, edges=True)
-        for Face in FacesLightIn:
-            NormalX = Face.normal[0]*Thick/3
-            NormalY = Face.normal[1]*Thick/3
-            for vert in [v for v in Face.verts]:
-                bmesh.ops.translate(
-                    BMesh, 
-                    vec = (-NormalX, -NormalY, 0),
-                    verts = [vert])
-
-        #Apply Materials
-        for Face in FacesLightIn:Face.material_index = 2
-        for Face in FacesLightIn[::2]:Face.material_index = 3
-        for Face in FacesLightIn[::3]:Face.material_index = 4
+        Stages.next("light")
+        if not LightDone:
+            Faces = [f for f in BMesh.faces if f[Stage]==STAGE_GLASS]
+            FacesLightIn = sample_split(Faces, int(len(Faces)*AmountLight),
+                                        SelfSeed+1, Legacy,
+                                        rng.STREAM_LIGHT)[0]
+            for f in FacesLightIn:f.copy(verts=True, edges=True)
+            for f in FacesLightIn:f[Stage] = STAGE_LIGHT
+            for Chunk, Done in chunks(FacesLightIn, ChunkSize, 0.35, 0.5):
+                push_faces(Chunk, Thick/3)
+                yield Done
+            #face indices as the old translate calls left them, the legacy
+            #curtain draws are seeded with them
+            BMesh.faces.index_update()
+            if Cached:STAGES.put(LightKey, BMesh.copy())
 
         #Get Faces
-        Faces = [face for face in BMesh.faces 
-                if face not in BlackBoxFaces 
-                and face not in FacesLightIn]
+        Faces = [face for face in BMesh.faces if face[Stage]==STAGE_GLASS]
 
         """Curtains"""
         #create Face List for Curtains - 'FaceToCurtains'
-        FaceToCurtains = Faces.copy()
-        for i in range(int(len(FaceToCurtains)*AmountCurtain)):
-            random.seed(SelfSeed+i)
-            RandomElement = random.choice(FaceToCurtains)
-            del FaceToCurtains[FaceToCurtains.index(RandomElement)]
-
-        #create Curtains
-        if self.type=="TYPE1":
-            FaceCurtain = curtains(BMesh, FaceToCurtains, 1, 
-                                    CurtainResol, SelfSeed)
-            for face in FaceCurtain:face.material_index = 6
-
-        elif self.type=="TYPE2":
-            FaceCurtain = curtains(BMesh, FaceToCurtains, 2, 
-                                    CurtainResol, SelfSeed)
-            for face in FaceCurtain:face.material_index = 5
-
-        elif self.type=="BOTH":
-            FaceToCurtains1 = FaceToCurtains.copy()
-            for i in range(int(len(FaceToCurtains1)*0.5)):
-                random.seed(SelfSeed+i+1)
-                RandomElement = random.choice(FaceToCurtains1)
-                del FaceToCurtains1[FaceToCurtains1.index(RandomElement)]
-            FaceCurtain1 = curtains(BMesh, FaceToCurtains1, 1, 
-                                    CurtainResol, SelfSeed)
-            FaceToCurtains2 = [f for f in FaceToCurtains 
-                                if f not in FaceToCurtains1]
-            FaceCurtain2 = curtains(BMesh, FaceToCurtains2, 2, 
-                                    CurtainResol, SelfSeed)
-            for face in FaceCurtain2:
-                face.material_index = 5
-            for face in FaceCurtain1:
-                face.material_index = 6
-                face.smooth = False
+        Stages.next("curtains")
+        FaceToCurtains = sample_split(Faces, int(len(Faces)*AmountCurtain),
+                                      SelfSeed, Legacy)[0]
+
+        #create Curtains, with the frames of their source windows
+        if self.type=="BOTH":
+            FaceToCurtains1, FaceToCurtains2 = sample_split(
+                    FaceToCurtains, int(len(FaceToCurtains)*0.5),
+                    SelfSeed+1, Legacy, rng.STREAM_CURTAIN_SPLIT)
+            Jobs = [(FaceToCurtains1, 1), (FaceToCurtains2, 2)]
+        elif self.type=="TYPE1":
+            Jobs = [(FaceToCurtains, 1)]
+        else:
+            Jobs = [(FaceToCurtains, 2)]
+        Instanced = []
+        Start = 0.5
+        for FacesIn, CurtainType in Jobs:
+            End = Start+0.4*len(FacesIn)/max(len(FaceToCurtains), 1)
+            if self.curtain_output=="INSTANCE":
+                #linked at the end, with the mesh
+                Instanced.append(([f[Window] for f in FacesIn], CurtainType))
+                Start = End
+                continue
+            for Chunk, Done in chunks(FacesIn, ChunkSize, Start, End):
+                Lookup = np.searchsorted(Windows, [f[Window] for f in Chunk])
+                FaceCurtain = curtains(BMesh, Chunk, CurtainType, 
+                                        CurtainResol[Lookup], SelfSeed,
+                                        Frames[Lookup], Legacy)
+                for face in FaceCurtain:
+                    if CurtainType==1:
+                        face[Stage] = STAGE_CURTAIN_A
+                        if self.type=="BOTH":face.smooth = False
+                    else:
+                        face[Stage] = STAGE_CURTAIN_B
+                yield Done
+            Start = End
         
         #Calculate Normals
+        Stages.next("normals")
         FacesCurtain = [f for f in BMesh.faces
-                        if f not in Faces
-                        and f not in FacesLightIn
-                        and f not in BlackBoxFaces]
+                        if f[Stage] in (STAGE_CURTAIN_A, STAGE_CURTAIN_B)]
         bmesh.ops.recalc_face_normals(BMesh, faces=FacesCurtain)
+        yield 0.95
                 
-        #Mask Modifier
-        BMesh.verts.ensure_lookup_table()
-        VertsGlass=[]
+        #Mask Modifier, the generated object keeps its group and modifier
+        #from the last run
+        Stages.next("glass")
+        Target, Glass, MaskGlass = context.object, None, None
+        if self.output=="OBJECT":
+            Target = generated_object(context, context.object.name+"_Windows")
+            #the source slots first, the glass keeps its material index
+            for Slot in context.object.data.materials:
+                Target.data.materials.append(Slot)
+            Glass = Target.vertex_groups.get("Glass")
+            MaskGlass = Target.modifiers.get('MaskGlass')
+        Glass = Glass or Target.vertex_groups.new(name="Glass")
         for face in Faces:
             for v in face.verts:
                 v.hide_set(True)
-                VertsGlass.append(v.index)
 
         #BMesh End
+        Stages.next("to_mesh")
+        #the window index only pairs the curtains with their frames
+        BMesh.faces.layers.int.remove(Window)
         for f in BMesh.faces:f.select_set(False)
         BMesh.select_flush(False)
-        BMesh.to_mesh(context.object.data)
+        if self.partial and Target==context.object:
+            Rows = splice_region(Target, BMesh, Region)
+        else:
+            Rows = np.arange(len(BMesh.faces))
+            drop_sources(BMesh)
+            BMesh.to_mesh(Target.data)
         BMesh.free()
-        context.object.data.update()
+
+        #Apply Materials, the slots found once and reused on later runs,
+        #every face of the run from its stage, Glass keeps its own
+        Slots = material_slots(Target.data, Material)
+        Stage = face_stages(Target.data)[Rows]
+        Role = np.full(len(Rows), -1)
+        Role[Stage==STAGE_BLACKBOX] = 1
+        Shade = np.arange(np.count_nonzero(Stage==STAGE_LIGHT))
+        Role[Stage==STAGE_LIGHT] = np.where(Shade%3==0, 4,
+                                            np.where(Shade%2==0, 3, 2))
+        Role[Stage==STAGE_CURTAIN_B] = 5
+        Role[Stage==STAGE_CURTAIN_A] = 6
+        write_materials(Target.data, Rows[Role>=0], Slots[Role[Role>=0]])
+
+        #Glass weights, one add for the verts of the written glass faces
+        Glass.add(poly_verts(Target.data, Rows[Stage==STAGE_GLASS]).tolist(),
+                  1.0, 'ADD')
+        Target.data.update()
+
+        #Curtain Instances, pools of shared meshes at the windows
+        for Sources, CurtainType in Instanced:
+            Mat = Material[6] if CurtainType==1 else Material[5]
+            Lookup = np.searchsorted(Windows, Sources)
+            curtain_instances(context, Name+"_Curtain", Frames[Lookup],
+                              Sources, CurtainType, CurtainResol[Lookup],
+                              SelfSeed, data.materials.get(Mat),
+                              self.variants, self.size_step)
 
         #Create Modifier Mask and apply to Glass
-        context.object.vertex_groups.new(name="Glass")
-        for v in VertsGlass:
-            context.object.vertex_groups['Glass'].add([v], 1, 'ADD')
-        MaskGlass = context.object.modifiers.new('MaskGlass', type='MASK')
-        MaskGlass.vertex_group='Glass'
+        MaskGlass = MaskGlass or Target.modifiers.new('MaskGlass', type='MASK')
+        MaskGlass.vertex_group=Glass.name
         MaskGlass.invert_vertex_group=True
         MaskGlass.show_render=False
         MaskGlass.show_in_editmode = True
 
         #Apply Smooth
-        context.object.data.use_auto_smooth = True
-        context.object.data.auto_smooth_angle = math.radians(60)
+        Target.data.use_auto_smooth = True
+        Target.data.auto_smooth_angle = math.radians(60)
+        Stages.close()
+
+
+def register():
+    bpy.utils.register_class(BASIC_OT_bmeshCreateWindow)
+    bpy.app.handlers.load_pre.append(clear_stages)
+
 
-        return {"FINISHED"}
+def unregister():
+    bpy.app.handlers.load_pre.remove(clear_stages)
+    STAGES.clear()
+    bpy.utils.unregister_class(BASIC_OT_bmeshCreateWindow)
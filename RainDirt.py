@@ -2,14 +2,26 @@
 # mesh operator
 
 import bpy, bmesh, random, math
-
-
-class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
-    """Create an object for use in Dirt Calculation"""
+import numpy as np
+from . import rng
+from .bmesh_ops import translate_verts, sample_split, edge_islands, verts_of
+from .bmesh_ops import shared_edges, selected_edge_region, region_bmesh
+from .bmesh_ops import edges_within, faces_within
+from .bmesh_ops import splice_region, RegionError
+from .instrument import stage
+from .chunked import ChunkedOperator, chunks
+
+
+class BASIC_OT_bmeshRainDirt(ChunkedOperator, bpy.types.Operator):
+    """Create an object for use in Dirt Calculation, every connected loop
+    of the selected edges gets the normal of its own strip"""
     bl_idname = "basic.rain_dirt"
     bl_label = "Rain Dirt"
     bl_options = {"REGISTER", "UNDO"}
 
+    #a selection the partial update cannot load or write back
+    reported = (RegionError,)
+
     height = bpy.props.FloatProperty(
             name="Height:",
             default=0.25,
@@ -43,15 +55,47 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
             max=100,
             subtype='PERCENTAGE')
 
+    legacy = bpy.props.BoolProperty(
+            name="Legacy Random",
+            default=False)
+
+    chunked = bpy.props.BoolProperty(
+            name="Run in Chunks",
+            default=False)
+
+    chunk = bpy.props.IntProperty(
+            name="Chunk Size:",
+            default=1000,
+            min=1)
+
+    partial = bpy.props.BoolProperty(
+            name="Partial Update",
+            default=False)
+
     @classmethod
     def poll(cls, context):
         ob = context.active_object
         return ob and ob.type == 'MESH' and context.mode == 'OBJECT'
 
     def execute(self, context):
-        #BMesh Start
-        BMesh = bmesh.new()
-        BMesh.from_mesh(context.object.data)
+        with stage("RainDirt"):
+            return self.run_steps(context)
+
+    def steps(self, context, ChunkSize):
+        #BMesh Start - the whole mesh, or the faces around the selected
+        #edges only, where new edges are numbered after the rest
+        Stages = self.sequence("RainDirt")
+        Stages.next("from_mesh")
+        Mesh = context.object.data
+        if self.partial:
+            Region = selected_edge_region(Mesh)
+            BMesh = region_bmesh(Mesh, Region)
+            Offset = len(Mesh.edges)-len(Region['edges'])
+        else:
+            BMesh = bmesh.new()
+            BMesh.from_mesh(Mesh)
+            Offset = 0
+        Stages.BMesh = BMesh
         
         #Variables
         Cuts = self.cuts
@@ -61,6 +105,8 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
         Height = -self.height
         
         #Subdivide selected Edges
+        yield 0.05
+        Stages.next("subdivide")
         EdgesToSubdivide = [edge for edge in BMesh.edges if edge.select]
 
         bmesh.ops.split_edges(
@@ -72,10 +118,9 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
                 edges=EdgesToSubdivide,
                 cuts=Cuts)
 
-        #Create Original Verts List - 'VertsOriginal'
-        SubVert = [ele for ele in EdgeSubdivided["geom_split"]
-                           if isinstance(ele, bmesh.types.BMVert)]                   
-        VertsOriginal = [v for v in BMesh.verts if v not in SubVert]
+        #Create Subdivision Verts Set - 'SubVert', every other vert is original
+        SubVert = {ele for ele in EdgeSubdivided["geom_split"]
+                           if isinstance(ele, bmesh.types.BMVert)}
 
         #Create 'EdgesSelected' and 'VertsSubdiv'
         EdgesSelect = [ele for ele in EdgeSubdivided["geom"]
@@ -83,34 +128,38 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
         VertsSubdiv = list({v for e in EdgesSelect for v in e.verts})
 
         #Extrude New Edges
+        yield 0.2
+        Stages.next("extrude")
         ExtrudeEdgeOnly = bmesh.ops.extrude_edge_only(    
                 BMesh,
                 edges=EdgesSelect,
                 use_select_history=True)
 
         #Translate vertices in 'VertsSubdiv'
-        for Vert in VertsSubdiv:
-            bmesh.ops.translate(
-                    BMesh,
-                    verts=[Vert],
-                    vec=(0, 0, -0.02))
+        bmesh.ops.translate(
+                BMesh,
+                verts=VertsSubdiv,
+                vec=(0, 0, -0.02))
         
         #Get Faces
         Faces = [ele for ele in ExtrudeEdgeOnly["geom"]
                            if isinstance(ele, bmesh.types.BMFace)]
+
+        #Get the loop of every strip vertex - 'Loops'
+        Loops = edge_islands([e for f in Faces for e in f.edges])
                            
-        #Get Faces Normals
-        NormalX = Faces[2].normal[0]
-        NormalY = Faces[2].normal[1]
+        #Get Faces Normals - third face of every loop
+        LoopFaces = [[] for i in range(max(Loops.values())+1)]
+        for f in Faces:
+            Loop = next(Loops[v] for v in f.verts if v in Loops)
+            LoopFaces[Loop].append(f)
+        Normals = np.array([f[min(2, len(f)-1)].normal[:2]
+                            for f in LoopFaces])
 
         #Translate vertices in 'VertsSubdiv'
-        for Vert in VertsSubdiv:
-            bmesh.ops.translate(
-                    BMesh,
-                    verts=[Vert],
-                    vec=(   NormalX*Distance, 
-                            NormalY*Distance, 
-                            0))
+        Offsets = np.zeros((len(VertsSubdiv), 3))
+        Offsets[:, :2] = Normals[[Loops[v] for v in VertsSubdiv]]*Distance
+        translate_verts(VertsSubdiv, Offsets)
 
         #Flip Faces
         if self.flip:
@@ -118,37 +167,43 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
                         BMesh, 
                         faces=Faces)
 
-        #Get Edges List - 'EdgesToExtrude',  from Vert List - 'VertsSubdiv'
+        #Get Edges List - 'EdgesToExtrude', the edges between the verts in
+        #'VertsSubdiv' and the selected ones the extrusion copied, through
+        #their link lists in mesh order (the translate above left the edge
+        #indices valid), then selected as a flush from the verts leaves them
+        Within = edges_within(VertsSubdiv)
+        Copied = [ele for ele in ExtrudeEdgeOnly["geom"]
+                  if isinstance(ele, bmesh.types.BMEdge) and ele.select]
+        EdgesToExtrude = sorted(set(Within).union(Copied),
+                                key=lambda e: e.index)
+        for e in Copied:e.select = False
         for v in VertsSubdiv:v.select = True
-        BMesh.select_flush_mode()
-        EdgesToExtrude = [e for e in BMesh.edges if e.select]
-        for e in BMesh.edges:e.select = False
-        BMesh.select_flush_mode()
+        for e in Within:e.select = True
+        for f in faces_within(VertsSubdiv):f.select = True
 
         #Get random Edges
-        for i in range(int(len(EdgesToExtrude)*Amount)):
-            random.seed(self.seed+i)
-            RandomElement = random.choice(EdgesToExtrude)
-            del EdgesToExtrude[EdgesToExtrude.index(RandomElement)]
-
-        #Dissolve Vertices - 'VertsOn':to keep list order
-        VertsOn = []
-        for item in [v for e in BMesh.edges 
-                    if e in EdgesSelect 
-                    for v in e.verts]:
-            if item not in VertsOn:VertsOn.append(item)
-            
-        VertsOff = list({v for e in BMesh.edges 
-                        if e in EdgesToExtrude 
-                        for v in e.verts})
+        yield 0.4
+        Stages.next("sample")
+        EdgesToExtrude = sample_split(
+                EdgesToExtrude, int(len(EdgesToExtrude)*Amount),
+                self.seed, self.legacy)[0]
+
+        #Dissolve Vertices - 'VertsOn':to keep mesh order, the translate
+        #above left the edge indices valid
+        yield 0.45
+        Stages.next("dissolve")
+        VertsOn = verts_of(sorted(EdgesSelect, key=lambda e: e.index))
+        VertsOff = {v for e in EdgesToExtrude for v in e.verts}
 
         Verts = [v for v in VertsOn 
                 if v not in VertsOff 
-                and v not in VertsOriginal]
+                and v in SubVert]
                 
         bmesh.ops.dissolve_verts(BMesh, verts=Verts)
 
         #Extrude Edges
+        yield 0.55
+        Stages.next("drops")
         ExtrudedEdges = bmesh.ops.extrude_edge_only(    
                 BMesh,
                 edges=EdgesToExtrude,
@@ -158,6 +213,12 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
         EdgesSelected = [ele for ele in ExtrudedEdges["geom"]
                            if isinstance(ele, bmesh.types.BMEdge)]
 
+        #Get the loop of every Edge, through the face back to its source
+        Loops = {v: i for v, i in Loops.items() if v.is_valid}
+        EdgeLoops = [next(Loops[v] for v in e.link_faces[0].verts
+                          if v in Loops)
+                     for e in EdgesSelected]
+
         #Get Verts from extruded Edges
         VertsSelect = [ele for ele in ExtrudedEdges["geom"]
                            if isinstance(ele, bmesh.types.BMVert)]
@@ -168,29 +229,50 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
                 verts=VertsSelect,
                 vec=(0.0, 0.0, -0.02))
 
-        #Split Edges
-        for v in VertsSelect:
-            if len(v.link_edges)==3:
-                bmesh.ops.split_edges(
-                    BMesh, 
-                    edges=[v.link_edges[2]])
-
-        #Translate extruded Edges
-        for Edge in EdgesSelected:
-            random.seed(self.seed+Edge.index)
-            EdgeHeight = Height*random.random()
-            random.seed(self.seed+Edge.index+1)
-            RandomLoc = random.random()
-            for Vert in Edge.verts:
-                VertX = (NormalX/10)*RandomLoc*Flip
-                VertY = (NormalY/10)*RandomLoc*Flip
-                bmesh.ops.translate(
-                        BMesh,
-                        verts=[Vert],
-                        vec=(VertX, VertY, EdgeHeight))
+        #Split Edges - shared by neighbouring drops, in one call
+        bmesh.ops.split_edges(
+                BMesh, 
+                edges=shared_edges(VertsSelect, EdgesSelected))
+
+        #Translate extruded Edges - one offset row per edge vertex, a chunk
+        #of edges at a time
+        if not self.legacy:
+            BMesh.edges.index_update()
+        EdgeNormals = Normals[EdgeLoops].reshape(-1, 2)
+        Rows = np.arange(len(EdgesSelected))
+        for Chunk, Done in chunks(Rows, ChunkSize, 0.6, 0.9):
+            Edges = [EdgesSelected[i] for i in Chunk]
+            if self.legacy:
+                RandomHeight = []
+                RandomLoc = []
+                for Edge in Edges:
+                    random.seed(self.seed+Edge.index+Offset)
+                    RandomHeight.append(random.random())
+                    random.seed(self.seed+Edge.index+Offset+1)
+                    RandomLoc.append(random.random())
+            else:
+                Index = [e.index+Offset for e in Edges]
+                RandomHeight = rng.uniform(self.seed, rng.STREAM_DROP_HEIGHT,
+                                           Index)
+                RandomLoc = rng.uniform(self.seed, rng.STREAM_DROP_OFFSET,
+                                        Index)
+            RandomLoc = np.array(RandomLoc)
+            EdgeOffsets = np.empty((len(Edges), 3))
+            EdgeOffsets[:, 0] = (EdgeNormals[Chunk, 0]/10)*RandomLoc*Flip
+            EdgeOffsets[:, 1] = (EdgeNormals[Chunk, 1]/10)*RandomLoc*Flip
+            EdgeOffsets[:, 2] = Height*np.array(RandomHeight)
+            translate_verts(
+                    [v for e in Edges for v in e.verts],
+                    np.repeat(EdgeOffsets, 2, axis=0))
+            yield Done
+        BMesh.normal_update()
 
         #BMesh End
-        BMesh.to_mesh(context.object.data)
+        Stages.next("to_mesh")
+        if self.partial:
+            splice_region(context.object, BMesh, Region)
+        else:
+            BMesh.to_mesh(Mesh)
         BMesh.free()
         context.object.data.update()
 
@@ -204,5 +286,4 @@ class BASIC_OT_bmeshRainDirt(bpy.types.Operator):
         context.object.data.use_auto_smooth
         context.object.data.auto_smooth_angle = math.radians(60)
         bpy.ops.object.shade_smooth()
-
-        return {"FINISHED"}
+        Stages.close()
@@ -0,0 +1,80 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# benchmark: the parts of bmesh_ops.curtains against facade size
+
+"""Time of the three parts of bmesh_ops.curtains for types 1 and 2.
+
+    python benchmarks/bench_curtain_parts.py [--windows 1000 10000 100000]
+
+'draws' is bmesh_ops.curtain_draws, 'rows' the strip arrays of
+mesh_arrays.curtain_rows and 'insert' the bulk_insert of the strips
+into a BMesh. The window frames come from a synthetic facade, the draws
+and origins are the ones bmesh_ops.curtains uses.
+
+The draws and rows are the only plain-data parts a process pool could
+take, and they stay under 1% of the time. The insert needs the BMesh in
+this process, which is why curtains has no worker mode.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common
+
+
+def windows_input(windows, curtain_type, resolution, seed):
+    """(seconds of the draws, curtain_rows arguments)."""
+    import numpy as np
+    import scenes
+    bmesh_ops = common.load('bmesh_ops')
+
+    scenes.clear()
+    obj = scenes.facade_object(windows)
+    frames = bmesh_ops.facade_frames(obj.data)
+    seconds, (steps, jitter, hung) = common.timed(
+        bmesh_ops.curtain_draws, curtain_type, np.arange(windows),
+        frames['size_z'], resolution, seed)
+    if curtain_type == 1:
+        frames, steps = frames[hung], steps[hung]
+    origin, height = bmesh_ops.curtain_origins(frames, curtain_type)
+    return seconds, (curtain_type, origin, frames['side'],
+                     frames['normal'][:, :2], height, steps, jitter,
+                     resolution)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--windows', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--resolution', type=int, default=32)
+    args = parser.parse_args(common.script_args())
+
+    bmesh_ops = common.load('bmesh_ops')
+    mesh_arrays = common.load('mesh_arrays')
+    import bmesh
+
+    rows = []
+    for windows in args.windows:
+        for curtain_type in (1, 2):
+            draws, task = windows_input(windows, curtain_type,
+                                        args.resolution, 1)
+            built, (coords, counts) = common.timed(mesh_arrays.curtain_rows,
+                                                   *task)
+            keep = counts > 1
+            BMesh = bmesh.new()
+            inserted, faces = common.timed(
+                bmesh_ops.bulk_insert, BMesh,
+                coords[keep.repeat(2 * counts)],
+                mesh_arrays.strip_quads(counts[keep]))
+            BMesh.free()
+            rows.append((curtain_type, windows, len(faces),
+                         "{:.4f}".format(draws), "{:.4f}".format(built),
+                         "{:.4f}".format(inserted)))
+    common.table(("type", "windows", "faces", "draws", "rows", "insert"),
+                 rows)
+
+
+if __name__ == '__main__':
+    main()
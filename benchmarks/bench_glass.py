@@ -0,0 +1,81 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# benchmark: ways of filling the Glass vertex group
+
+"""Time to hide the glass faces and weight their verts into "Glass".
+
+    blender -b --factory-startup -P benchmarks/bench_glass.py -- [--windows 50000]
+
+Every method runs the same from_mesh/to_mesh round trip on a facade with
+one glass quad per window and differs only in how the weights are set,
+'none' is the round trip alone:
+
+    per_vertex  vertex_groups['Glass'].add([v], 1, 'ADD') per face vertex
+    bulk        one add() with the verts of the written faces (CreateWindow)
+    deform      BMesh deform layer written before to_mesh
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common
+
+
+def fill(obj, method):
+    import bmesh
+
+    BMesh = bmesh.new()
+    BMesh.from_mesh(obj.data)
+    BMesh.verts.index_update()
+    Group = obj.vertex_groups.new(name="Glass")
+    Deform = BMesh.verts.layers.deform.verify()
+    VertsGlass = []
+    for face in BMesh.faces:
+        for v in face.verts:
+            v.hide_set(True)
+            if method == 'deform':
+                v[Deform][Group.index] = 1.0
+            elif method == 'per_vertex':
+                VertsGlass.append(v.index)
+    BMesh.to_mesh(obj.data)
+    BMesh.free()
+    obj.data.update()
+
+    if method == 'per_vertex':
+        for v in VertsGlass:
+            obj.vertex_groups['Glass'].add([v], 1, 'ADD')
+    elif method == 'bulk':
+        poly_verts = common.load('bmesh_ops').poly_verts
+        Rows = range(len(obj.data.polygons))
+        Group.add(poly_verts(obj.data, Rows).tolist(), 1, 'ADD')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--windows', type=int, nargs='+', default=[50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(common.script_args())
+
+    common.load('bmesh_ops')
+    import scenes
+
+    rows = []
+    for windows in args.windows:
+        for method in ('none', 'per_vertex', 'bulk', 'deform'):
+            best = None
+            for _ in range(args.repeat):
+                scenes.clear()
+                obj = scenes.facade_object(windows)
+                seconds, _ = common.timed(fill, obj, method)
+                best = seconds if best is None else min(best, seconds)
+            if method == 'none':
+                base = best
+            rows.append((windows, method, "{:.4f}".format(best),
+                         "{:+.4f}".format(best - base)))
+    common.table(("windows", "method", "seconds", "weights"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# benchmark: RainDirt against cuts and selected edges
+
+"""Wall-clock time of RainDirt for a grid of ``cuts`` and selected edges.
+
+    blender -b --factory-startup -P benchmarks/bench_raindirt.py -- [--cuts 10 50 200] [--edges 10 50 200]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuts', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--edges', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(common.script_args())
+
+    RainDirt = common.load('RainDirt').BASIC_OT_bmeshRainDirt
+    import scenes
+
+    rows = []
+    for edges in args.edges:
+        for cuts in args.cuts:
+            best = None
+            for _ in range(args.repeat):
+                scenes.clear()
+                obj = scenes.eave_object(edges)
+                seconds, _ = common.timed(common.run, RainDirt, cuts=cuts)
+                best = seconds if best is None else min(best, seconds)
+            rows.append((edges, cuts, len(obj.data.vertices),
+                         "{:.4f}".format(best)))
+    common.table(("edges", "cuts", "verts out", "seconds"), rows)
+
+
+if __name__ == '__main__':
+    main()
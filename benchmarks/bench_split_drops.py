@@ -0,0 +1,107 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# benchmark: splitting neighbouring RainDirt drops apart
+
+"""Time to split the side edges shared by neighbouring drops.
+
+    python benchmarks/bench_split_drops.py [--cuts 50 200 800] [--edges 10]
+
+The scene is the RainDirt strand at that point: a strip of 'edges' times
+'cuts'+1 quads whose bottom edges are half kept, extruded and moved
+down. Both methods run on the same strand:
+
+    per_vertex  split_edges once per vertex with three links, on
+                link_edges[2], the loop RainDirt used to run
+    batch       one split_edges with bmesh_ops.shared_edges (RainDirt)
+
+The script fails unless both leave the same topology: the same faces,
+edges and vertex valences by coordinates.
+"""
+
+import argparse
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common
+
+
+def strand(columns, seed):
+    """BMesh of one strip with every other bottom edge, on average,
+    extruded 0.02 down, and (verts, edges) of the extrusion."""
+    import bmesh
+
+    bm = bmesh.new()
+    top = [bm.verts.new((0.01 * i, 0.0, 0.02)) for i in range(columns + 1)]
+    low = [bm.verts.new((0.01 * i, 0.0, 0.0)) for i in range(columns + 1)]
+    for i in range(columns):
+        bm.faces.new((low[i], low[i + 1], top[i + 1], top[i]))
+    bm.edges.ensure_lookup_table()
+    bottom = [bm.edges.get((low[i], low[i + 1])) for i in range(columns)]
+    random.seed(seed)
+    kept = [e for e in bottom if random.random() < 0.5]
+    geom = bmesh.ops.extrude_edge_only(bm, edges=kept)['geom']
+    verts = [el for el in geom if isinstance(el, bmesh.types.BMVert)]
+    edges = [el for el in geom if isinstance(el, bmesh.types.BMEdge)]
+    bmesh.ops.translate(bm, verts=verts, vec=(0.0, 0.0, -0.02))
+    return bm, verts, edges
+
+
+def split(bm, verts, edges, method):
+    import bmesh
+
+    if method == 'per_vertex':
+        for v in verts:
+            if len(v.link_edges) == 3:
+                bmesh.ops.split_edges(bm, edges=[v.link_edges[2]])
+    else:
+        shared_edges = common.load('bmesh_ops').shared_edges
+        bmesh.ops.split_edges(bm, edges=shared_edges(verts, edges))
+
+
+def topology(bm):
+    """Faces, edges and valences by rounded coordinates."""
+    def key(v):
+        return tuple(round(c, 5) for c in v.co)
+    faces = Counter()
+    for f in bm.faces:
+        co = [key(v) for v in f.verts]
+        first = co.index(min(co))
+        faces[tuple(co[first:] + co[:first])] += 1
+    edges = Counter(tuple(sorted(key(v) for v in e.verts)) for e in bm.edges)
+    verts = Counter((key(v), len(v.link_edges)) for v in bm.verts)
+    return faces, edges, verts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuts', type=int, nargs='+', default=[50, 200, 800])
+    parser.add_argument('--edges', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(common.script_args())
+
+    common.load('bmesh_ops')
+
+    rows = []
+    for cuts in args.cuts:
+        columns = args.edges * (cuts + 1)
+        shapes = {}
+        for method in ('per_vertex', 'batch'):
+            best = None
+            for _ in range(args.repeat):
+                bm, verts, edges = strand(columns, cuts)
+                seconds, _ = common.timed(split, bm, verts, edges, method)
+                best = seconds if best is None else min(best, seconds)
+            shapes[method] = topology(bm)
+            rows.append((cuts, columns, method, len(bm.verts),
+                         "{:.4f}".format(best)))
+            bm.free()
+        if shapes['per_vertex'] != shapes['batch']:
+            sys.exit("topology differs at {} cuts".format(cuts))
+    common.table(("cuts", "columns", "method", "verts", "seconds"), rows)
+
+
+if __name__ == '__main__':
+    main()
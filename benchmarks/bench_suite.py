@@ -0,0 +1,165 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# benchmark: every operator against facade size
+
+"""Time and peak memory per stage of all five operators.
+
+    python benchmarks/bench_suite.py [--windows 100 1000 10000 100000]
+    blender -b --factory-startup -P benchmarks/bench_suite.py -- [args]
+
+Each case builds its synthetic scene ('scene' stage) and then runs the
+operator.  Below every row follows one row per internal stage the
+add-on records with instrument.stage while the row runs (e.g.
+'operator/CreateWindow.curtains'), a stage run more than once in a row
+is summed in time and reports its highest peak.  ``--save`` writes the
+results as JSON and ``--against`` prints the time ratio to such a file,
+so a change in how an operator scales shows up as a growing ratio.
+Times are taken with tracemalloc running and read high in absolute
+terms, compare them with each other, not with runs outside the suite.
+
+    raindirt      one selected eave edge per window
+    createwindow  one quad per window, Curtain type BOTH
+    instances     createwindow with the curtains linked as instances
+    createnew     one quad per window
+    createpot     one pot per 100 windows
+    curtains      bmesh_ops.curtains types 1 and 2 on every window
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common
+
+CASES = ('raindirt', 'createwindow', 'instances', 'createnew', 'createpot',
+         'curtains')
+
+
+def facade(windows):
+    import scenes
+    obj = scenes.facade_object(windows)
+    scenes.materials(obj)
+    return obj
+
+
+def stages(case, windows, cuts):
+    """(stage, func) pairs for one case, run in order."""
+    import bpy
+    import bmesh
+    import scenes
+
+    if case == 'raindirt':
+        RainDirt = common.load('RainDirt').BASIC_OT_bmeshRainDirt
+        return [('scene', lambda: scenes.eave_object(windows)),
+                ('operator', lambda: common.run(RainDirt, cuts=cuts))]
+    if case == 'createwindow':
+        CreateWindow = common.load('CreateWindow').BASIC_OT_bmeshCreateWindow
+        return [('scene', lambda: facade(windows)),
+                ('operator', lambda: common.run(CreateWindow, type='BOTH'))]
+    if case == 'instances':
+        CreateWindow = common.load('CreateWindow').BASIC_OT_bmeshCreateWindow
+        return [('scene', lambda: facade(windows)),
+                ('operator', lambda: common.run(CreateWindow, type='BOTH',
+                                                curtain_output='INSTANCE'))]
+    if case == 'createnew':
+        CreateNew = common.load('CreateNew').BASIC_OT_bmeshCreateVertical
+        return [('scene', lambda: facade(windows)),
+                ('operator', lambda: common.run(CreateNew))]
+    if case == 'createpot':
+        CreatePot = common.load('CreatePot').BASIC_OT_bmeshCreatePot
+
+        def pots():
+            for _ in range(max(1, windows // 100)):
+                common.run(CreatePot)
+        return [('operator', pots)]
+
+    curtains = common.load('bmesh_ops').curtains
+    state = {}
+
+    def from_mesh():
+        state['bm'] = bm = bmesh.new()
+        bm.from_mesh(bpy.context.object.data)
+
+    def both():
+        faces = list(state['bm'].faces)
+        curtains(state['bm'], faces, 1, 32, 0)
+        curtains(state['bm'], faces, 2, 32, 0)
+
+    def to_mesh():
+        state['bm'].to_mesh(bpy.context.object.data)
+        state['bm'].free()
+
+    return [('scene', lambda: facade(windows)),
+            ('from_mesh', from_mesh),
+            ('curtains', both),
+            ('to_mesh', to_mesh)]
+
+
+def internal(records):
+    """(stage, seconds, peak) per instrument stage name, in the order the
+    stages first ran."""
+    merged = OrderedDict()
+    for record in records:
+        seconds, peak = merged.get(record['stage'], (0.0, 0))
+        merged[record['stage']] = (seconds + record['seconds'],
+                                   max(peak, record['peak']))
+    return [(name, seconds, peak)
+            for name, (seconds, peak) in merged.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--windows', type=int, nargs='+',
+                        default=[100, 1000, 10000])
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    parser.add_argument('--cuts', type=int, default=10)
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--against', help="compare with a saved JSON file")
+    args = parser.parse_args(common.script_args())
+
+    common.load('bmesh_ops')
+    instrument = common.load('instrument')
+    import scenes
+
+    previous = {}
+    if args.against:
+        with open(args.against) as f:
+            previous = json.load(f)
+
+    results = {}
+    rows = []
+    for case in args.cases:
+        for windows in args.windows:
+            scenes.clear()
+            for stage, func in stages(case, windows, args.cuts):
+                records = []
+                instrument.enable(records=records)
+                try:
+                    seconds, peak, _ = common.measure(func)
+                finally:
+                    instrument.disable()
+                measured = [(stage, seconds, peak)]
+                measured += [(stage + '/' + name, s, p)
+                             for name, s, p in internal(records)]
+                for name, seconds, peak in measured:
+                    key = "{}/{}/{}".format(case, windows, name)
+                    results[key] = {'seconds': seconds, 'peak': peak}
+                    before = previous.get(key)
+                    ratio = ("{:.2f}".format(seconds / before['seconds'])
+                             if before and before['seconds'] else "-")
+                    rows.append((case, windows, name,
+                                 "{:.4f}".format(seconds),
+                                 "{:.1f}".format(peak / 2.0**20), ratio))
+    common.table(("case", "windows", "stage", "seconds", "peak MiB",
+                  "ratio"), rows)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# benchmark helpers
+
+"""Shared helpers for the benchmark scripts.
+
+Every script runs either inside Blender::
+
+    blender --background --factory-startup --python benchmarks/bench_x.py -- [args]
+
+or headless with plain Python, in which case the stand-in ``bpy``,
+``bmesh`` and ``mathutils`` modules from ``benchmarks/standin`` are
+used.  The add-on modules are loaded as a package named ``bmesh_addon``
+so their relative imports resolve without an installed add-on.
+"""
+
+import importlib
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin')
+PACKAGE = 'bmesh_addon'
+
+
+def script_args():
+    """Arguments after '--' when run by Blender, else the usual argv."""
+    if '--' in sys.argv:
+        return sys.argv[sys.argv.index('--') + 1:]
+    return sys.argv[1:]
+
+
+def use_standin():
+    """Put the stand-in modules on sys.path unless bpy is importable."""
+    try:
+        import bpy
+        return getattr(bpy, '__file__', '').startswith(STANDIN)
+    except ImportError:
+        sys.path.insert(0, STANDIN)
+        return True
+
+
+def load(module):
+    """Import one add-on module, e.g. load('RainDirt')."""
+    use_standin()
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(PACKAGE + '.' + module)
+
+
+def timed(func, *args, **kwargs):
+    """Run func once and return (seconds, result)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def table(header, rows):
+    """Print rows as a fixed-width table."""
+    widths = [max(len(str(c)) for c in col) for col in zip(header, *rows)]
+    line = "  ".join("{:>%d}" % w for w in widths)
+    print(line.format(*header))
+    for row in rows:
+        print(line.format(*row))
+
+
+def measure(func, *args, **kwargs):
+    """Run func once and return (seconds, peak bytes, result).
+
+    The peak comes from tracemalloc, so it covers Python and NumPy
+    allocations but not memory Blender allocates in C."""
+    tracemalloc.start()
+    try:
+        seconds, result = timed(func, *args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run(cls, **props):
+    """Register the operator class if needed and run it once.
+
+    On the stand-in the operator is instanced with the properties and
+    executed directly on the stand-in context."""
+    import bpy
+    if use_standin():
+        return cls(**props).execute(bpy.context)
+    if not hasattr(bpy.types, cls.__name__):
+        bpy.utils.register_class(cls)
+    category, name = cls.bl_idname.split('.')
+    return getattr(getattr(bpy.ops, category), name)(**props)
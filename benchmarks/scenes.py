@@ -0,0 +1,93 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# synthetic scenes for the benchmarks
+
+"""Synthetic facades built with ``from_pydata``.
+
+The same code runs on real Blender and on the stand-in, so timings from
+both environments are comparable in shape if not in absolute value.
+"""
+
+import math
+
+import bpy
+
+
+def _link(name, mesh):
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.objects.link(obj)
+    bpy.context.scene.objects.active = obj
+    obj.select = True
+    return obj
+
+
+def facade_object(windows, name="Facade", width=1.2, height=1.5,
+                  spacing=2.5, floor=3.0):
+    """One disjoint quad per window, spread over the four walls of a tower."""
+    per_wall = int(math.ceil(windows / 4.0))
+    columns = max(1, int(math.ceil(math.sqrt(per_wall))))
+    half = columns * spacing / 2.0 + 1.0
+    walls = (((1, 0), (-half, -half), (0, -1)),
+             ((0, 1), (half, -half), (1, 0)),
+             ((-1, 0), (half, half), (0, 1)),
+             ((0, -1), (-half, half), (-1, 0)))
+    verts, faces = [], []
+    for i in range(windows):
+        (dx, dy), (ox, oy), _ = walls[i % 4]
+        k = i // 4
+        row, col = divmod(k, columns)
+        u = 1.0 + col * spacing
+        z = 1.0 + row * floor
+        x0, y0 = ox + dx * u, oy + dy * u
+        x1, y1 = x0 + dx * width, y0 + dy * width
+        base = len(verts)
+        verts.extend(((x0, y0, z), (x1, y1, z),
+                      (x1, y1, z + height), (x0, y0, z + height)))
+        faces.append((base, base + 1, base + 2, base + 3))
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(verts, [], faces)
+    mesh.update()
+    return _link(name, mesh)
+
+
+def eave_object(edges, loops=1, name="Eave", length=0.6, height=0.4,
+                gap=1.0):
+    """Wall strips with their top edges selected, one strip per loop."""
+    verts, faces = [], []
+    for l in range(loops):
+        y = l * gap
+        base = len(verts)
+        for i in range(edges + 1):
+            verts.append((i * length, y, 0.0))
+            verts.append((i * length, y, height))
+        for i in range(edges):
+            a = base + 2 * i
+            faces.append((a, a + 2, a + 3, a + 1))
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(verts, [], faces)
+    mesh.update()
+    select = [co[2] > 0.0 for co in verts]
+    mesh.vertices.foreach_set('select', select)
+    edge_verts = [0] * (len(mesh.edges) * 2)
+    mesh.edges.foreach_get('vertices', edge_verts)
+    mesh.edges.foreach_set('select', [select[edge_verts[2 * i]] and
+                                      select[edge_verts[2 * i + 1]]
+                                      for i in range(len(mesh.edges))])
+    return _link(name, mesh)
+
+
+def materials(obj):
+    """Create the material names CreateWindow looks up."""
+    name = obj.name.split(':')[0]
+    for mat in (name + ":thin_RAY.002_DRV", "001.non_material.000",
+                name + ":luz_INTERNA.01", name + ":luz_INTERNA.02",
+                name + ":luz_INTERNA.03", "001.curtain.000", "N6"):
+        if mat not in bpy.data.materials:
+            bpy.data.materials.new(mat)
+
+
+def clear():
+    """Remove every object and mesh so runs start from the same state."""
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh)
@@ -0,0 +1,16 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# headless stand-in for bmesh
+
+from . import ops, types
+
+
+def new(use_operators=True):
+    return types.BMesh()
+
+
+def from_edit_mesh(mesh):
+    raise RuntimeError("bmesh stand-in has no edit mode")
+
+
+def update_edit_mesh(mesh, loop_triangles=True, destructive=True):
+    raise RuntimeError("bmesh stand-in has no edit mode")
@@ -0,0 +1,449 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# headless stand-in for bmesh.ops
+
+"""The ``bmesh.ops`` calls used by the add-on.
+
+Topology follows the Blender C implementation closely enough for
+benchmarking (output slots, extrusion winding, new-element order), but
+sub-features the add-on never enables (grid fill, corner patterns,
+shape keys) are left out.  Outputs listed as ``geom`` come back in mesh
+order, which is what BMO_slot_buffer_from_enabled_flag does in Blender.
+"""
+
+import math
+from collections import OrderedDict
+
+from mathutils import Matrix, Vector
+
+from .types import BMEdge, BMFace, BMVert
+
+
+def _normals_calc(op):
+    """Mirror BMO_OPTYPE_FLAG_NORMALS_CALC.
+
+    Blender recalculates normals after these operators, and
+    BM_mesh_normals_update() ensures edge and face indices on the way.
+    Face normals are computed on access here, so only the indices are
+    refreshed.
+    """
+    def wrapper(bm, **kwargs):
+        ret = op(bm, **kwargs)
+        bm.edges.index_update()
+        bm.faces.index_update()
+        return ret
+    wrapper.__name__ = op.__name__
+    wrapper.__doc__ = op.__doc__
+    return wrapper
+
+
+def _in_mesh_order(seq, marked):
+    if not marked:
+        return []
+    return [ele for ele in seq if ele in marked]
+
+
+def _geom_out(bm, verts=(), edges=(), faces=()):
+    return (_in_mesh_order(bm.verts, set(verts)) +
+            _in_mesh_order(bm.edges, set(edges)) +
+            _in_mesh_order(bm.faces, set(faces)))
+
+
+def _face_replace_edge(face, old, new):
+    for i, e in enumerate(face.edges):
+        if e is old:
+            face.edges[i] = new
+    if face in old.link_faces:
+        old.link_faces.remove(face)
+    if face not in new.link_faces:
+        new.link_faces.append(face)
+
+
+def _face_replace_vert(face, old, new):
+    face.verts = [new if v is old else v for v in face.verts]
+    if face in old.link_faces:
+        old.link_faces.remove(face)
+    if face not in new.link_faces:
+        new.link_faces.append(face)
+
+
+def _edge_replace_vert(edge, old, new):
+    v1, v2 = edge.verts
+    edge.verts = (new if v1 is old else v1, new if v2 is old else v2)
+    old.link_edges.remove(edge)
+    new.link_edges.append(edge)
+
+
+def create_vert(bm, co=(0.0, 0.0, 0.0)):
+    return {'vert': [bm.verts.new(co)]}
+
+
+@_normals_calc
+def translate(bm, vec=(0.0, 0.0, 0.0), space=None, verts=()):
+    dx, dy, dz = vec
+    for v in verts:
+        co = v.co
+        co.x += dx
+        co.y += dy
+        co.z += dz
+    return {}
+
+
+@_normals_calc
+def transform(bm, matrix=None, space=None, verts=()):
+    if space is not None:
+        matrix = space.inverted() * matrix * space
+    for v in verts:
+        v.co = matrix * v.co
+    return {}
+
+
+@_normals_calc
+def reverse_faces(bm, faces=(), flip_multires=False):
+    for f in faces:
+        f.verts = [f.verts[0]] + f.verts[:0:-1]
+        n = len(f.verts)
+        f.edges = [bm.edges.get((f.verts[i], f.verts[(i + 1) % n]))
+                   for i in range(n)]
+    return {}
+
+
+@_normals_calc
+def recalc_face_normals(bm, faces=()):
+    """Make winding consistent across each connected patch."""
+    faces = list(faces)
+    todo = set(faces)
+    for seed in faces:
+        if seed not in todo:
+            continue
+        todo.discard(seed)
+        stack = [seed]
+        while stack:
+            f = stack.pop()
+            n = len(f.verts)
+            for i, e in enumerate(f.edges):
+                a, b = f.verts[i], f.verts[(i + 1) % n]
+                for g in e.link_faces:
+                    if g is f or g not in todo:
+                        continue
+                    todo.discard(g)
+                    j = g.verts.index(a) if a in g.verts else -1
+                    m = len(g.verts)
+                    if j >= 0 and g.verts[(j + 1) % m] is b:
+                        reverse_faces(bm, faces=[g])
+                    stack.append(g)
+    return {}
+
+
+@_normals_calc
+def split_edges(bm, edges=(), verts=(), use_verts=False):
+    out = []
+    tagged = set()
+    for e in edges:
+        tagged.add(e)
+        faces = list(e.link_faces)
+        for f in faces[1:]:
+            ne = bm.edges.new(e.verts, e)
+            _face_replace_edge(f, e, ne)
+            tagged.add(ne)
+            out.append(ne)
+        if faces:
+            out.append(e)
+    # separate vertices that no longer form a single fan
+    for v in OrderedDict.fromkeys(v for e in edges for v in e.verts):
+        groups = []
+        seen = set()
+        for f in v.link_faces:
+            if f in seen:
+                continue
+            group = {f}
+            stack = [f]
+            seen.add(f)
+            while stack:
+                g = stack.pop()
+                for e in g.edges:
+                    if v not in e.verts or e in tagged:
+                        continue
+                    for h in e.link_faces:
+                        if h not in seen:
+                            seen.add(h)
+                            group.add(h)
+                            stack.append(h)
+            groups.append(group)
+        for group in groups[1:]:
+            nv = bm.verts.new(v.co, v)
+            group_edges = {e for g in group for e in g.edges if v in e.verts}
+            for e in group_edges:
+                _edge_replace_vert(e, v, nv)
+            for g in group:
+                _face_replace_vert(g, v, nv)
+    return {'edges': out}
+
+
+@_normals_calc
+def subdivide_edges(bm, edges=(), cuts=1, smooth=0.0, use_grid_fill=False,
+                    use_single_edge=False, use_only_quads=False,
+                    use_smooth_even=False, seed=0, **kwargs):
+    new_verts = []
+    out_edges = []
+    faces_touched = set()
+    for e in list(edges):
+        v1, v2 = e.verts
+        co1, co2 = v1.co, v2.co
+        chain = [v1]
+        for i in range(1, cuts + 1):
+            t = i / float(cuts + 1)
+            nv = bm.verts.new(co1 + (co2 - co1) * t, v1)
+            chain.append(nv)
+            new_verts.append(nv)
+        chain.append(v2)
+        # the original edge becomes the first segment
+        _edge_replace_vert(e, v2, chain[1])
+        segments = [e]
+        for a, b in zip(chain[1:], chain[2:]):
+            segments.append(bm.edges.new((a, b), e))
+        out_edges.extend(segments)
+        for f in list(e.link_faces):
+            faces_touched.add(f)
+            n = len(f.verts)
+            i = f.edges.index(e)
+            a = f.verts[i]
+            if a is v1:
+                ring, ring_edges = chain[1:-1], segments
+            else:
+                ring, ring_edges = chain[-2:0:-1], segments[::-1]
+            f.verts[i + 1:i + 1] = ring
+            f.edges[i:i + 1] = ring_edges
+            for ne in ring_edges:
+                if ne is not e:
+                    ne.link_faces.append(f)
+            for nv in ring:
+                nv.link_faces.append(f)
+    split_verts = new_verts
+    return {'geom_inner': [],
+            'geom_split': _geom_out(bm, split_verts, out_edges),
+            'geom': _geom_out(bm, split_verts + [v for e in out_edges
+                                                  for v in e.verts],
+                              out_edges, faces_touched)}
+
+
+@_normals_calc
+def extrude_edge_only(bm, edges=(), use_select_history=False):
+    vmap = {}
+    new_edges = []
+    new_faces = []
+    edges = list(edges)
+    for e in edges:
+        for v in e.verts:
+            if v not in vmap:
+                vmap[v] = bm.verts.new(v.co, v)
+    pairs = []
+    for e in edges:
+        ne = bm.edges.new((vmap[e.verts[0]], vmap[e.verts[1]]), e)
+        new_edges.append(ne)
+        pairs.append((e, ne))
+    for e, ne in pairs:
+        if e.link_faces:
+            f0 = e.link_faces[0]
+            i = f0.edges.index(e)
+            loop_v = f0.verts[i]
+        else:
+            loop_v = None
+        if loop_v is not None and e.verts[0] is not loop_v:
+            fverts = [e.verts[0], e.verts[1], ne.verts[1], ne.verts[0]]
+        else:
+            fverts = [e.verts[1], e.verts[0], ne.verts[0], ne.verts[1]]
+        example = e.link_faces[0] if e.link_faces else None
+        new_faces.append(bm.faces.new(fverts, example))
+    return {'geom': _geom_out(bm, vmap.values(), new_edges, new_faces)}
+
+
+@_normals_calc
+def extrude_vert_indiv(bm, verts=(), use_select_history=False):
+    out_verts, out_edges = [], []
+    for v in verts:
+        nv = bm.verts.new(v.co, v)
+        out_edges.append(bm.edges.new((v, nv)))
+        out_verts.append(nv)
+    return {'edges': out_edges, 'verts': out_verts}
+
+
+@_normals_calc
+def extrude_discrete_faces(bm, faces=(), use_normal_flip=False,
+                           use_select_history=False):
+    out = []
+    for f in list(faces):
+        ring = list(f.verts)
+        caps = [bm.verts.new(v.co, v) for v in ring]
+        cap = bm.faces.new(caps, f)
+        n = len(ring)
+        for i in range(n):
+            j = (i + 1) % n
+            bm.faces.new((ring[i], ring[j], caps[j], caps[i]), f)
+        bm.faces.remove(f)
+        out.append(cap)
+    return {'faces': out}
+
+
+@_normals_calc
+def extrude_face_region(bm, geom=(), **kwargs):
+    faces = [f for f in geom if isinstance(f, BMFace)]
+    ret = extrude_discrete_faces(bm, faces=faces)
+    return {'geom': ret['faces']}
+
+
+@_normals_calc
+def duplicate(bm, geom=(), dest=None, use_select_history=False,
+              use_edge_flip_from_face=True):
+    vmap, emap, fmap = {}, {}, {}
+    geom = list(geom)
+    for ele in geom:
+        if isinstance(ele, BMFace):
+            for v in ele.verts:
+                vmap.setdefault(v, None)
+        elif isinstance(ele, BMEdge):
+            for v in ele.verts:
+                vmap.setdefault(v, None)
+        elif isinstance(ele, BMVert):
+            vmap.setdefault(ele, None)
+    for v in vmap:
+        vmap[v] = bm.verts.new(v.co, v)
+    for ele in geom:
+        if isinstance(ele, BMEdge):
+            emap[ele] = bm.edges.new((vmap[ele.verts[0]], vmap[ele.verts[1]]), ele)
+    for ele in geom:
+        if isinstance(ele, BMFace):
+            fmap[ele] = bm.faces.new([vmap[v] for v in ele.verts], ele)
+    new = list(vmap.values()) + list(emap.values()) + list(fmap.values())
+    return {'geom': new, 'vert_map': vmap, 'edge_map': emap, 'face_map': fmap}
+
+
+@_normals_calc
+def delete(bm, geom=(), context='VERTS'):
+    geom = list(geom)
+    if context == 'FACES_ONLY':
+        for f in geom:
+            if isinstance(f, BMFace) and f.is_valid:
+                bm.faces.remove(f)
+    elif context == 'EDGES':
+        for e in geom:
+            if isinstance(e, BMEdge) and e.is_valid:
+                bm.edges.remove(e)
+    elif context == 'FACES':
+        for f in geom:
+            if isinstance(f, BMFace) and f.is_valid:
+                edges, verts = list(f.edges), list(f.verts)
+                bm.faces.remove(f)
+                for e in edges:
+                    if e.is_valid and not e.link_faces:
+                        bm.edges.remove(e)
+                for v in verts:
+                    if v.is_valid and not v.link_edges:
+                        bm.verts.remove(v)
+    else:
+        for v in geom:
+            if isinstance(v, BMVert) and v.is_valid:
+                bm.verts.remove(v)
+    return {}
+
+
+def _collapse_2_edge_vert(bm, v):
+    e1, e2 = v.link_edges
+    a, b = e1.other_vert(v), e2.other_vert(v)
+    if a is b:
+        return
+    faces = list(v.link_faces)
+    keep = bm.edges.get((a, b))
+    if keep is None:
+        keep = bm.edges.new((a, b), e1)
+    for f in faces:
+        i = f.verts.index(v)
+        n = len(f.verts)
+        if n <= 3:
+            continue
+        del f.verts[i]
+        # edge i-1 ends at v, edge i starts at v
+        f.edges[i - 1] = keep
+        del f.edges[i % n]
+        v.link_faces.remove(f)
+        keep.link_faces.append(f)
+        for e in (e1, e2):
+            if f in e.link_faces:
+                e.link_faces.remove(f)
+    for e in (e1, e2):
+        if e.is_valid and not e.link_faces:
+            for w in e.verts:
+                if e in w.link_edges:
+                    w.link_edges.remove(e)
+            bm.edges._discard(e)
+    if not v.link_edges:
+        bm.verts._discard(v)
+
+
+def _dissolve_fan(bm, v):
+    faces = list(v.link_faces)
+    seqs = []
+    for f in faces:
+        i = f.verts.index(v)
+        ring = f.verts[i + 1:] + f.verts[:i]
+        seqs.append(ring)
+    starts = {s[0]: k for k, s in enumerate(seqs)}
+    ends = {s[-1] for s in seqs}
+    first = next((k for k, s in enumerate(seqs) if s[0] not in ends), 0)
+    merged = list(seqs[first])
+    used = {first}
+    while len(used) < len(seqs):
+        k = starts.get(merged[-1])
+        if k is None or k in used:
+            return False
+        used.add(k)
+        merged.extend(seqs[k][1:])
+    if len(merged) > 1 and merged[-1] is merged[0]:
+        merged.pop()
+    if len(merged) < 3 or len(set(merged)) != len(merged):
+        return False
+    example = faces[0]
+    bm.verts.remove(v)
+    bm.faces.new(merged, example)
+    return True
+
+
+@_normals_calc
+def dissolve_verts(bm, verts=(), use_face_split=False, use_boundary_tear=False):
+    for v in list(verts):
+        if not v.is_valid:
+            continue
+        if len(v.link_edges) == 2:
+            _collapse_2_edge_vert(bm, v)
+        elif v.link_faces:
+            _dissolve_fan(bm, v)
+    return {}
+
+
+@_normals_calc
+def create_cone(bm, cap_ends=False, cap_tris=False, segments=12,
+                diameter1=1.0, diameter2=1.0, depth=1.0, matrix=None,
+                calc_uvs=False):
+    """bmo_create_cone_exec() from Blender 2.79 (diameters act as radii)."""
+    if matrix is None:
+        matrix = Matrix.Identity(4)
+    depth = depth * 0.5
+    phid = 2.0 * math.pi / segments
+    phi = 0.0
+    out = []
+    first = last = None
+    for a in range(segments):
+        v1 = bm.verts.new(matrix * Vector((-diameter1 * math.sin(phi),
+                                           diameter1 * math.cos(phi),
+                                           -depth)))
+        v2 = bm.verts.new(matrix * Vector((-diameter2 * math.sin(phi),
+                                           diameter2 * math.cos(phi),
+                                           depth)))
+        out.extend((v1, v2))
+        if a:
+            bm.faces.new((v1, v2, last[1], last[0]))
+        else:
+            first = (v1, v2)
+        last = (v1, v2)
+        phi += phid
+    bm.faces.new((first[0], first[1], last[1], last[0]))
+    return {'verts': out}
@@ -0,0 +1,518 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# headless stand-in for bmesh.types
+
+"""BMesh element and sequence types.
+
+Elements keep their own adjacency lists (``link_edges``, ``link_faces``)
+and faces keep explicit vertex and edge rings, which is enough for the
+operators used by the add-on.  New elements get ``index == -1`` until
+``index_update()`` runs, the same as in Blender.
+"""
+
+from mathutils import Vector
+
+
+class BMLayerItem(object):
+    __slots__ = ('name', 'default')
+
+    def __init__(self, name, default):
+        self.name = name
+        self.default = default
+
+
+class BMLayerCollection(object):
+
+    def __init__(self, default):
+        self._layers = {}
+        self._default = default
+
+    def new(self, name="layer"):
+        layer = BMLayerItem(name, self._default)
+        self._layers[name] = layer
+        return layer
+
+    def get(self, name, default=None):
+        return self._layers.get(name, default)
+
+    def verify(self):
+        if not self._layers:
+            return self.new("deform")
+        return next(iter(self._layers.values()))
+
+    def remove(self, layer):
+        self._layers.pop(layer.name, None)
+
+    def keys(self):
+        return list(self._layers)
+
+    def values(self):
+        return list(self._layers.values())
+
+    def items(self):
+        return list(self._layers.items())
+
+    def __getitem__(self, name):
+        return self._layers[name]
+
+    def __contains__(self, name):
+        return name in self._layers
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __iter__(self):
+        return iter(self._layers)
+
+
+class BMLayerAccess(object):
+
+    def __init__(self, deform=False):
+        self.int = BMLayerCollection(0)
+        self.float = BMLayerCollection(0.0)
+        self.deform = BMLayerCollection(None) if deform else None
+        self.uv = BMLayerCollection(None)
+        self.color = BMLayerCollection((1.0, 1.0, 1.0))
+
+
+class BMElem(object):
+    __slots__ = ('index', 'select', 'hide', 'tag', 'is_valid', '_data',
+                 '__weakref__')
+
+    def __init__(self):
+        self.index = -1
+        self.select = False
+        self.hide = False
+        self.tag = False
+        self.is_valid = True
+        self._data = None
+
+    def select_set(self, select):
+        if select and self.hide:
+            return
+        self.select = bool(select)
+
+    def hide_set(self, hide):
+        self.hide = bool(hide)
+        if hide:
+            self.select = False
+
+    def __getitem__(self, layer):
+        if self._data is None or layer.name not in self._data:
+            if layer.default is None:
+                # deform layers hand out a mutable dict per element
+                value = {}
+                self[layer] = value
+                return value
+            return layer.default
+        return self._data[layer.name]
+
+    def __setitem__(self, layer, value):
+        if self._data is None:
+            self._data = {}
+        self._data[layer.name] = value
+
+    def copy_from(self, other):
+        self.select = other.select
+        self.hide = other.hide
+        # deform dicts are copied, not shared, as Blender copies them
+        self._data = ({k: dict(v) if isinstance(v, dict) else v
+                       for k, v in other._data.items()}
+                      if other._data else None)
+
+
+class BMVert(BMElem):
+    __slots__ = ('co', 'normal', 'link_edges', 'link_faces')
+
+    def __init__(self, co):
+        BMElem.__init__(self)
+        self.co = Vector(co)
+        self.normal = Vector((0.0, 0.0, 0.0))
+        self.link_edges = []
+        self.link_faces = []
+
+    def __repr__(self):
+        return "<BMVert index={} co={}>".format(self.index, self.co)
+
+    def select_set(self, select):
+        BMElem.select_set(self, select)
+        if not select:
+            for e in self.link_edges:
+                e.select = False
+            for f in self.link_faces:
+                f.select = False
+
+    @property
+    def is_boundary(self):
+        return any(e.is_boundary for e in self.link_edges)
+
+    @property
+    def is_wire(self):
+        return bool(self.link_edges) and not self.link_faces
+
+
+class BMEdge(BMElem):
+    __slots__ = ('verts', 'link_faces', 'smooth', 'seam')
+
+    def __init__(self, v1, v2):
+        BMElem.__init__(self)
+        self.verts = (v1, v2)
+        self.link_faces = []
+        self.smooth = True
+        self.seam = False
+
+    def __repr__(self):
+        return "<BMEdge index={} verts=({}, {})>".format(
+            self.index, self.verts[0].index, self.verts[1].index)
+
+    def other_vert(self, vert):
+        v1, v2 = self.verts
+        if vert is v1:
+            return v2
+        if vert is v2:
+            return v1
+        return None
+
+    def select_set(self, select):
+        if select and self.hide:
+            return
+        BMElem.select_set(self, select)
+        for v in self.verts:
+            if select:
+                v.select_set(True)
+        if not select:
+            for f in self.link_faces:
+                f.select = False
+
+    @property
+    def is_boundary(self):
+        return len(self.link_faces) == 1
+
+    @property
+    def is_wire(self):
+        return not self.link_faces
+
+    @property
+    def is_manifold(self):
+        return len(self.link_faces) == 2
+
+    def calc_length(self):
+        return (self.verts[1].co - self.verts[0].co).length
+
+
+class BMFace(BMElem):
+    __slots__ = ('verts', 'edges', 'material_index', 'smooth', '_bm')
+
+    def __init__(self, bm, verts, edges):
+        BMElem.__init__(self)
+        self._bm = bm
+        self.verts = verts
+        self.edges = edges
+        self.material_index = 0
+        self.smooth = False
+
+    def __repr__(self):
+        return "<BMFace index={} totverts={}>".format(self.index, len(self.verts))
+
+    @property
+    def normal(self):
+        # Newell's method, computed on access instead of cached
+        nx = ny = nz = 0.0
+        cos = [v.co for v in self.verts]
+        prev = cos[-1]
+        for co in cos:
+            nx += (prev[1] - co[1]) * (prev[2] + co[2])
+            ny += (prev[2] - co[2]) * (prev[0] + co[0])
+            nz += (prev[0] - co[0]) * (prev[1] + co[1])
+            prev = co
+        length = (nx * nx + ny * ny + nz * nz) ** 0.5
+        if length == 0.0:
+            return Vector((0.0, 0.0, 0.0))
+        return Vector((nx / length, ny / length, nz / length))
+
+    def normal_update(self):
+        pass
+
+    def calc_center_median(self):
+        n = float(len(self.verts))
+        return Vector([sum(v.co[i] for v in self.verts) / n for i in range(3)])
+
+    def calc_area(self):
+        cos = [v.co for v in self.verts]
+        total = Vector((0.0, 0.0, 0.0))
+        for a, b in zip(cos, cos[1:] + cos[:1]):
+            total += a.cross(b)
+        return total.length / 2.0
+
+    def select_set(self, select):
+        if select and self.hide:
+            return
+        BMElem.select_set(self, select)
+        if select:
+            for e in self.edges:
+                e.select_set(True)
+
+    def copy(self, verts=True, edges=True):
+        bm = self._bm
+        if verts:
+            new_verts = []
+            for v in self.verts:
+                nv = bm.verts.new(v.co, v)
+                new_verts.append(nv)
+        else:
+            new_verts = list(self.verts)
+        face = bm.faces.new(new_verts, self)
+        return face
+
+    def copy_from(self, other):
+        BMElem.copy_from(self, other)
+        self.material_index = other.material_index
+        self.smooth = other.smooth
+
+
+class BMElemSeq(object):
+    """Ordered element storage with O(1) removal."""
+
+    def __init__(self, bm):
+        self._bm = bm
+        self._elems = {}
+        self._table = None
+
+    def __len__(self):
+        return len(self._elems)
+
+    def __iter__(self):
+        return iter(list(self._elems))
+
+    def __getitem__(self, i):
+        if self._table is None:
+            raise IndexError("BMElemSeq[index]: outdated internal index table, "
+                             "run ensure_lookup_table() first")
+        return self._table[i]
+
+    def __contains__(self, elem):
+        return elem in self._elems
+
+    def _add(self, elem):
+        self._elems[elem] = None
+        self._table = None
+        return elem
+
+    def _discard(self, elem):
+        if self._elems.pop(elem, 1) is None:
+            elem.is_valid = False
+            self._table = None
+
+    def ensure_lookup_table(self):
+        if self._table is None:
+            self._table = list(self._elems)
+
+    def index_update(self):
+        for i, elem in enumerate(self._elems):
+            elem.index = i
+
+    def sort(self, key=None, reverse=False):
+        order = sorted(self._elems, key=key, reverse=reverse)
+        self._elems = dict.fromkeys(order)
+        self._table = None
+
+
+class BMVertSeq(BMElemSeq):
+
+    def __init__(self, bm):
+        BMElemSeq.__init__(self, bm)
+        self.layers = BMLayerAccess(deform=True)
+
+    def new(self, co=(0.0, 0.0, 0.0), example=None):
+        v = BMVert(co)
+        if example is not None:
+            v.copy_from(example)
+            v.select = False
+        return self._add(v)
+
+    def remove(self, vert):
+        bm = self._bm
+        for e in list(vert.link_edges):
+            bm.edges.remove(e)
+        self._discard(vert)
+
+
+class BMEdgeSeq(BMElemSeq):
+
+    def __init__(self, bm):
+        BMElemSeq.__init__(self, bm)
+        self.layers = BMLayerAccess()
+
+    def new(self, verts, example=None):
+        v1, v2 = verts
+        e = BMEdge(v1, v2)
+        if example is not None:
+            e.copy_from(example)
+        v1.link_edges.append(e)
+        v2.link_edges.append(e)
+        return self._add(e)
+
+    def get(self, verts, fallback=None):
+        v1, v2 = verts
+        for e in v1.link_edges:
+            if e.other_vert(v1) is v2:
+                return e
+        return fallback
+
+    def remove(self, edge):
+        bm = self._bm
+        for f in list(edge.link_faces):
+            bm.faces.remove(f)
+        for v in edge.verts:
+            v.link_edges.remove(edge)
+        self._discard(edge)
+
+
+class BMFaceSeq(BMElemSeq):
+
+    def __init__(self, bm):
+        BMElemSeq.__init__(self, bm)
+        self.layers = BMLayerAccess()
+
+    def new(self, verts, example=None):
+        verts = list(verts)
+        edges = []
+        n = len(verts)
+        for i in range(n):
+            a, b = verts[i], verts[(i + 1) % n]
+            e = self._bm.edges.get((a, b))
+            if e is None:
+                e = self._bm.edges.new((a, b))
+            edges.append(e)
+        face = BMFace(self._bm, verts, edges)
+        if example is not None:
+            face.copy_from(example)
+            face.select = False
+        self._link(face)
+        return self._add(face)
+
+    def _link(self, face):
+        for e in face.edges:
+            e.link_faces.append(face)
+        for v in face.verts:
+            v.link_faces.append(face)
+
+    def _unlink(self, face):
+        for e in face.edges:
+            if face in e.link_faces:
+                e.link_faces.remove(face)
+        for v in face.verts:
+            if face in v.link_faces:
+                v.link_faces.remove(face)
+
+    def get(self, verts, fallback=None):
+        verts = list(verts)
+        target = set(verts)
+        for f in verts[0].link_faces:
+            if len(f.verts) == len(verts) and set(f.verts) == target:
+                return f
+        return fallback
+
+    def remove(self, face):
+        self._unlink(face)
+        self._discard(face)
+
+
+class BMLoopSeq(object):
+    """Only the layer access, loops themselves are not modelled."""
+
+    def __init__(self):
+        self.layers = BMLayerAccess()
+
+
+class BMesh(object):
+
+    def __init__(self):
+        self.verts = BMVertSeq(self)
+        self.edges = BMEdgeSeq(self)
+        self.faces = BMFaceSeq(self)
+        self.loops = BMLoopSeq()
+        self.select_mode = {'VERT'}
+        self.select_history = []
+        self.is_valid = True
+
+    def free(self):
+        self.verts = self.edges = self.faces = None
+        self.is_valid = False
+
+    def clear(self):
+        self.__init__()
+
+    def copy(self):
+        other = BMesh()
+        for name in ('verts', 'edges', 'faces', 'loops'):
+            mine = getattr(self, name).layers
+            theirs = getattr(other, name).layers
+            for kind in ('int', 'float', 'deform', 'uv', 'color'):
+                if getattr(mine, kind) is not None:
+                    getattr(theirs, kind)._layers.update(
+                        getattr(mine, kind)._layers)
+        vmap = {}
+        for v in self.verts:
+            nv = other.verts.new(v.co, v)
+            nv.index = v.index
+            nv.select = v.select
+            vmap[v] = nv
+        for e in self.edges:
+            ne = other.edges.new((vmap[e.verts[0]], vmap[e.verts[1]]), e)
+            ne.index = e.index
+        for f in self.faces:
+            nf = other.faces.new([vmap[v] for v in f.verts], f)
+            nf.index = f.index
+            nf.select = f.select
+        return other
+
+    def select_flush_mode(self):
+        if 'VERT' in self.select_mode:
+            self.select_flush(True)
+        else:
+            for e in self.edges:
+                if e.select:
+                    for v in e.verts:
+                        v.select = True
+            for f in self.faces:
+                if f.select:
+                    for v in f.verts:
+                        v.select = True
+
+    def select_flush(self, select):
+        if select:
+            for e in self.edges:
+                if not e.hide and e.verts[0].select and e.verts[1].select:
+                    e.select = True
+            for f in self.faces:
+                if not f.hide and all(v.select for v in f.verts):
+                    f.select = True
+        else:
+            for e in self.edges:
+                if e.select and not (e.verts[0].select and e.verts[1].select):
+                    e.select = False
+            for f in self.faces:
+                if f.select and not all(v.select for v in f.verts):
+                    f.select = False
+
+    def normal_update(self):
+        for v in self.verts:
+            total = Vector((0.0, 0.0, 0.0))
+            for f in v.link_faces:
+                total += f.normal
+            v.normal = total.normalized()
+
+    def from_mesh(self, mesh, face_normals=True, use_shape_key=False,
+                  shape_key_index=0):
+        mesh._to_bmesh(self)
+
+    def to_mesh(self, mesh):
+        mesh._from_bmesh(self)
+
+
+class BMEditSelSeq(list):
+    pass
+
+
+class BMIter(object):
+    pass
@@ -0,0 +1,879 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# headless stand-in for bpy
+
+"""Just enough of ``bpy`` to register and run the add-on operators.
+
+Meshes are backed by NumPy arrays so ``foreach_get``/``foreach_set`` and
+``from_pydata`` behave like the real RNA collections.  Properties
+declared with ``bpy.props`` resolve to their defaults on the class, and
+tests or benchmarks override them per instance.
+"""
+
+import sys
+import types as _types
+
+import numpy as np
+
+from mathutils import Matrix, Vector
+
+
+# ---------------------------------------------------------------- props
+
+def _prop(default):
+    def factory(**kwargs):
+        return kwargs.get('default', default)
+    return factory
+
+
+props = _types.SimpleNamespace(
+    BoolProperty=_prop(False),
+    IntProperty=_prop(0),
+    FloatProperty=_prop(0.0),
+    StringProperty=_prop(""),
+    EnumProperty=_prop(None),
+    FloatVectorProperty=_prop((0.0, 0.0, 0.0)),
+    IntVectorProperty=_prop((0, 0, 0)),
+    PointerProperty=_prop(None),
+    CollectionProperty=_prop(None))
+
+
+# ---------------------------------------------------------------- types
+
+class Operator(object):
+    bl_idname = ""
+    bl_label = ""
+    bl_options = set()
+
+    def __init__(self, **kwargs):
+        self.reports = []
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def report(self, type, message):
+        self.reports.append((set(type), message))
+
+
+class _ID(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.users = 0
+
+    def as_pointer(self):
+        return id(self)
+
+
+# ---------------------------------------------------------------- mesh
+
+class _Item(object):
+    __slots__ = ('_owner', 'index')
+
+    def __init__(self, owner, index):
+        self._owner = owner
+        self.index = index
+
+
+class MeshVertex(_Item):
+    __slots__ = ()
+
+    @property
+    def co(self):
+        return Vector(self._owner._co[self.index])
+
+    @co.setter
+    def co(self, value):
+        self._owner._co[self.index] = value
+
+    @property
+    def select(self):
+        return bool(self._owner._vsel[self.index])
+
+    @select.setter
+    def select(self, value):
+        self._owner._vsel[self.index] = value
+
+    @property
+    def hide(self):
+        return bool(self._owner._vhide[self.index])
+
+    @property
+    def groups(self):
+        dvert = self._owner._dvert.get(self.index, {})
+        return [_types.SimpleNamespace(group=g, weight=w)
+                for g, w in sorted(dvert.items())]
+
+
+class MeshPolygon(_Item):
+    __slots__ = ()
+
+    @property
+    def vertices(self):
+        m = self._owner
+        s = m._loop_start[self.index]
+        return [int(i) for i in m._loop_vi[s:s + m._loop_total[self.index]]]
+
+    @property
+    def loop_start(self):
+        return int(self._owner._loop_start[self.index])
+
+    @property
+    def loop_total(self):
+        return int(self._owner._loop_total[self.index])
+
+    @property
+    def material_index(self):
+        return int(self._owner._mat[self.index])
+
+    @material_index.setter
+    def material_index(self, value):
+        self._owner._mat[self.index] = value
+
+    @property
+    def use_smooth(self):
+        return bool(self._owner._smooth[self.index])
+
+    @use_smooth.setter
+    def use_smooth(self, value):
+        self._owner._smooth[self.index] = value
+
+    @property
+    def select(self):
+        return bool(self._owner._psel[self.index])
+
+    @select.setter
+    def select(self, value):
+        self._owner._psel[self.index] = value
+
+    @property
+    def hide(self):
+        return bool(self._owner._phide[self.index])
+
+    @property
+    def normal(self):
+        return Vector(self._owner._poly_normals()[self.index])
+
+
+class MeshEdge(_Item):
+    __slots__ = ()
+
+    @property
+    def vertices(self):
+        return [int(i) for i in self._owner._edges[self.index]]
+
+    @property
+    def select(self):
+        return bool(self._owner._esel[self.index])
+
+    @select.setter
+    def select(self, value):
+        self._owner._esel[self.index] = value
+
+
+class _Collection(object):
+    # attribute name -> (array name, components)
+    _attrs = {}
+    # attribute name -> dtype of data the stand-in does not keep
+    _unmodelled = {}
+    _item = _Item
+
+    def __init__(self, mesh, length_attr):
+        self._mesh = mesh
+        self._length_attr = length_attr
+
+    def __len__(self):
+        return len(getattr(self._mesh, self._length_attr))
+
+    def __iter__(self):
+        return (self._item(self._mesh, i) for i in range(len(self)))
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._item(self._mesh, i)
+
+    def _array(self, attr):
+        if attr == 'normal':
+            return self._mesh._normals_for(self)
+        if attr in self._unmodelled:
+            # read as zeros, writes are dropped
+            return np.zeros(len(self), self._unmodelled[attr])
+        return getattr(self._mesh, self._attrs[attr])
+
+    def foreach_get(self, attr, seq):
+        values = np.asarray(self._array(attr)).ravel()
+        if isinstance(seq, np.ndarray):
+            seq[:] = values.astype(seq.dtype)
+        else:
+            seq[:] = values.tolist()
+
+    def foreach_set(self, attr, seq):
+        arr = self._array(attr)
+        values = np.asarray(seq, dtype=arr.dtype)
+        if values.size != arr.size:
+            raise RuntimeError("internal error setting the array")
+        arr.reshape(-1)[:] = values.ravel()
+        self._mesh._normals = None
+
+    def add(self, count):
+        self._mesh._grow(self, int(count))
+
+
+class MeshVertices(_Collection):
+    _attrs = {'co': '_co', 'select': '_vsel', 'hide': '_vhide'}
+    _unmodelled = {'bevel_weight': np.float32}
+    _item = MeshVertex
+
+
+class MeshEdges(_Collection):
+    _attrs = {'vertices': '_edges', 'select': '_esel', 'hide': '_ehide'}
+    _unmodelled = {'use_seam': bool, 'use_edge_sharp': bool,
+                   'crease': np.float32, 'bevel_weight': np.float32}
+    _item = MeshEdge
+
+
+class MeshLoops(_Collection):
+    _attrs = {'vertex_index': '_loop_vi', 'edge_index': '_loop_ei'}
+
+
+class MeshPolygons(_Collection):
+    _attrs = {'loop_start': '_loop_start', 'loop_total': '_loop_total',
+              'material_index': '_mat', 'use_smooth': '_smooth',
+              'hide': '_phide', 'select': '_psel'}
+    _item = MeshPolygon
+
+
+class _IntLayerData(object):
+
+    def __init__(self, mesh, name):
+        self._mesh = mesh
+        self._name = name
+
+    def __len__(self):
+        return len(self._mesh._int_layers[self._name])
+
+    def __getitem__(self, i):
+        return _types.SimpleNamespace(value=int(self._mesh._int_layers[self._name][i]))
+
+    def foreach_get(self, attr, seq):
+        seq[:] = self._mesh._int_layers[self._name]
+
+    def foreach_set(self, attr, seq):
+        self._mesh._int_layers[self._name][:] = seq
+
+
+class _IntLayer(object):
+
+    def __init__(self, mesh, name):
+        self.name = name
+        self.data = _IntLayerData(mesh, name)
+
+
+class PolygonIntLayers(object):
+
+    def __init__(self, mesh):
+        self._mesh = mesh
+
+    def new(self, name="Int"):
+        self._mesh._int_layers[name] = np.zeros(len(self._mesh._mat), np.int32)
+        return _IntLayer(self._mesh, name)
+
+    def get(self, name, default=None):
+        if name in self._mesh._int_layers:
+            return _IntLayer(self._mesh, name)
+        return default
+
+    def __getitem__(self, name):
+        if name not in self._mesh._int_layers:
+            raise KeyError(name)
+        return _IntLayer(self._mesh, name)
+
+    def __contains__(self, name):
+        return name in self._mesh._int_layers
+
+    def __len__(self):
+        return len(self._mesh._int_layers)
+
+    def keys(self):
+        return list(self._mesh._int_layers)
+
+    def __iter__(self):
+        return (_IntLayer(self._mesh, name) for name in self._mesh._int_layers)
+
+
+class IDMaterials(list):
+
+    def append(self, material):
+        list.append(self, material)
+        if material is not None:
+            material.users += 1
+
+    def pop(self, index=-1, update_data=False):
+        return list.pop(self, index)
+
+
+class Mesh(_ID):
+
+    def __init__(self, name):
+        _ID.__init__(self, name)
+        self.materials = IDMaterials()
+        self.use_auto_smooth = False
+        self.auto_smooth_angle = 0.523599
+        self.show_double_sided = True
+        self._clear()
+        self.vertices = MeshVertices(self, '_co')
+        self.edges = MeshEdges(self, '_edges')
+        self.loops = MeshLoops(self, '_loop_vi')
+        self.polygons = MeshPolygons(self, '_mat')
+        self.polygon_layers_int = PolygonIntLayers(self)
+        self.uv_layers = []
+        self.vertex_colors = []
+        self.vertex_layers_int = []
+        self.vertex_layers_float = []
+        self.polygon_layers_float = []
+        self.has_custom_normals = False
+
+    def _clear(self):
+        self._co = np.zeros((0, 3), np.float32)
+        self._vsel = np.zeros(0, bool)
+        self._vhide = np.zeros(0, bool)
+        self._edges = np.zeros((0, 2), np.int32)
+        self._esel = np.zeros(0, bool)
+        self._ehide = np.zeros(0, bool)
+        self._loop_vi = np.zeros(0, np.int32)
+        self._loop_ei = np.zeros(0, np.int32)
+        self._loop_start = np.zeros(0, np.int32)
+        self._loop_total = np.zeros(0, np.int32)
+        self._mat = np.zeros(0, np.int16)
+        self._smooth = np.zeros(0, bool)
+        self._phide = np.zeros(0, bool)
+        self._psel = np.zeros(0, bool)
+        self._int_layers = {}
+        self._dvert = {}
+        self._normals = None
+
+    def _grow(self, collection, count):
+        def pad(arr, n):
+            extra = np.zeros((n,) + arr.shape[1:], arr.dtype)
+            return np.concatenate([arr, extra])
+        if collection is self.vertices:
+            self._co = pad(self._co, count)
+            self._vsel = pad(self._vsel, count)
+            self._vhide = pad(self._vhide, count)
+        elif collection is self.edges:
+            self._edges = pad(self._edges, count)
+            self._esel = pad(self._esel, count)
+            self._ehide = pad(self._ehide, count)
+        elif collection is self.loops:
+            self._loop_vi = pad(self._loop_vi, count)
+            self._loop_ei = pad(self._loop_ei, count)
+        elif collection is self.polygons:
+            self._loop_start = pad(self._loop_start, count)
+            self._loop_total = pad(self._loop_total, count)
+            self._mat = pad(self._mat, count)
+            self._smooth = pad(self._smooth, count)
+            self._phide = pad(self._phide, count)
+            self._psel = pad(self._psel, count)
+            for name in self._int_layers:
+                self._int_layers[name] = pad(self._int_layers[name], count)
+        self._normals = None
+
+    def _poly_normals(self):
+        if self._normals is None:
+            co = self._co.astype(np.float64)
+            n = np.zeros((len(self._mat), 3))
+            if len(self._loop_vi):
+                poly = np.repeat(np.arange(len(self._mat)), self._loop_total)
+                nxt = np.arange(len(self._loop_vi)) + 1
+                ends = self._loop_start + self._loop_total
+                nxt[ends - 1] = self._loop_start
+                a = co[self._loop_vi]
+                b = co[self._loop_vi[nxt]]
+                np.add.at(n, poly, np.cross(a, b))
+            length = np.linalg.norm(n, axis=1)
+            length[length == 0.0] = 1.0
+            self._normals = (n / length[:, None]).astype(np.float32)
+        return self._normals
+
+    def _normals_for(self, collection):
+        if collection is self.polygons:
+            return self._poly_normals()
+        normals = np.zeros((len(self._co), 3), np.float32)
+        if len(self._loop_vi):
+            poly = np.repeat(np.arange(len(self._mat)), self._loop_total)
+            np.add.at(normals, self._loop_vi, self._poly_normals()[poly])
+            length = np.linalg.norm(normals, axis=1)
+            length[length == 0.0] = 1.0
+            normals /= length[:, None]
+        return normals
+
+    def from_pydata(self, vertices, edges, faces):
+        self._clear()
+        self._co = np.asarray(vertices, np.float32).reshape(-1, 3)
+        self._vsel = np.zeros(len(self._co), bool)
+        self._vhide = np.zeros(len(self._co), bool)
+        faces = [list(f) for f in faces]
+        self._loop_total = np.array([len(f) for f in faces], np.int32)
+        self._loop_start = np.zeros(len(faces), np.int32)
+        if len(faces):
+            self._loop_start[1:] = np.cumsum(self._loop_total)[:-1]
+        self._loop_vi = np.array([i for f in faces for i in f], np.int32)
+        self._mat = np.zeros(len(faces), np.int16)
+        self._smooth = np.zeros(len(faces), bool)
+        self._phide = np.zeros(len(faces), bool)
+        self._psel = np.zeros(len(faces), bool)
+        self._edges = np.asarray(edges, np.int32).reshape(-1, 2)
+        self._esel = np.zeros(len(self._edges), bool)
+        self._ehide = np.zeros(len(self._edges), bool)
+        self.update(calc_edges=True)
+
+    def update(self, calc_edges=False, calc_edges_loose=False,
+               calc_loop_triangles=False):
+        self._normals = None
+        if calc_edges:
+            seen = {}
+            for a, b in self._edges.tolist():
+                seen.setdefault((min(a, b), max(a, b)), (a, b))
+            vi = self._loop_vi.tolist()
+            keys = []
+            for s, t in zip(self._loop_start.tolist(), self._loop_total.tolist()):
+                for k in range(t):
+                    a, b = vi[s + k], vi[s + (k + 1) % t]
+                    keys.append((min(a, b), max(a, b)))
+                    seen.setdefault(keys[-1], (a, b))
+            order = {key: i for i, key in enumerate(seen)}
+            self._loop_ei = np.array([order[key] for key in keys], np.int32)
+            # existing edges come first and keep their flags
+            extra = len(seen) - len(self._edges)
+            self._edges = np.array(list(seen.values()), np.int32).reshape(-1, 2)
+            self._esel = np.concatenate([self._esel, np.zeros(extra, bool)])
+            self._ehide = np.concatenate([self._ehide, np.zeros(extra, bool)])
+
+    def validate(self, verbose=False, clean_customdata=True):
+        return False
+
+    def transform(self, matrix):
+        m = np.array([list(row) for row in matrix], np.float64)
+        co = np.c_[self._co, np.ones(len(self._co))]
+        self._co = (co @ m.T)[:, :3].astype(np.float32)
+        self._normals = None
+
+    def copy(self):
+        other = Mesh(self.name)
+        for key, value in self.__dict__.items():
+            if isinstance(value, np.ndarray):
+                setattr(other, key, value.copy())
+        other._int_layers = {k: v.copy() for k, v in self._int_layers.items()}
+        other._dvert = {k: dict(v) for k, v in self._dvert.items()}
+        other.materials = IDMaterials(self.materials)
+        return other
+
+    # conversion used by the bmesh stand-in
+
+    def _to_bmesh(self, bm):
+        verts = []
+        for i, (co, sel, hide) in enumerate(zip(self._co.tolist(),
+                                                self._vsel.tolist(),
+                                                self._vhide.tolist())):
+            v = bm.verts.new(co)
+            v.index = i
+            v.select = sel
+            v.hide = hide
+            verts.append(v)
+        if self._dvert:
+            deform = bm.verts.layers.deform.verify()
+            for i, groups in self._dvert.items():
+                verts[i][deform] = dict(groups)
+        for i, (a, b) in enumerate(self._edges.tolist()):
+            e = bm.edges.new((verts[a], verts[b]))
+            e.index = i
+            e.select = verts[a].select and verts[b].select
+            e.hide = bool(self._ehide[i])
+        layers = [(bm.faces.layers.int.get(name) or
+                   bm.faces.layers.int.new(name), values.tolist())
+                  for name, values in self._int_layers.items()]
+        vi = self._loop_vi.tolist()
+        for i, (s, t, mat, smooth, sel, hide) in enumerate(zip(
+                self._loop_start.tolist(), self._loop_total.tolist(),
+                self._mat.tolist(), self._smooth.tolist(),
+                self._psel.tolist(), self._phide.tolist())):
+            f = bm.faces.new([verts[k] for k in vi[s:s + t]])
+            f.index = i
+            f.material_index = mat
+            f.smooth = smooth
+            f.select = sel
+            f.hide = hide
+            for layer, values in layers:
+                f[layer] = values[i]
+        bm.edges.index_update()
+
+    def _from_bmesh(self, bm):
+        bm.verts.index_update()
+        verts = list(bm.verts)
+        edges = list(bm.edges)
+        faces = list(bm.faces)
+        self._clear()
+        self._co = np.array([tuple(v.co) for v in verts],
+                            np.float32).reshape(-1, 3)
+        self._vsel = np.array([v.select for v in verts], bool)
+        self._vhide = np.array([v.hide for v in verts], bool)
+        self._edges = np.array([(e.verts[0].index, e.verts[1].index)
+                                for e in edges], np.int32).reshape(-1, 2)
+        self._esel = np.array([e.select for e in edges], bool)
+        self._ehide = np.array([e.hide for e in edges], bool)
+        totals = [len(f.verts) for f in faces]
+        self._loop_total = np.array(totals, np.int32)
+        self._loop_start = np.zeros(len(faces), np.int32)
+        if faces:
+            self._loop_start[1:] = np.cumsum(self._loop_total)[:-1]
+        self._loop_vi = np.array([v.index for f in faces for v in f.verts],
+                                 np.int32)
+        order = {e: i for i, e in enumerate(edges)}
+        self._loop_ei = np.array([order[e] for f in faces for e in f.edges],
+                                 np.int32)
+        self._mat = np.array([f.material_index for f in faces], np.int16)
+        self._smooth = np.array([f.smooth for f in faces], bool)
+        self._psel = np.array([f.select for f in faces], bool)
+        self._phide = np.array([f.hide for f in faces], bool)
+        for name, layer in bm.faces.layers.int.items():
+            self._int_layers[name] = np.array([f[layer] for f in faces],
+                                              np.int32)
+        deform = bm.verts.layers.deform.get("deform")
+        if deform is not None:
+            for v in verts:
+                groups = v[deform]
+                if groups:
+                    self._dvert[v.index] = dict(groups)
+
+
+# ---------------------------------------------------------------- objects
+
+class Modifier(object):
+
+    def __init__(self, name, type):
+        self.name = name
+        self.type = type
+        self.show_viewport = True
+        self.show_render = True
+        self.show_in_editmode = False
+
+
+class ObjectModifiers(list):
+
+    def new(self, name, type):
+        mod = Modifier(_unique_name(name, [m.name for m in self]), type)
+        self.append(mod)
+        return mod
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for m in self:
+                if m.name == key:
+                    return m
+            raise KeyError(key)
+        return list.__getitem__(self, key)
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            return any(m.name == key for m in self)
+        return list.__contains__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def remove(self, mod):
+        list.remove(self, mod)
+
+
+class VertexGroup(object):
+
+    def __init__(self, obj, name, index):
+        self._object = obj
+        self.name = name
+        self.index = index
+
+    def add(self, index, weight, type):
+        dvert = self._object.data._dvert
+        for i in index:
+            groups = dvert.setdefault(int(i), {})
+            if type == 'ADD':
+                groups[self.index] = min(1.0, groups.get(self.index, 0.0) + weight)
+            elif type == 'REPLACE' or self.index not in groups:
+                groups[self.index] = weight
+
+    def remove(self, index):
+        dvert = self._object.data._dvert
+        for i in index:
+            dvert.get(int(i), {}).pop(self.index, None)
+
+    def weight(self, index):
+        groups = self._object.data._dvert.get(index, {})
+        if self.index not in groups:
+            raise RuntimeError("Vertex not in group")
+        return groups[self.index]
+
+
+class VertexGroups(list):
+
+    def __init__(self, obj):
+        list.__init__(self)
+        self._object = obj
+
+    def new(self, name="Group"):
+        group = VertexGroup(self._object,
+                            _unique_name(name, [g.name for g in self]),
+                            len(self))
+        self.append(group)
+        return group
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for g in self:
+                if g.name == key:
+                    return g
+            raise KeyError(key)
+        return list.__getitem__(self, key)
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            return any(g.name == key for g in self)
+        return list.__contains__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class Object(_ID):
+
+    def __init__(self, name, data):
+        _ID.__init__(self, name)
+        self._data = data
+        self.type = 'MESH' if isinstance(data, Mesh) else 'EMPTY'
+        self.modifiers = ObjectModifiers()
+        self.vertex_groups = VertexGroups(self)
+        self.matrix_basis = Matrix.Identity(4)
+        self.matrix_world = Matrix.Identity(4)
+        self.matrix_parent_inverse = Matrix.Identity(4)
+        self.location = Vector((0.0, 0.0, 0.0))
+        self.parent = None
+        self.select = False
+        self.hide = False
+        self.dupli_type = 'NONE'
+        self.show_name = False
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        if self._data is not None:
+            self._data.users -= 1
+        value.users += 1
+        self._data = value
+
+
+# ---------------------------------------------------------------- data
+
+def _unique_name(name, taken):
+    taken = set(taken)
+    if name not in taken:
+        return name
+    i = 1
+    while "{}.{:03d}".format(name, i) in taken:
+        i += 1
+    return "{}.{:03d}".format(name, i)
+
+
+class _IDCollection(object):
+    _type = _ID
+
+    def __init__(self):
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._items.values())[key]
+        return self._items[key]
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        return self._items.get(key, default)
+
+    def keys(self):
+        return list(self._items)
+
+    def _register(self, item):
+        item.name = _unique_name(item.name, self._items)
+        self._items[item.name] = item
+        return item
+
+    def new(self, name):
+        return self._register(self._type(name))
+
+    def remove(self, item, do_unlink=True):
+        self._items.pop(item.name, None)
+
+
+class _Material(_ID):
+    pass
+
+
+class BlendDataMaterials(_IDCollection):
+    _type = _Material
+
+
+class BlendDataMeshes(_IDCollection):
+    _type = Mesh
+
+
+class BlendDataObjects(_IDCollection):
+
+    def new(self, name, object_data):
+        obj = self._register(Object(name, object_data))
+        if object_data is not None:
+            object_data.users += 1
+        return obj
+
+
+class BlendData(object):
+
+    def __init__(self):
+        self.objects = BlendDataObjects()
+        self.meshes = BlendDataMeshes()
+        self.materials = BlendDataMaterials()
+
+
+# ---------------------------------------------------------------- context
+
+class SceneObjects(list):
+
+    def __init__(self, scene):
+        list.__init__(self)
+        self._scene = scene
+        self.active = None
+
+    def link(self, obj):
+        self.append(obj)
+        return obj
+
+    def unlink(self, obj):
+        self.remove(obj)
+
+
+class Scene(object):
+
+    def __init__(self, name="Scene"):
+        self.name = name
+        self.objects = SceneObjects(self)
+        self.camera = None
+        self.cursor_location = Vector((0.0, 0.0, 0.0))
+
+
+class WindowManager(object):
+
+    def __init__(self):
+        self.progress = None
+        self.timers = []
+        self.handlers = []
+        self.popups = []
+
+    def popup_menu(self, draw_func, title="", icon='NONE'):
+        self.popups.append(title)
+
+    def progress_begin(self, minimum, maximum):
+        self.progress = minimum
+
+    def progress_update(self, value):
+        self.progress = value
+
+    def progress_end(self):
+        self.progress = None
+
+    def event_timer_add(self, time_step, window=None):
+        timer = _types.SimpleNamespace(time_step=time_step)
+        self.timers.append(timer)
+        return timer
+
+    def event_timer_remove(self, timer):
+        if timer in self.timers:
+            self.timers.remove(timer)
+
+    def modal_handler_add(self, operator):
+        self.handlers.append(operator)
+        return True
+
+
+class Context(object):
+
+    def __init__(self):
+        self.scene = Scene()
+        self.window_manager = WindowManager()
+        self.window = object()
+        self.area = None
+        self.mode = 'OBJECT'
+
+    @property
+    def object(self):
+        return self.scene.objects.active
+
+    @property
+    def active_object(self):
+        return self.scene.objects.active
+
+    @property
+    def selected_objects(self):
+        return [o for o in self.scene.objects if o.select]
+
+
+data = BlendData()
+context = Context()
+
+
+def _shade(smooth):
+    def op():
+        for obj in context.selected_objects or [context.object]:
+            if obj is not None and isinstance(obj.data, Mesh):
+                obj.data._smooth[:] = smooth
+        return {'FINISHED'}
+    return op
+
+
+ops = _types.SimpleNamespace(
+    object=_types.SimpleNamespace(shade_smooth=_shade(True),
+                                  shade_flat=_shade(False)))
+
+app = _types.SimpleNamespace(
+    handlers=_types.SimpleNamespace(load_pre=[], persistent=lambda f: f),
+    version=(2, 79, 0),
+    background=True,
+    binary_path_python=sys.executable)
+
+utils = _types.SimpleNamespace(
+    register_class=lambda cls: None,
+    unregister_class=lambda cls: None)
+
+types = _types.SimpleNamespace(
+    Operator=Operator, Mesh=Mesh, Object=Object, Panel=object, Menu=object)
+
+
+def reset():
+    """Drop all data-blocks and start from an empty scene."""
+    global data, context
+    data.__init__()
+    context.__init__()
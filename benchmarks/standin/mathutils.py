@@ -0,0 +1,389 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# headless stand-in for mathutils
+
+"""Pure-Python subset of mathutils used by the add-on modules.
+
+Only what the operators touch is implemented: Vector, Matrix (3x3 and
+4x4), Euler and Quaternion.  Values are kept in double precision, so
+results can differ from Blender in the last float32 bits.
+"""
+
+import math
+
+
+class Vector(object):
+    __slots__ = ('_v',)
+
+    def __init__(self, seq=(0.0, 0.0, 0.0)):
+        self._v = [float(c) for c in seq]
+
+    def __len__(self):
+        return len(self._v)
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self._v[i])
+        return self._v[i]
+
+    def __setitem__(self, i, value):
+        self._v[i] = float(value)
+
+    def __repr__(self):
+        return "Vector(({}))".format(", ".join("%.4f" % c for c in self._v))
+
+    def __eq__(self, other):
+        try:
+            return list(self._v) == [float(c) for c in other]
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def _get(i):
+        return property(lambda self: self._v[i],
+                        lambda self, value: self._v.__setitem__(i, float(value)))
+
+    x = _get(0)
+    y = _get(1)
+    z = _get(2)
+    w = _get(3)
+    del _get
+
+    def __add__(self, other):
+        return Vector([a + b for a, b in zip(self._v, other)])
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return Vector([a - b for a, b in zip(self._v, other)])
+
+    def __rsub__(self, other):
+        return Vector([b - a for a, b in zip(self._v, other)])
+
+    def __neg__(self):
+        return Vector([-a for a in self._v])
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return Vector([a * other for a in self._v])
+        if isinstance(other, Vector):
+            return self.dot(other)
+        return NotImplemented
+
+    def __rmul__(self, other):
+        if isinstance(other, (int, float)):
+            return Vector([a * other for a in self._v])
+        return NotImplemented
+
+    def __truediv__(self, other):
+        return Vector([a / other for a in self._v])
+
+    def __iadd__(self, other):
+        self._v = [a + b for a, b in zip(self._v, other)]
+        return self
+
+    def __isub__(self, other):
+        self._v = [a - b for a, b in zip(self._v, other)]
+        return self
+
+    def copy(self):
+        return Vector(self._v)
+
+    def to_tuple(self):
+        return tuple(self._v)
+
+    def to_3d(self):
+        return Vector((self._v + [0.0, 0.0, 0.0])[:3])
+
+    def to_4d(self):
+        return Vector((self._v + [0.0, 0.0, 0.0])[:3] + [1.0])
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self._v, other))
+
+    def cross(self, other):
+        a, b = self._v, list(other)
+        return Vector((a[1]*b[2] - a[2]*b[1],
+                       a[2]*b[0] - a[0]*b[2],
+                       a[0]*b[1] - a[1]*b[0]))
+
+    @property
+    def length(self):
+        return math.sqrt(sum(a * a for a in self._v))
+
+    def normalized(self):
+        length = self.length
+        if length == 0.0:
+            return self.copy()
+        return Vector([a / length for a in self._v])
+
+    def normalize(self):
+        self._v = list(self.normalized())
+
+    def to_track_quat(self, track='Y', up='Z'):
+        """Port of vec_to_quat() from BLI_math_rotation.c."""
+        axis = {'X': 0, 'Y': 1, 'Z': 2, '-X': 3, '-Y': 4, '-Z': 5}[track]
+        upflag = {'X': 0, 'Y': 1, 'Z': 2}[up]
+        vec = [-c for c in self._v[:3]]
+        return Quaternion(_vec_to_quat(vec, axis, upflag))
+
+
+def _saacos(fac):
+    if fac <= -1.0:
+        return math.pi
+    if fac >= 1.0:
+        return 0.0
+    return math.acos(fac)
+
+
+def _qt_mul(a, b):
+    return (a[0]*b[0] - a[1]*b[1] - a[2]*b[2] - a[3]*b[3],
+            a[0]*b[1] + a[1]*b[0] + a[2]*b[3] - a[3]*b[2],
+            a[0]*b[2] + a[2]*b[0] + a[3]*b[1] - a[1]*b[3],
+            a[0]*b[3] + a[3]*b[0] + a[1]*b[2] - a[2]*b[1])
+
+
+def _vec_to_quat(vec, axis, upflag):
+    eps = 1e-4
+    q = (1.0, 0.0, 0.0, 0.0)
+    length = math.sqrt(sum(c * c for c in vec))
+    if length == 0.0:
+        return q
+    if axis > 2:
+        tvec = list(vec)
+        axis -= 3
+    else:
+        tvec = [-c for c in vec]
+    if axis == 0:
+        nor = [0.0, -tvec[2], tvec[1]]
+        if abs(tvec[1]) + abs(tvec[2]) < eps:
+            nor[1] = 1.0
+        co = tvec[0]
+    elif axis == 1:
+        nor = [tvec[2], 0.0, -tvec[0]]
+        if abs(tvec[0]) + abs(tvec[2]) < eps:
+            nor[2] = 1.0
+        co = tvec[1]
+    else:
+        nor = [-tvec[1], tvec[0], 0.0]
+        if abs(tvec[0]) + abs(tvec[1]) < eps:
+            nor[0] = 1.0
+        co = tvec[2]
+    co /= length
+    nlen = math.sqrt(sum(c * c for c in nor))
+    nor = [c / nlen for c in nor]
+    angle = _saacos(co)
+    si = math.sin(angle / 2.0)
+    q = (math.cos(angle / 2.0), nor[0] * si, nor[1] * si, nor[2] * si)
+    if axis != upflag:
+        fp = Quaternion(q).to_matrix()._m
+        # mat[2] in C is the third column of the row-major matrix here
+        fp = [fp[0][2], fp[1][2], fp[2][2]]
+        if axis == 0:
+            if upflag == 1:
+                angle = 0.5 * math.atan2(fp[2], fp[1])
+            else:
+                angle = -0.5 * math.atan2(fp[1], fp[2])
+        elif axis == 1:
+            if upflag == 0:
+                angle = -0.5 * math.atan2(fp[2], fp[0])
+            else:
+                angle = 0.5 * math.atan2(fp[0], fp[2])
+        else:
+            if upflag == 0:
+                angle = 0.5 * math.atan2(-fp[1], -fp[0])
+            else:
+                angle = -0.5 * math.atan2(-fp[0], -fp[1])
+        co = math.cos(angle)
+        si = math.sin(angle) / length
+        q2 = (co, tvec[0] * si, tvec[1] * si, tvec[2] * si)
+        q = _qt_mul(q2, q)
+    return q
+
+
+class Quaternion(object):
+    __slots__ = ('_q',)
+
+    def __init__(self, seq=(1.0, 0.0, 0.0, 0.0)):
+        self._q = tuple(float(c) for c in seq)
+
+    def __iter__(self):
+        return iter(self._q)
+
+    def __getitem__(self, i):
+        return self._q[i]
+
+    def to_matrix(self):
+        w, x, y, z = self._q
+        return Matrix((
+            (1 - 2*(y*y + z*z), 2*(x*y - w*z), 2*(x*z + w*y)),
+            (2*(x*y + w*z), 1 - 2*(x*x + z*z), 2*(y*z - w*x)),
+            (2*(x*z - w*y), 2*(y*z + w*x), 1 - 2*(x*x + y*y))))
+
+
+class Euler(object):
+    __slots__ = ('_e', 'order')
+
+    def __init__(self, seq=(0.0, 0.0, 0.0), order='XYZ'):
+        self._e = tuple(float(c) for c in seq)
+        self.order = order
+
+    def __getitem__(self, i):
+        return self._e[i]
+
+    def to_matrix(self):
+        x, y, z = self._e
+        rx = Matrix.Rotation(x, 3, 'X')
+        ry = Matrix.Rotation(y, 3, 'Y')
+        rz = Matrix.Rotation(z, 3, 'Z')
+        return rz * ry * rx
+
+    def to_quaternion(self):
+        m = self.to_matrix()._m
+        trace = m[0][0] + m[1][1] + m[2][2]
+        if trace > 0.0:
+            s = 0.5 / math.sqrt(trace + 1.0)
+            return Quaternion((0.25 / s, (m[2][1] - m[1][2]) * s,
+                               (m[0][2] - m[2][0]) * s, (m[1][0] - m[0][1]) * s))
+        if m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+            s = 2.0 * math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2])
+            return Quaternion(((m[2][1] - m[1][2]) / s, 0.25 * s,
+                               (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s))
+        if m[1][1] > m[2][2]:
+            s = 2.0 * math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2])
+            return Quaternion(((m[0][2] - m[2][0]) / s, (m[0][1] + m[1][0]) / s,
+                               0.25 * s, (m[1][2] + m[2][1]) / s))
+        s = 2.0 * math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1])
+        return Quaternion(((m[1][0] - m[0][1]) / s, (m[0][2] + m[2][0]) / s,
+                           (m[1][2] + m[2][1]) / s, 0.25 * s))
+
+
+class Matrix(object):
+    __slots__ = ('_m',)
+
+    def __init__(self, rows=None):
+        if rows is None:
+            rows = [[float(i == j) for j in range(4)] for i in range(4)]
+        self._m = [[float(c) for c in row] for row in rows]
+
+    def __len__(self):
+        return len(self._m)
+
+    def __iter__(self):
+        return iter([Vector(row) for row in self._m])
+
+    def __getitem__(self, i):
+        return Vector(self._m[i])
+
+    def __repr__(self):
+        return "Matrix({})".format(self._m)
+
+    @classmethod
+    def Identity(cls, size):
+        return cls([[float(i == j) for j in range(size)] for i in range(size)])
+
+    @classmethod
+    def Translation(cls, vec):
+        m = cls.Identity(4)
+        for i in range(3):
+            m._m[i][3] = float(vec[i])
+        return m
+
+    @classmethod
+    def Scale(cls, factor, size, axis=None):
+        m = cls.Identity(size)
+        if axis is None:
+            for i in range(min(size, 3)):
+                m._m[i][i] = float(factor)
+            return m
+        axis = Vector(axis).normalized()
+        for i in range(3):
+            for j in range(3):
+                m._m[i][j] += (factor - 1.0) * axis[i] * axis[j]
+        return m
+
+    @classmethod
+    def Rotation(cls, angle, size, axis):
+        c, s = math.cos(angle), math.sin(angle)
+        if axis == 'X':
+            rows = ((1, 0, 0), (0, c, -s), (0, s, c))
+        elif axis == 'Y':
+            rows = ((c, 0, s), (0, 1, 0), (-s, 0, c))
+        elif axis == 'Z':
+            rows = ((c, -s, 0), (s, c, 0), (0, 0, 1))
+        else:
+            x, y, z = Vector(axis).normalized()
+            t = 1 - c
+            rows = ((t*x*x + c, t*x*y - s*z, t*x*z + s*y),
+                    (t*x*y + s*z, t*y*y + c, t*y*z - s*x),
+                    (t*x*z - s*y, t*y*z + s*x, t*z*z + c))
+        m = cls(rows)
+        return m.to_4x4() if size == 4 else m
+
+    def copy(self):
+        return Matrix(self._m)
+
+    def to_3x3(self):
+        return Matrix([row[:3] for row in self._m[:3]])
+
+    def to_4x4(self):
+        m = Matrix.Identity(4)
+        for i in range(min(3, len(self._m))):
+            for j in range(min(3, len(self._m[i]))):
+                m._m[i][j] = self._m[i][j]
+        if len(self._m) == 4:
+            return self.copy()
+        return m
+
+    def to_translation(self):
+        return Vector([row[3] for row in self._m[:3]])
+
+    def inverted(self):
+        n = len(self._m)
+        a = [row[:] + [float(i == j) for j in range(n)]
+             for i, row in enumerate(self._m)]
+        for col in range(n):
+            pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+            if abs(a[pivot][col]) < 1e-12:
+                raise ValueError("Matrix.inverted(): matrix does not have an inverse")
+            a[col], a[pivot] = a[pivot], a[col]
+            p = a[col][col]
+            a[col] = [c / p for c in a[col]]
+            for r in range(n):
+                if r != col and a[r][col] != 0.0:
+                    f = a[r][col]
+                    a[r] = [x - f * y for x, y in zip(a[r], a[col])]
+        return Matrix([row[n:] for row in a])
+
+    def _mul_matrix(self, other):
+        b = other._m
+        return Matrix([[sum(row[k] * b[k][j] for k in range(len(b)))
+                        for j in range(len(b[0]))] for row in self._m])
+
+    def _mul_vector(self, vec):
+        vec = list(vec)
+        n = len(self._m)
+        if n == 4 and len(vec) == 3:
+            v4 = vec + [1.0]
+            out = [sum(row[k] * v4[k] for k in range(4)) for row in self._m]
+            return Vector(out[:3])
+        return Vector([sum(row[k] * vec[k] for k in range(len(vec)))
+                       for row in self._m])
+
+    def __mul__(self, other):
+        # Blender 2.7x uses '*' for matrix products
+        if isinstance(other, Matrix):
+            return self._mul_matrix(other)
+        if isinstance(other, Vector) or isinstance(other, (tuple, list)):
+            return self._mul_vector(other)
+        if isinstance(other, (int, float)):
+            return Matrix([[c * other for c in row] for row in self._m])
+        return NotImplemented
+
+    __matmul__ = __mul__
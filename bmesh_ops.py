@@ -1,221 +1,964 @@
-import bpy, bmesh, random
+import bpy, bmesh, random, mathutils
+import numpy as np, zlib
+from collections import OrderedDict
+from . import mesh_arrays, rng
+from .instrument import stage
 
 context = bpy.context
 
 
+#CreateWindow stages, stored in the "stage" face layer
+STAGE_GLASS = 1
+STAGE_BLACKBOX = 2
+STAGE_LIGHT = 3
+STAGE_CURTAIN_A = 4
+STAGE_CURTAIN_B = 5
+
+
 def popup_message(message, title="Erro", icon='ERROR'):
     def oops(self, context):
         self.layout.label(text=message)
     bpy.context.window_manager.popup_menu(oops, title=title, icon=icon)
 
 
-def create_face(BMesh, Edge, Vector):
-    ret = bmesh.ops.extrude_edge_only(
-                BMesh,
-                edges=[Edge])
-    E1 = [ele for ele in ret["geom"]
-            if isinstance(ele, bmesh.types.BMEdge)]
-    del ret
-    for v in E1[0].verts:
-        bmesh.ops.translate(
-                BMesh,
-                verts=[v],
-                vec=Vector)
-    return E1
+def translate_verts(Verts, Offsets):
+    """Move each vertex in 'Verts' by the matching row of 'Offsets'.
+
+    Offsets for a vertex listed more than once add up in list order, in
+    float32 like bmesh.ops.translate, so one call gives the same result
+    as one translate per vertex. Face normals are not recalculated."""
+    if not Verts:
+        return
+    Index = {}
+    Slot = [Index.setdefault(v, len(Index)) for v in Verts]
+    Unique = [None]*len(Index)
+    for v, i in Index.items():Unique[i] = v
+    Coords = np.array([v.co for v in Unique], dtype=np.float32)
+    np.add.at(Coords, Slot, np.asarray(Offsets, dtype=np.float32))
+    for v, co in zip(Unique, Coords.tolist()):v.co = co
+
+
+def push_faces(Faces, Distance):
+    """Move the verts of every face in 'Faces' back along the XY of its
+    normal by 'Distance', the offsets of all of them in one pass, the
+    same as one translate per vertex without an operator call each."""
+    Faces = list(Faces)
+    Counts = [len(f.verts) for f in Faces]
+    Normals = np.array([f.normal[:2] for f in Faces]).reshape(-1, 2)
+    Offsets = np.zeros((sum(Counts), 3))
+    Offsets[:, :2] = -np.repeat(Normals*Distance, Counts, axis=0)
+    translate_verts([v for f in Faces for v in f.verts], Offsets)
+
+
+def sample_split(Items, Remove, Seed, Legacy=False,
+                 Stream=rng.STREAM_SAMPLE):
+    """Remove 'Remove' random items, returns (Kept, Removed) in the
+    original order of 'Items'. Draws that must not follow each other take
+    their own 'Stream'.
+
+    Legacy reseeds with Seed+i before the i-th pick and draws from the
+    items still left, the same picks as the old choice/index/del loop,
+    kept in O(n log n) with a Fenwick tree. The default takes the picks
+    from rng.sample_mask and leaves the global random state alone."""
+    Count = len(Items)
+    Remove = max(0, min(Remove, Count))
+    Mask = [False]*Count
+    if not Legacy:
+        Mask = rng.sample_mask(Count, Remove, Seed, Stream).tolist()
+    elif Remove:
+        #Tree[i] counts the items left in its range, all of them to start
+        Tree = [0]*(Count+1)
+        for i in range(1, Count+1):
+            Tree[i] += 1
+            Parent = i+(i & -i)
+            if Parent<=Count:Tree[Parent] += Tree[i]
+        Step = 1 << Count.bit_length()
+        for i in range(Remove):
+            random.seed(Seed+i)
+            Left = random.choice(range(Count-i))
+            #find the (Left+1)th item still left
+            Pos = 0
+            Bit = Step
+            while Bit:
+                Next = Pos+Bit
+                if Next<=Count and Tree[Next]<=Left:
+                    Pos = Next
+                    Left -= Tree[Next]
+                Bit >>= 1
+            Mask[Pos] = True
+            Pos += 1
+            while Pos<=Count:
+                Tree[Pos] -= 1
+                Pos += Pos & -Pos
+    Kept = [e for e, m in zip(Items, Mask) if not m]
+    Removed = [e for e, m in zip(Items, Mask) if m]
+    return Kept, Removed
+
+
+def stage_layer(BMesh):
+    """The "stage" int face layer, created if missing."""
+    Layers = BMesh.faces.layers.int
+    return Layers.get("stage") or Layers.new("stage")
+
+
+def face_stages(Mesh):
+    """The "stage" of every polygon of a bpy Mesh, 0 without the layer."""
+    Layer = Mesh.polygon_layers_int.get("stage")
+    if Layer is None:
+        return np.zeros(len(Mesh.polygons), dtype=np.int32)
+    return _flags(Layer.data, 'value', np.int32)
+
+
+def material_slots(Mesh, Names):
+    """Slot of each material of 'Names' in a bpy Mesh, only the ones it
+    does not have yet are appended. The name to slot map is kept per
+    mesh and scanned again once a slot no longer holds its material."""
+    Materials = Mesh.materials
+    Slots = _SLOTS.get(Mesh.name)
+    if Slots is None or any(
+            Slot>=len(Materials) or Materials[Slot] is None
+            or Materials[Slot].name!=Name for Name, Slot in Slots.items()):
+        Slots = {}
+        for Slot, Material in enumerate(Materials):
+            if Material is not None:Slots.setdefault(Material.name, Slot)
+    for Name in Names:
+        if Name not in Slots:
+            Materials.append(bpy.data.materials[Name])
+            Slots[Name] = len(Materials)-1
+    _SLOTS.put(Mesh.name, Slots)
+    return np.array([Slots[Name] for Name in Names], dtype=np.int32)
 
 
-def unselect_all(BMesh):
-    BMesh.select_mode = {'VERT', 'EDGE', 'FACE'}
-    for v in BMesh.verts:v.select_set(False)
-    BMesh.select_flush_mode()
+def write_materials(Mesh, Rows, Index):
+    """Material index of the polygons 'Rows' of a bpy Mesh, one call."""
+    _write_rows(Mesh.polygons, 'material_index', Rows, Index, np.int32)
 
 
-def select_el(BMesh, List):
-    for el in List:el.select_set(True)
-    BMesh.select_flush(True)
+def poly_verts(Mesh, Rows):
+    """Sorted vertex indices of the polygons 'Rows' of a bpy Mesh, each
+    vertex once."""
+    LoopVerts = _flags(Mesh.loops, 'vertex_index', np.int32)
+    Start = _flags(Mesh.polygons, 'loop_start', np.int32)[Rows]
+    Total = _flags(Mesh.polygons, 'loop_total', np.int32)[Rows]
+    return np.unique(LoopVerts[_spans(Start, Total)])
+
+
+def verts_of(Elements):
+    """Verts of 'Elements' (verts, edges or faces) in first-seen order."""
+    Verts = OrderedDict()
+    for el in Elements:
+        if isinstance(el, bmesh.types.BMVert):
+            Verts[el] = None
+        else:
+            for v in el.verts:Verts[v] = None
+    return list(Verts)
+
+
+def edges_within(Verts):
+    """Edges with both verts in 'Verts', reached through their link lists."""
+    VertSet = set(Verts)
+    Edges = OrderedDict()
+    for v in Verts:
+        for e in v.link_edges:
+            if not e.hide and e.other_vert(v) in VertSet:
+                Edges[e] = None
+    return list(Edges)
+
+
+def faces_within(Verts):
+    """Faces with all their verts in 'Verts', reached through their link lists."""
+    VertSet = set(Verts)
+    Faces = OrderedDict()
+    for v in Verts:
+        for f in v.link_faces:
+            if f not in Faces and not f.hide:
+                if all(fv in VertSet for fv in f.verts):Faces[f] = None
+    return list(Faces)
 
 
 def convert_list(BMesh, InGroup, TypeIn, TypeOut):
-    unselect_all(BMesh)
-    if TypeIn=='Vert' and TypeOut=='Edge':
-        select_el(BMesh, InGroup)
-        OutGroup = [e for e in BMesh.edges if e.select] 
-    elif TypeIn=='Vert' and TypeOut=='Face':
-        select_el(BMesh, InGroup)
-        OutGroup = [f for f in BMesh.faces if f.select]
-    elif TypeIn=='Edge' and TypeOut=='Vert':
-        OutGroup = []
-        for item in [v for e in BMesh.edges 
-                    if e in InGroup 
-                    for v in e.verts]:
-            if item not in OutGroup:OutGroup.append(item)
-    elif TypeIn=='Edge' and TypeOut=='Face':
-        select_el(BMesh, InGroup)
-        OutGroup = [f for f in BMesh.faces if f.select]
-    elif TypeIn=='Face' and TypeOut=='Vert':
-        OutGroup = list({v for f in InGroup for v in f.verts})
-    elif TypeIn=='Face' and TypeOut=='Edge':
-        select_el(BMesh, InGroup)
-        OutGroup = [e for e in BMesh.edges if e.select]
-    unselect_all(BMesh)
-    return OutGroup
-
-
-def curtains(BMesh, FacesIn, CurtainType, CurtainResol, Seed):
-    FaceToCurtains = [f for f in FacesIn if len(f.verts)==4]
-    Thick = 0.03
-    EdgeCurtain=[]
-
-    #create Curtains 
-    for Face in FaceToCurtains:
-        NormalX = Face.normal[0]
-        NormalY = Face.normal[1]
-        VertGroup = [vert.co for vert in Face.verts]
-        MinZ = min([vert[2] for vert in VertGroup])
-        SizeZ = max([vert[2] for vert in VertGroup]) - MinZ
-        VertLow = [v for v in Face.verts if v.co[2]==MinZ]
-
-        if len(VertLow)!=2:
-            popup_message("Janela com desnível na base")
-            continue
+    """'InGroup', of 'TypeIn' elements ('Vert', 'Edge' or 'Face'), as the
+    'TypeOut' elements selecting it would select: its verts, the edges
+    or the faces they close. Only the link lists of the input are walked
+    and the selection is left as it was, 'BMesh' is kept for callers."""
+    Verts = verts_of(InGroup)
+    if TypeOut=='Vert':
+        return Verts
+    if TypeOut=='Edge':
+        return edges_within(Verts)
+    return faces_within(Verts)
+
+
+def edge_islands(Edges):
+    """Island of every vert of 'Edges', {vert: number}. Islands are the
+    groups of 'Edges' joined by shared verts, numbered in the order
+    their first edge comes in 'Edges'."""
+    EdgeSet = set(Edges)
+    Island = {}
+    Count = 0
+    for e in Edges:
+        if e.verts[0] in Island:continue
+        Island[e.verts[0]] = Count
+        Stack = [e.verts[0]]
+        while Stack:
+            v = Stack.pop()
+            for Link in v.link_edges:
+                Other = Link.other_vert(v)
+                if Link in EdgeSet and Other not in Island:
+                    Island[Other] = Count
+                    Stack.append(Other)
+        Count += 1
+    return Island
+
+
+def shared_edges(Verts, Edges):
+    """Edges to split so extrusions of neighbouring 'Edges' come apart.
+
+    A vertex of 'Verts' with three links joins two edges of 'Edges' and
+    the side edge both of their extrusions share, that side edge is
+    returned, in 'Verts' order and without depending on link order."""
+    EdgeSet = set(Edges)
+    Shared = []
+    for v in Verts:
+        if len(v.link_edges)==3:
+            Shared.extend(e for e in v.link_edges if e not in EdgeSet)
+    return Shared
+
+
+def bulk_insert(BMesh, Coords, Polys):
+    """Add 'Coords' as new verts and 'Polys' (rows of indices into
+    'Coords') as new faces, without operator calls. Returns the faces."""
+    NewVert = BMesh.verts.new
+    Verts = [NewVert(co) for co in np.asarray(Coords).tolist()]
+    NewFace = BMesh.faces.new
+    return [NewFace([Verts[i] for i in Poly])
+            for Poly in np.asarray(Polys).tolist()]
+
+
+class StageCache(object):
+    """Bounded LRU of cached results, the oldest entry goes first.
+    'drop', when given, is called with every value that leaves the cache,
+    evicted, replaced or cleared, e.g. to free a BMesh."""
+
+    def __init__(self, size=8, drop=None):
+        self.size = size
+        self.drop = drop
+        self.items = OrderedDict()
+
+    def get(self, key):
+        Value = self.items.get(key)
+        if Value is not None:
+            self.items.move_to_end(key)
+        return Value
+
+    def put(self, key, value):
+        Old = self.items.get(key)
+        if Old is not None and Old is not value and self.drop:self.drop(Old)
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items)>self.size:
+            Old = self.items.popitem(last=False)[1]
+            if self.drop:self.drop(Old)
+        return value
+
+    def clear(self):
+        if self.drop:
+            for Value in self.items.values():self.drop(Value)
+        self.items.clear()
+
+
+#frames of the last meshes seen, by name, see facade_frames
+_FRAMES = StageCache(8)
+
+#material name to slot of the last meshes seen, see material_slots
+_SLOTS = StageCache(8)
+
+
+def _mesh_arrays(Mesh):
+    """Coordinates, loop verts and loop starts/totals of a bpy Mesh."""
+    Co = np.empty(len(Mesh.vertices)*3, dtype=np.float32)
+    Mesh.vertices.foreach_get('co', Co)
+    LoopVerts = np.empty(len(Mesh.loops), dtype=np.int32)
+    Mesh.loops.foreach_get('vertex_index', LoopVerts)
+    LoopStart = np.empty(len(Mesh.polygons), dtype=np.int32)
+    Mesh.polygons.foreach_get('loop_start', LoopStart)
+    LoopTotal = np.empty(len(Mesh.polygons), dtype=np.int32)
+    Mesh.polygons.foreach_get('loop_total', LoopTotal)
+    return Co, LoopVerts, LoopStart, LoopTotal
+
+
+#per element data a BMesh takes from a mesh, hashed by mesh_key
+_MESH_DATA = (('vertices', 'select', bool, 1), ('vertices', 'hide', bool, 1),
+              ('vertices', 'bevel_weight', np.float32, 1),
+              ('edges', 'vertices', np.int32, 2), ('edges', 'select', bool, 1),
+              ('edges', 'hide', bool, 1), ('edges', 'use_seam', bool, 1),
+              ('edges', 'use_edge_sharp', bool, 1),
+              ('edges', 'crease', np.float32, 1),
+              ('edges', 'bevel_weight', np.float32, 1),
+              ('polygons', 'material_index', np.int32, 1),
+              ('polygons', 'use_smooth', bool, 1),
+              ('polygons', 'select', bool, 1), ('polygons', 'hide', bool, 1))
+
+#layers of the same, by mesh collection
+_MESH_LAYERS = (('vertex_layers_int', 'value', np.int32, 1),
+                ('vertex_layers_float', 'value', np.float32, 1),
+                ('polygon_layers_int', 'value', np.int32, 1),
+                ('polygon_layers_float', 'value', np.float32, 1),
+                ('uv_layers', 'uv', np.float32, 2),
+                ('vertex_colors', 'color', np.float32, 3))
+
+
+def _crc_key(Arrays):
+    Key = []
+    for Array in Arrays:
+        Key.extend((len(Array), zlib.crc32(Array.tobytes())))
+    return Key
+
+
+def geometry_key(Mesh, Arrays=None):
+    """Cheap hash of the coordinates and polygons of a bpy Mesh."""
+    return tuple(_crc_key(Arrays or _mesh_arrays(Mesh)))
+
+
+def mesh_key(Mesh, Arrays=None):
+    """Hash of a bpy Mesh by name and of everything a BMesh takes from
+    it: geometry, flags, edge data, vertex group weights, int and float
+    layers, UVs and vertex colors."""
+    Arrays = list(Arrays or _mesh_arrays(Mesh))
+    #weights have no foreach access, one row per vertex and group
+    Arrays.append(np.array([(i, g.group, g.weight)
+                            for i, v in enumerate(Mesh.vertices)
+                            for g in v.groups], dtype=np.float64))
+    for Items, Name, Type, Width in _MESH_DATA:
+        Arrays.append(_flags(getattr(Mesh, Items), Name, Type, Width))
+    Key = [Mesh.name]+_crc_key(Arrays)
+    for Layers, Name, Type, Width in _MESH_LAYERS:
+        for Layer in getattr(Mesh, Layers):
+            Values = _flags(Layer.data, Name, Type, Width)
+            Key.extend((Layers, Layer.name, zlib.crc32(Values.tobytes())))
+    return tuple(Key)
+
+
+def _frames(Co, LoopVerts, LoopStart, LoopTotal):
+    """Window frames of the polygons 'LoopStart', 'LoopTotal', only rows
+    of quads are filled."""
+    Frames = np.zeros(len(LoopStart), mesh_arrays.FRAME)
+    Quad = LoopTotal==4
+    Loops = LoopStart[Quad][:, None]+np.arange(4)
+    Corners = Co.reshape(-1, 3)[LoopVerts[Loops]]
+    Frames[Quad] = mesh_arrays.window_frames(Corners)
+    return Frames
+
+
+def facade_frames(Mesh, Polys=None, Arrays=None):
+    """Window frames of every polygon of a bpy Mesh, one vectorized pass.
+
+    Rows follow the polygon index, only rows with 'quad' set are filled.
+    The result is cached per mesh name and reused while geometry_key
+    stays the same, so it must not be modified. With 'Polys' only the frames
+    of those polygons are made, one row each, uncached, so a partial
+    update never goes over the whole mesh. 'Arrays' are _mesh_arrays
+    already read, e.g. the ones of a mesh_region."""
+    Co, LoopVerts, LoopStart, LoopTotal = Arrays = Arrays or _mesh_arrays(
+            Mesh)
+    if Polys is not None:
+        return _frames(Co, LoopVerts, LoopStart[Polys], LoopTotal[Polys])
+    Key = geometry_key(Mesh, Arrays)
+    Cached = _FRAMES.get(Mesh.name)
+    if Cached is not None and Cached[0]==Key:
+        return Cached[1]
+
+    Frames = _frames(Co, LoopVerts, LoopStart, LoopTotal)
+    Frames.flags.writeable = False
+    return _FRAMES.put(Mesh.name, (Key, Frames))[1]
+
+
+def _spans(Start, Total):
+    """Flat indices of the runs Start[i]:Start[i]+Total[i], in order."""
+    Total = np.asarray(Total, dtype=np.int64)
+    Skip = np.cumsum(Total)-Total
+    return np.repeat(np.asarray(Start, dtype=np.int64)-Skip, Total)+np.arange(
+            Total.sum())
+
+
+def _flags(Items, Name, Type=bool, Width=1):
+    Array = np.empty(len(Items)*Width, dtype=Type)
+    Items.foreach_get(Name, Array)
+    return Array.reshape(-1, Width) if Width>1 else Array
+
 
-        SizeSide = VertLow[1].co - VertLow[0].co
+class RegionError(ValueError):
+    """A mesh_region that cannot be loaded or written back, raised before
+    the mesh is changed."""
 
-        #coordenadas para Vert 0
-        VertX = VertLow[0].co[0]
-        if round(SizeSide[1], 3)>=0:
-            VertY = min([VertLow[0].co[1], VertLow[1].co[1]])
+
+def mesh_region(Mesh, Polys, Verts=(), Arrays=None):
+    """Mesh indices of a region: the polygons 'Polys', their verts and
+    the extra 'Verts', and every edge between two of those verts, with
+    the _mesh_arrays they were found in."""
+    Co, LoopVerts, LoopStart, LoopTotal = Arrays = Arrays or _mesh_arrays(
+            Mesh)
+    Polys = np.unique(np.asarray(Polys, dtype=np.int64))
+    Inside = np.zeros(len(Co)//3, dtype=bool)
+    Inside[LoopVerts[_spans(LoopStart[Polys], LoopTotal[Polys])]] = True
+    Inside[np.asarray(Verts, dtype=np.int64)] = True
+    Edges = _flags(Mesh.edges, 'vertices', np.int32, 2)
+    return {'verts': np.flatnonzero(Inside),
+            'edges': np.flatnonzero(Inside[Edges].all(axis=1)),
+            'faces': Polys,
+            'arrays': Arrays}
+
+
+def selected_edge_region(Mesh):
+    """mesh_region of the selected edges and of every polygon using one
+    of their verts, so ops on those edges see all of their faces."""
+    Edges = _flags(Mesh.edges, 'vertices', np.int32, 2)
+    Verts = np.unique(Edges[_flags(Mesh.edges, 'select')])
+    Co, LoopVerts, LoopStart, LoopTotal = Arrays = _mesh_arrays(Mesh)
+    Touch = np.zeros(len(Co)//3, dtype=bool)
+    Touch[Verts] = True
+    Polys = np.repeat(np.arange(len(LoopStart)), LoopTotal)[Touch[LoopVerts]]
+    return mesh_region(Mesh, Polys, Verts, Arrays)
+
+
+def selected_face_region(Mesh):
+    """mesh_region of the selected polygons."""
+    return mesh_region(Mesh, np.flatnonzero(_flags(Mesh.polygons, 'select')))
+
+
+def region_bmesh(Mesh, Region):
+    """BMesh of a mesh_region only, in mesh order, for the operators that
+    touch a small part of a large mesh. Verts, edges and faces keep
+    their mesh index+1 in a "source" int layer for splice_region.
+    Coordinates, selection, hiding, vertex group weights, materials,
+    smoothing, face int layers, UVs and vertex colors come along, custom
+    split normals are not carried and raise a RegionError."""
+    if Mesh.has_custom_normals:
+        raise RegionError("custom split normals are not carried by a region")
+    BMesh = bmesh.new()
+    Co, LoopVerts, LoopStart, LoopTotal = Region['arrays']
+    Co = Co.reshape(-1, 3)
+    VSource = BMesh.verts.layers.int.new("source")
+    ESource = BMesh.edges.layers.int.new("source")
+    FSource = BMesh.faces.layers.int.new("source")
+
+    Index = Region['verts']
+    NewVert = BMesh.verts.new
+    Verts = {}
+    for i, co, Select, Hide in zip(Index.tolist(), Co[Index].tolist(),
+                                   _flags(Mesh.vertices, 'select')[Index],
+                                   _flags(Mesh.vertices, 'hide')[Index]):
+        v = Verts[i] = NewVert(co)
+        v[VSource] = i+1
+        v.select, v.hide = bool(Select), bool(Hide)
+    Groups = [(Verts[i], Mesh.vertices[i].groups) for i in Index.tolist()]
+    if any(len(VGroups) for v, VGroups in Groups):
+        Deform = BMesh.verts.layers.deform.verify()
+        for v, VGroups in Groups:
+            for g in VGroups:v[Deform][g.group] = g.weight
+
+    Index = Region['edges']
+    EdgeVerts = _flags(Mesh.edges, 'vertices', np.int32, 2)[Index]
+    for i, (a, b), Select, Hide in zip(Index.tolist(), EdgeVerts.tolist(),
+                                       _flags(Mesh.edges, 'select')[Index],
+                                       _flags(Mesh.edges, 'hide')[Index]):
+        e = BMesh.edges.new((Verts[a], Verts[b]))
+        e[ESource] = i+1
+        e.select, e.hide = bool(Select), bool(Hide)
+
+    Index = Region['faces']
+    Loops = _spans(LoopStart[Index], LoopTotal[Index])
+    Polys = Mesh.polygons
+    Columns = [Index.tolist(), LoopTotal[Index].tolist(),
+               _flags(Polys, 'material_index', np.int32)[Index].tolist(),
+               _flags(Polys, 'use_smooth')[Index].tolist(),
+               _flags(Polys, 'select')[Index].tolist(),
+               _flags(Polys, 'hide')[Index].tolist()]
+    NewFace = BMesh.faces.new
+    Faces = []
+    Corners = iter(LoopVerts[Loops].tolist())
+    for i, Total, Material, Smooth, Select, Hide in zip(*Columns):
+        f = NewFace([Verts[next(Corners)] for k in range(Total)])
+        f[FSource] = i+1
+        f.material_index, f.smooth = Material, Smooth
+        f.select, f.hide = Select, Hide
+        Faces.append(f)
+    for Name in Mesh.polygon_layers_int.keys():
+        Layer = BMesh.faces.layers.int.new(Name)
+        Values = np.empty(len(Polys), dtype=np.int32)
+        Mesh.polygon_layers_int[Name].data.foreach_get('value', Values)
+        for f, Value in zip(Faces, Values[Index].tolist()):f[Layer] = Value
+    for UVLayer in Mesh.uv_layers:
+        Layer = BMesh.loops.layers.uv.new(UVLayer.name)
+        UV = _flags(UVLayer.data, 'uv', np.float32, 2)[Loops]
+        Values = iter(UV.tolist())
+        for f in Faces:
+            for l in f.loops:l[Layer].uv = next(Values)
+    for ColorLayer in Mesh.vertex_colors:
+        Layer = BMesh.loops.layers.color.new(ColorLayer.name)
+        Color = _flags(ColorLayer.data, 'color', np.float32, 3)[Loops]
+        Values = iter(Color.tolist())
+        for f in Faces:
+            for l in f.loops:l[Layer] = next(Values)
+    BMesh.normal_update()
+    BMesh.verts.index_update()
+    BMesh.edges.index_update()
+    BMesh.faces.index_update()
+    return BMesh
+
+
+def drop_sources(BMesh):
+    """Remove the "source" layers of a region_bmesh written as a mesh of
+    its own, rather than spliced back."""
+    for Layers in (BMesh.verts.layers.int, BMesh.edges.layers.int,
+                   BMesh.faces.layers.int):
+        Source = Layers.get("source")
+        if Source is not None:Layers.remove(Source)
+
+
+def _claims(Elements, Layer, Count):
+    """Mesh index of every element: the first one with a "source" takes
+    that slot back, copies and new ones go after 'Count'."""
+    Index = np.empty(len(Elements), dtype=np.int64)
+    Seen = set()
+    New = Count
+    for i, Element in enumerate(Elements):
+        Source = Element[Layer]-1
+        if Source>=0 and Source not in Seen:
+            Seen.add(Source)
+            Index[i] = Source
         else:
-            VertY = max([VertLow[0].co[1], VertLow[1].co[1]])
-
-        #"""Curtain A"""
-        if CurtainType==1:
-            LocalZ =  -SizeZ/CurtainResol
-            
-            #coordenadas para Vert 0 - 'Vert0Co'
-            VertZ = VertLow[0].co[2]+SizeZ
-            Vert0Co = [VertX-NormalX*0.02, VertY-NormalY*0.02, VertZ]
-
-            #Vert 0
-            v = bmesh.ops.create_vert(BMesh,co=Vert0Co)
-            V0 = v['vert'][0]
-            
-            #Edge 0
-            ret = bmesh.ops.extrude_vert_indiv(
-                        BMesh,
-                        verts=[V0])
-            bmesh.ops.translate(
-                        BMesh,
-                        verts=[V0],
-                        vec=SizeSide)
-            E1=[ret['edges'][0]]
-            EdgeCurtain.extend(E1)
-            del v, ret, E1
-
-            #Faces
+            Index[i] = New
+            New += 1
+    return Index, New-Count
+
+
+def _write_rows(Items, Name, Rows, Values, Type=bool, Width=1):
+    Array = _flags(Items, Name, Type, Width)
+    Array[Rows] = Values
+    Items.foreach_set(Name, Array.ravel())
+
+
+def splice_region(Object, BMesh, Region):
+    """Write a region_bmesh back into the mesh of 'Object', the rest of
+    the mesh is only copied as arrays, never converted. Elements keep
+    the slot of their "source", see _claims, new ones are appended.
+    A bpy Mesh can only grow, so every loaded edge and face has to
+    survive; loaded verts that do not stay as they were. Loops move with
+    their polygons, UVs and vertex colors are moved along with them, and
+    every loop gets its edge, so no edge is renumbered.
+    Returns the polygon index of every face of the BMesh."""
+    Mesh = Object.data
+    Verts, Edges = list(BMesh.verts), list(BMesh.edges)
+    Faces = list(BMesh.faces)
+    VIndex, VNew = _claims(Verts, BMesh.verts.layers.int["source"],
+                           len(Mesh.vertices))
+    EIndex, ENew = _claims(Edges, BMesh.edges.layers.int["source"],
+                           len(Mesh.edges))
+    FIndex, FNew = _claims(Faces, BMesh.faces.layers.int["source"],
+                           len(Mesh.polygons))
+    for Name, Index in (('edges', EIndex), ('faces', FIndex)):
+        if len(np.setdiff1d(Region[Name], Index)):
+            raise RegionError("loaded {} were removed".format(Name))
+
+    #polygons, the loops of the unchanged ones copied over as a block
+    Co, LoopVerts, LoopStart, LoopTotal = _mesh_arrays(Mesh)
+    LoopEdges = _flags(Mesh.loops, 'edge_index', np.int32)
+    UVs = [_flags(Layer.data, 'uv', np.float32, 2) for Layer in Mesh.uv_layers]
+    Colors = [_flags(Layer.data, 'color', np.float32, 3)
+              for Layer in Mesh.vertex_colors]
+    Total = np.concatenate([LoopTotal, np.zeros(FNew, dtype=LoopTotal.dtype)])
+    Total[FIndex] = [len(f.verts) for f in Faces]
+    Start = np.cumsum(Total)-Total
+    Kept = np.ones(len(LoopTotal), dtype=bool)
+    Kept[Region['faces']] = False
+    Kept = np.flatnonzero(Kept)
+    Old = _spans(LoopStart[Kept], LoopTotal[Kept])
+    New = _spans(Start[Kept], LoopTotal[Kept])
+    Mine = _spans(Start[FIndex], Total[FIndex])
+
+    BMesh.verts.index_update()
+    BMesh.edges.index_update()
+    VCount = len(Mesh.vertices)
+    Mesh.vertices.add(VNew)
+    Mesh.edges.add(ENew)
+    Mesh.loops.add(Total.sum()-len(LoopVerts))
+    Mesh.polygons.add(FNew)
+
+    Loops = np.empty(Total.sum(), dtype=np.int32)
+    Loops[New] = LoopVerts[Old]
+    Loops[Mine] = VIndex[np.array([v.index for f in Faces for v in f.verts],
+                                  dtype=np.int64)]
+    Mesh.loops.foreach_set('vertex_index', Loops)
+    Loops[New] = LoopEdges[Old]
+    Loops[Mine] = EIndex[np.array([e.index for f in Faces for e in f.edges],
+                                  dtype=np.int64)]
+    Mesh.loops.foreach_set('edge_index', Loops)
+    Mesh.polygons.foreach_set('loop_start', Start.astype(np.int32))
+    Mesh.polygons.foreach_set('loop_total', Total.astype(np.int32))
+    for Layer, UV in zip(Mesh.uv_layers, UVs):
+        Array = np.zeros((Total.sum(), 2), dtype=np.float32)
+        Array[New] = UV[Old]
+        BMLayer = BMesh.loops.layers.uv.get(Layer.name)
+        if BMLayer is not None:
+            Array[Mine] = [l[BMLayer].uv[:] for f in Faces for l in f.loops]
+        Layer.data.foreach_set('uv', Array.ravel())
+    for Layer, Color in zip(Mesh.vertex_colors, Colors):
+        Array = np.ones((Total.sum(), 3), dtype=np.float32)
+        Array[New] = Color[Old]
+        BMLayer = BMesh.loops.layers.color.get(Layer.name)
+        if BMLayer is not None:
+            Array[Mine] = [l[BMLayer][:] for f in Faces for l in f.loops]
+        Layer.data.foreach_set('color', Array.ravel())
+
+    #the region rows
+    Polys = Mesh.polygons
+    _write_rows(Polys, 'material_index', FIndex,
+                [f.material_index for f in Faces], np.int32)
+    _write_rows(Polys, 'use_smooth', FIndex, [f.smooth for f in Faces])
+    _write_rows(Polys, 'select', FIndex, [f.select for f in Faces])
+    _write_rows(Polys, 'hide', FIndex, [f.hide for f in Faces])
+    for Name, Layer in BMesh.faces.layers.int.items():
+        if Name=="source":
+            continue
+        MeshLayer = (Mesh.polygon_layers_int.get(Name)
+                     or Mesh.polygon_layers_int.new(Name))
+        _write_rows(MeshLayer.data, 'value', FIndex,
+                    [f[Layer] for f in Faces], np.int32)
+    _write_rows(Mesh.vertices, 'co', VIndex, [v.co[:] for v in Verts],
+                np.float32, 3)
+    _write_rows(Mesh.vertices, 'select', VIndex, [v.select for v in Verts])
+    _write_rows(Mesh.vertices, 'hide', VIndex, [v.hide for v in Verts])
+    Ends = np.array([[v.index for v in e.verts] for e in Edges],
+                    dtype=np.int64).reshape(-1, 2)
+    _write_rows(Mesh.edges, 'vertices', EIndex, VIndex[Ends], np.int32, 2)
+    _write_rows(Mesh.edges, 'select', EIndex, [e.select for e in Edges])
+    _write_rows(Mesh.edges, 'hide', EIndex, [e.hide for e in Edges])
+
+    #vertex group weights of the BMesh, by group and weight, the groups
+    #a loaded vert left are removed from it
+    Layers = BMesh.verts.layers.deform.values()
+    Weights, Left = OrderedDict(), OrderedDict()
+    for v, Index in zip(Verts, VIndex.tolist()):
+        Groups = {}
+        for Layer in Layers:Groups.update(v[Layer].items())
+        for Group, Weight in Groups.items():
+            Weights.setdefault((Group, Weight), []).append(Index)
+        if Index<VCount:
+            for g in Mesh.vertices[Index].groups:
+                if g.group not in Groups:
+                    Left.setdefault(g.group, []).append(Index)
+    for Group, Index in Left.items():
+        Object.vertex_groups[Group].remove(Index)
+    for (Group, Weight), Index in Weights.items():
+        Object.vertex_groups[Group].add(Index, Weight, 'REPLACE')
+    Mesh.update()
+    return FIndex
+
+
+def append_polys(Mesh, Coords, Polys):
+    """Add the verts 'Coords' and the polygons 'Polys', rows of indices
+    into them, at the end of a bpy Mesh, without converting the
+    geometry already there."""
+    Coords = np.asarray(Coords, dtype=np.float32).reshape(-1, 3)
+    Polys = np.asarray(Polys, dtype=np.int64)
+    Verts, Loops = len(Mesh.vertices), len(Mesh.loops)
+    Count = len(Mesh.polygons)
+    Mesh.vertices.add(len(Coords))
+    Mesh.loops.add(Polys.size)
+    Mesh.polygons.add(len(Polys))
+    Tail = slice(Count, None)
+    _write_rows(Mesh.vertices, 'co', slice(Verts, None), Coords,
+                np.float32, 3)
+    _write_rows(Mesh.loops, 'vertex_index', slice(Loops, None),
+                (Polys+Verts).ravel(), np.int32)
+    _write_rows(Mesh.polygons, 'loop_start', Tail,
+                Loops+Polys.shape[1]*np.arange(len(Polys)), np.int32)
+    _write_rows(Mesh.polygons, 'loop_total', Tail, Polys.shape[1], np.int32)
+    Mesh.update(calc_edges=True)
+
+
+def face_frames(Faces):
+    """Window frames of a list of BMesh faces, see facade_frames."""
+    Frames = np.zeros(len(Faces), mesh_arrays.FRAME)
+    Quad = [i for i, f in enumerate(Faces) if len(f.verts)==4]
+    Corners = [[v.co[:] for v in Faces[i].verts] for i in Quad]
+    Frames[Quad] = mesh_arrays.window_frames(Corners)
+    return Frames
+
+
+def lod_resolution(context, Points, Resolution, Mode, Point, Bands,
+                   Fewest=3):
+    """Resolution for every point of (N,3) 'Points', local to the active
+    object, by its distance to the scene camera ('CAMERA') or to 'Point'
+    ('POINT'), see mesh_arrays.band_resolution. 'NONE', or a scene
+    without camera, keeps 'Resolution' everywhere."""
+    Points = np.asarray(Points, dtype=np.float64).reshape(-1, 3)
+    Camera = context.scene.camera
+    if Mode=='CAMERA' and Camera is None:
+        popup_message("Cena sem câmera")
+    if Mode=='NONE' or (Mode=='CAMERA' and Camera is None):
+        return np.full(len(Points), Resolution, dtype=np.int64)
+    if Mode=='CAMERA':
+        Point = Camera.matrix_world.translation
+    World = np.array(context.object.matrix_world)
+    Points = mesh_arrays.transform_points(World[None], Points)[0]
+    return mesh_arrays.band_resolution(Points, tuple(Point), Resolution,
+                                       Bands, Fewest)
+
+
+def curtain_draws(CurtainType, Index, SizeZ, Resol, Seed):
+    """Quads of every Curtain A strip (type 1) or columns of every
+    Curtain B leaf (type 2, two per window) and the Curtain B jitter,
+    drawn from rng by window 'Index'. Windows where 'Hung' is False get
+    no Curtain A."""
+    Resol = np.broadcast_to(Resol, (len(Index),))
+    if CurtainType==1:
+        Ranges = rng.uniform(Seed, rng.STREAM_CURTAIN_A, Index, -0.2, 1.1)
+        Ranges = 1+(SizeZ*Resol*Ranges/4).astype(np.int64)
+        return 4*Ranges, [], Ranges>=1
+
+    #Folha L and Folha R of every face
+    Leaves = np.repeat(2*Index, 2)+np.tile([0, 1], len(Index))
+    Steps = rng.uniform(Seed, rng.STREAM_CURTAIN_B, Leaves, 2, 8)
+    Steps = (np.repeat(Resol, 2)/Steps).astype(np.int64)
+    Start = np.repeat(np.cumsum(4*Steps)-4*Steps, 4*Steps)
+    Sub = np.arange(len(Start))-Start
+    Jitter = rng.uniform(Seed, rng.STREAM_CURTAIN_B_JITTER,
+                         np.repeat(Leaves, 4*Steps), 0.105, 0, Sub)
+    return Steps, Jitter, np.ones(len(Index), dtype=bool)
+
+
+def curtain_origins(Frames, CurtainType):
+    """Corner the strips of 'Frames' start from, at the top for Curtain A
+    and at the bottom for Curtain B, and their height."""
+    #coordenadas para Vert 0
+    Normal = Frames['normal'][:, :2]
+    Low = Frames['low'][:, 0]
+    SizeZ = Frames['size_z']
+    Origin = np.stack([Low[:, 0], Frames['y_max'], Low[:, 2]], axis=1)
+    if CurtainType==1:
+        Origin[:, :2] -= Normal*0.02
+        Origin[:, 2] += SizeZ
+        return Origin, SizeZ
+    Origin[:, 2] -= 0.01
+    return Origin, SizeZ+0.02
+
+
+def hung_frames(Frames):
+    """Rows of 'Frames' curtains hang in: quads with a flat base."""
+    Skewed = Frames['quad'] & (Frames['lows']!=2)
+    if Skewed.any():
+        popup_message("Janela com desnível na base")
+    return np.flatnonzero(Frames['quad'] & ~Skewed)
+
+
+@stage("curtains")
+def curtains(BMesh, FacesIn, CurtainType, CurtainResol, Seed, Frames=None,
+             Legacy=False):
+    """Curtain strips for the quads of 'FacesIn'. 'Frames' are the
+    window frames of 'FacesIn', row by row, computed if not given.
+    'CurtainResol' is one resolution or one per face, see lod_resolution.
+    The random draws come from rng keyed by face index, 'Legacy' makes
+    them serially from the global random state like the old loop."""
+    FacesIn = list(FacesIn)
+    if Frames is None:
+        Frames = face_frames(FacesIn)
+    Keep = hung_frames(Frames)
+    FaceToCurtains = [FacesIn[i] for i in Keep]
+    Frames = Frames[Keep]
+    Resol = np.broadcast_to(CurtainResol, (len(FacesIn),))[Keep]
+
+    #random draws, in the order the strips are built
+    if CurtainType==1 and Legacy:
+        Ranges = []
+        for Face, SizeZ, Res in zip(FaceToCurtains, Frames['size_z'].tolist(),
+                                    Resol.tolist()):
             random.seed(Seed+Face.index)
-            RangeCurtain = 1+int(SizeZ*CurtainResol*random.uniform(-0.2,1.1)/4)
-            for i in range(RangeCurtain):
-                #face1
-                E1 = create_face(BMesh, 
-                                EdgeCurtain[-1], 
-                                (0,0,LocalZ))
-                EdgeCurtain.extend(E1)
-                #face2
-                E1 = create_face(BMesh, 
-                                EdgeCurtain[-1], 
-                                (-NormalX*Thick,-NormalY*Thick,0))
-                EdgeCurtain.extend(E1)
-                #face3
-                E1 = create_face(BMesh, 
-                                EdgeCurtain[-1], 
-                                (0,0,LocalZ))
-                EdgeCurtain.extend(E1)
-                #face4
-                E1 = create_face(BMesh, 
-                                EdgeCurtain[-1], 
-                                (NormalX*Thick,NormalY*Thick,0))
-                EdgeCurtain.extend(E1)
-
-        #"""Curtain B"""
-        elif CurtainType==2:
-            EdgeLocal = []
-                            
-            #coordenadas para Vert 0 - 'Vert0Co'
-            VertZ = VertLow[0].co[2]-0.01
-            Vert0Co = [VertX, VertY, VertZ]
-
-            #Folha L
-            EdgeLocal = []
-            v = bmesh.ops.create_vert(BMesh,co=Vert0Co)
-            V0 = v['vert'][0]
-            ret = bmesh.ops.extrude_vert_indiv(
-                        BMesh,
-                        verts=[V0])
-            bmesh.ops.translate(
-                        BMesh,
-                        verts=[V0],
-                        vec=(0, 0, SizeZ+0.02))
-            E1=[ret['edges'][0]]
-            EdgeCurtain.extend(E1)
-            for v in E1[0].verts:
-                bmesh.ops.translate(
-                        BMesh,
-                        verts=[v],
-                        vec=(-NormalX*0.115, -NormalY*0.115, 0))
-            del v, ret, E1
-            for i in range(int(CurtainResol/random.uniform(2,8))):
-                E1 = create_face(BMesh, EdgeCurtain[-1], 
-                    (   SizeSide[0]/CurtainResol,
-                        SizeSide[1]/CurtainResol,
-                        0))
-                EdgeCurtain.extend(E1)
-                EdgeLocal.extend(E1)
-            for e in EdgeLocal:
-                for v in e.verts:
-                    v.co = (v.co[0]+NormalX*random.uniform(0.105,0),
-                            v.co[1]+NormalY*random.uniform(0.105,0),
-                            v.co[2])
-            del EdgeLocal
-
-            #Folha R
-            EdgeLocal = []
-            Vert1Co = [VertX+SizeSide[0], VertY+SizeSide[1], VertZ]
-            v = bmesh.ops.create_vert(BMesh,co=Vert1Co)
-            V1 = v['vert'][0]
-            ret = bmesh.ops.extrude_vert_indiv(
-                        BMesh,
-                        verts=[V1])
-            bmesh.ops.translate(
-                        BMesh,
-                        verts=[V1],
-                        vec=(0, 0, SizeZ+0.02))
-            E1=[ret['edges'][0]]
-            EdgeCurtain.extend(E1)
-            EdgeLocal.extend(E1)
-            for v in E1[0].verts:
-                bmesh.ops.translate(
-                        BMesh,
-                        verts=[v],
-                        vec=(-NormalX*0.115, -NormalY*0.115, 0))
-            del v, ret, E1
-            for i in range(int(CurtainResol/random.uniform(2,8))):
-                E1 = create_face(BMesh, EdgeCurtain[-1], 
-                    (   -SizeSide[0]/CurtainResol,
-                        -SizeSide[1]/CurtainResol,
-                        0))
-                EdgeCurtain.extend(E1)
-                EdgeLocal.extend(E1)
-            for e in EdgeLocal[1:]:
-                for v in e.verts:
-                    v.co = (v.co[0]+NormalX*random.uniform(0.105,0),
-                            v.co[1]+NormalY*random.uniform(0.105,0),
-                            v.co[2])
-            del EdgeLocal
-
-    FaceCurtain = convert_list(BMesh, EdgeCurtain, 'Edge', 'Face')
+            Ranges.append(1+int(SizeZ*Res*random.uniform(-0.2,1.1)/4))
+        Ranges = np.array(Ranges, dtype=np.int64)
+        Steps, Jitter, Hung = 4*Ranges, [], Ranges>=1
+    elif CurtainType==2 and Legacy:
+        #Folha L and Folha R
+        Steps, Jitter = [], []
+        for Leaf in range(2*len(Frames)):
+            Columns = int(int(Resol[Leaf//2])/random.uniform(2,8))
+            Jitter.extend(random.uniform(0.105,0) for i in range(4*Columns))
+            Steps.append(Columns)
+    else:
+        BMesh.faces.index_update()
+        Index = np.array([f.index for f in FaceToCurtains], dtype=np.int64)
+        Steps, Jitter, Hung = curtain_draws(CurtainType, Index,
+                                            Frames['size_z'], Resol, Seed)
+    if CurtainType==1:
+        Frames = Frames[Hung]
+        Resol = Resol[Hung]
+        Steps = Steps[Hung]
+
+    if not len(Frames):
+        return []
+    Origin, SizeHeight = curtain_origins(Frames, CurtainType)
+    Coords, Rows = mesh_arrays.curtain_rows(
+            CurtainType, Origin, Frames['side'], Frames['normal'][:, :2],
+            SizeHeight, Steps, Jitter, Resol)
+
+    #leaves without columns would only leave a loose edge
+    Keep = np.repeat(Rows>1, 2*Rows)
+    FaceCurtain = bulk_insert(
+                BMesh,
+                Coords[Keep],
+                mesh_arrays.strip_quads(Rows[Rows>1]))
     if CurtainType==2:
         for face in FaceCurtain:face.smooth = True
 
-
     return FaceCurtain
+
+
+def curtain_instances(context, Name, Frames, Windows, CurtainType,
+                      CurtainResol, Seed, Material=None, Variants=4,
+                      Step=0.05):
+    """Curtain A (type 1) or Curtain B (type 2) of the windows numbered
+    'Windows', with the rows of 'Frames', as linked objects, see
+    link_objects. Windows of the same resolution and the same size,
+    rounded to 'Step', share a pool of up to 'Variants' meshes built
+    once for a window of that size, rng picks the variant of every
+    window by its number. Returns the objects."""
+    Keep = hung_frames(Frames)
+    Resol = np.broadcast_to(CurtainResol, (len(Frames),))[Keep]
+    Windows = np.asarray(Windows, dtype=np.int64)[Keep]
+    Frames = Frames[Keep]
+
+    #window axes: along the side, out of the wall, turned to keep them
+    #right handed, and up
+    Low = Frames['low'][:, 0]
+    Width = np.linalg.norm(Frames['side'], axis=1)
+    Normal = np.zeros((len(Frames), 3))
+    Normal[:, :2] = Frames['normal'][:, :2]
+    Length = np.linalg.norm(Normal, axis=1)
+    Hand = np.where(np.cross(Frames['side'], Normal)[:, 2]<0, -1, 1)
+    Matrices = np.zeros((len(Frames), 4, 4))
+    Matrices[:, :3, 0] = Frames['side']/np.maximum(Width, 1e-9)[:, None]
+    Matrices[:, :3, 1] = Normal*(Hand/np.maximum(Length, 1e-9))[:, None]
+    Matrices[:, 2, 2] = 1.0
+    Matrices[:, :3, 3] = np.stack([Low[:, 0], Frames['y_max'], Low[:, 2]],
+                                  axis=1)
+    Matrices[:, 3, 3] = 1.0
+
+    #windows by resolution, rounded size and hand
+    Keys = np.stack([Resol, np.round(Width/Step),
+                     np.round(Frames['size_z']/Step), Hand], axis=1)
+    Groups = OrderedDict()
+    for i, Key in enumerate(Keys.astype(np.int64).tolist()):
+        Groups.setdefault(tuple(Key), []).append(i)
+    Picks = rng.bits(Seed, rng.STREAM_CURTAIN_VARIANT, Windows)
+
+    Objects = []
+    for Key, Members in Groups.items():
+        Resolution, SizeX, SizeZ, Turn = Key
+        Count = min(Variants, len(Members))
+        Pick = (Picks[Members] % np.uint64(Count)).astype(np.int64)
+
+        #the variants, in a window at the origin facing +Y (or -Y)
+        Pool = np.zeros(Count, mesh_arrays.FRAME)
+        Pool['low'][:, 1, 0] = Pool['side'][:, 0] = SizeX*Step
+        Pool['normal'][:, 1] = Turn
+        Pool['size_z'] = SizeZ*Step
+        Index = (zlib.crc32(repr(Key).encode()) << 8)+np.arange(Count)
+        Steps, Jitter, Hung = curtain_draws(CurtainType, Index,
+                                            Pool['size_z'], Resolution, Seed)
+        Start, SizeHeight = curtain_origins(Pool, CurtainType)
+        Coords, Rows = mesh_arrays.curtain_rows(
+                CurtainType, Start, Pool['side'], Pool['normal'][:, :2],
+                SizeHeight, Steps, Jitter, Resolution)
+
+        #rows of every variant, one strip for Curtain A, two leaves for B
+        Leaves = 1 if CurtainType==1 else 2
+        Ends = np.cumsum(2*Rows)
+        for Variant in range(Count):
+            Strips = [i for i in range(Leaves*Variant, Leaves*Variant+Leaves)
+                      if Rows[i]>1 and Hung[Variant]]
+            if not Strips:
+                continue
+            VariantCoords = np.concatenate(
+                    [Coords[Ends[i]-2*Rows[i]:Ends[i]] for i in Strips])
+            Data = curtain_mesh("{}_{}_{}x{}.{}".format(
+                                        Name, Resolution, SizeX, SizeZ,
+                                        Variant),
+                                VariantCoords,
+                                mesh_arrays.strip_quads(Rows[Strips]),
+                                CurtainType==2, Material)
+            Objects.extend(link_objects(context, Data.name, Data,
+                                        Matrices[Members][Pick==Variant]))
+    return Objects
+
+
+def curtain_mesh(Name, Coords, Polys, Smooth, Material=None):
+    """Mesh of one curtain, faces turned the same way as the curtains
+    CreateWindow builds in place."""
+    BMesh = bmesh.new()
+    Faces = bulk_insert(BMesh, Coords, Polys)
+    bmesh.ops.recalc_face_normals(BMesh, faces=Faces)
+    for face in Faces:face.smooth = Smooth
+    Data = bpy.data.meshes.new(Name)
+    BMesh.to_mesh(Data)
+    BMesh.free()
+    if Material is not None:
+        Data.materials.append(Material)
+    return Data
+
+
+def mesh_from_arrays(Name, Coords, Polys, Smooth=False):
+    """New mesh datablock with 'Coords' and 'Polys' (rows of indices)."""
+    Data = bpy.data.meshes.new(Name)
+    Data.from_pydata(np.asarray(Coords).tolist(), [],
+                     np.asarray(Polys).tolist())
+    if Smooth:
+        Data.polygons.foreach_set('use_smooth', [True]*len(Data.polygons))
+    Data.update()
+    return Data
+
+
+def link_instances(context, Name, Coords, Polys, Matrices):
+    """Link one object per (4,4) matrix, all sharing a single mesh built
+    from 'Coords' and 'Polys', parented to the active object."""
+    return link_objects(context, Name, mesh_from_arrays(Name, Coords, Polys),
+                        Matrices)
+
+
+def link_objects(context, Name, Data, Matrices):
+    """Link one object per (4,4) matrix, all sharing the mesh 'Data',
+    parented to the active object."""
+    Parent = context.object
+    Objects = []
+    for i, Matrix in enumerate(np.asarray(Matrices).tolist()):
+        Obj = bpy.data.objects.new("{}.{:05d}".format(Name, i), Data)
+        context.scene.objects.link(Obj)
+        Obj.parent = Parent
+        Obj.matrix_basis = mathutils.Matrix(Matrix)
+        Objects.append(Obj)
+    return Objects
+
+
+def generated_object(context, Name):
+    """Object 'Name' holding what an operator generates, parented to the
+    active object and linked on the first run. Every run gives it a new
+    empty mesh, the old one is removed when nothing else uses it, so a
+    re-run replaces the generated geometry and leaves the source alone.
+    When 'Name' belongs to an object that is not a mesh, the mesh child
+    linked as 'Name.001' and so on by an earlier run is used."""
+    Obj = bpy.data.objects.get(Name)
+    if Obj is not None and Obj.type!='MESH':
+        Obj = next((o for o in bpy.data.objects
+                    if o.type=='MESH' and o.parent==context.object
+                    and o.name.rsplit('.', 1)[0]==Name), None)
+    Data = bpy.data.meshes.new(Name)
+    if Obj is None:
+        Obj = bpy.data.objects.new(Name, Data)
+        context.scene.objects.link(Obj)
+        Obj.parent = context.object
+        return Obj
+    Old = Obj.data
+    Obj.data = Data
+    if not Old.users:
+        bpy.data.meshes.remove(Old)
+    return Obj
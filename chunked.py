@@ -0,0 +1,141 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# chunked execution
+
+"""Operators written as a generator of steps, run in one go or in chunks.
+
+An operator mixing in ChunkedOperator implements steps(context, Size),
+a generator yielding the fraction of the job done after every chunk of
+'Size' items, or after every stage when 'Size' is None. Operators
+without a 'chunk' property only yield between stages.
+Nothing is written to the object before the last step, so closing the
+generator early drops its BMesh and leaves the object as it was.
+run_steps() runs every step at once, for execute(). invoke() with the
+operator's 'chunked' property set runs them from a timer, as many
+chunks per event as fit in BUDGET seconds, shows the progress and
+cancels on Esc. While they run only view navigation reaches the
+interface, and the job is cancelled if its object or mesh changes
+anyway. steps() takes its instrument stages from sequence(), which is
+closed however the steps end. Errors of the types in the operator's
+'reported' are shown to the user and cancel the job, others raise.
+"""
+
+import time
+from .instrument import Sequence
+
+#seconds of work per timer event, the rest is left to the interface
+BUDGET = 0.1
+
+#events passed on while the steps run, the rest could edit the object
+NAVIGATION = {'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'MIDDLEMOUSE',
+              'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'TRACKPADPAN', 'TRACKPADZOOM',
+              'NDOF_MOTION'}
+
+
+def _counts(Mesh):
+    return len(Mesh.vertices), len(Mesh.edges), len(Mesh.polygons)
+
+
+def chunks(Items, Size, Start=0.0, End=1.0):
+    """Slices of 'Size' items, all of them when 'Size' is None, each with
+    the fraction of the job done once it is processed, going from 'Start'
+    to 'End'."""
+    Count = len(Items)
+    Size = max(Size or Count, 1)
+    for i in range(0, Count, Size):
+        yield Items[i:i+Size], Start+(End-Start)*min(i+Size, Count)/Count
+
+
+class ChunkedOperator(object):
+    """Mix-in running steps() at once or from a modal timer."""
+
+    #exceptions reported and cancelled rather than raised
+    reported = ()
+
+    def sequence(self, prefix):
+        """instrument.Sequence for the stages of steps(), closed by the
+        operator when the steps end, are cancelled or raise."""
+        self._stages = Sequence(prefix)
+        return self._stages
+
+    def run_steps(self, context):
+        try:
+            for Done in self.steps(context, None):pass
+        except self.reported as Error:
+            self.report({'ERROR'}, str(Error))
+            return {"CANCELLED"}
+        finally:
+            self._close_stages()
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        if not self.chunked:
+            return self.execute(context)
+        self._object = context.object
+        self._mesh = context.object.data
+        self._counts = _counts(self._mesh)
+        self._steps = self.steps(context, getattr(self, 'chunk', None))
+        Manager = context.window_manager
+        self._timer = Manager.event_timer_add(0.01, context.window)
+        Manager.progress_begin(0, 100)
+        Manager.modal_handler_add(self)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if event.type=='ESC':
+            return self._cancel(context, "{} cancelled")
+        if event.type!='TIMER':
+            if event.type in NAVIGATION or event.type.startswith('TIMER'):
+                return {"PASS_THROUGH"}
+            return {"RUNNING_MODAL"}
+        if not self._unchanged(context):
+            return self._cancel(context, "{} cancelled, the object changed")
+        Start = time.perf_counter()
+        try:
+            Done = next(self._steps)
+            while time.perf_counter()-Start<BUDGET:
+                Done = next(self._steps)
+        except StopIteration:
+            self._finish(context)
+            return {"FINISHED"}
+        except self.reported as Error:
+            self._finish(context)
+            self.report({'ERROR'}, str(Error))
+            return {"CANCELLED"}
+        except Exception:
+            self._finish(context)
+            raise
+        context.window_manager.progress_update(int(100*Done))
+        if context.area:
+            context.area.header_text_set("{}: {:.0%}, Esc to cancel".format(
+                    self.bl_label, Done))
+        return {"RUNNING_MODAL"}
+
+    def _unchanged(self, context):
+        """The object of invoke() is still the active one, with the same
+        mesh and as many elements."""
+        try:
+            return (context.object==self._object
+                    and self._object.data==self._mesh
+                    and _counts(self._mesh)==self._counts)
+        except ReferenceError:
+            #removed from the file
+            return False
+
+    def _cancel(self, context, Message):
+        self._steps.close()
+        self._finish(context)
+        self.report({'INFO'}, Message.format(self.bl_label))
+        return {"CANCELLED"}
+
+    def _finish(self, context):
+        Manager = context.window_manager
+        Manager.event_timer_remove(self._timer)
+        Manager.progress_end()
+        if context.area:
+            context.area.header_text_set()
+        self._close_stages()
+
+    def _close_stages(self):
+        Stages = getattr(self, '_stages', None)
+        if Stages is not None:
+            Stages.close()
@@ -0,0 +1,194 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# stage instrumentation
+
+"""Opt-in timing of the operator stages.
+
+Nothing is recorded until enable() is called, or the BMESH_PROFILE
+environment variable names a JSON-lines file when Blender starts.
+While enabled, every stage records its wall time, how many times each
+bmesh.ops function ran, the element counts of its BMesh and the
+tracemalloc peak, prints one line to the console and appends one JSON
+object to the file.
+
+    with stage("CreateWindow.curtains", BMesh):
+        ...
+
+    @stage("curtains")
+    def curtains(...):
+
+    Stages = Sequence("RainDirt", BMesh)
+    Stages.next("subdivide")
+    ...
+    Stages.close()
+"""
+
+import bmesh, json, os, time, tracemalloc
+from collections import Counter
+from functools import wraps
+
+_PATH = os.environ.get("BMESH_PROFILE") or None
+_ENABLED = bool(_PATH)
+_DEPTH = 0
+_COUNTS = Counter()
+_OPS = None
+_TRACING = False
+_OPEN = []
+_RECORDS = None
+
+
+def enable(path=None, records=None):
+    """Start recording, appending JSON lines to 'path' if given.
+    'records', a list, collects the records instead of printing them."""
+    global _ENABLED, _PATH, _RECORDS
+    _ENABLED = True
+    _PATH = path
+    _RECORDS = records
+
+
+def disable():
+    global _ENABLED
+    _ENABLED = False
+
+
+def enabled():
+    return _ENABLED
+
+
+class _CountingOps(object):
+    """Stands in for bmesh.ops and counts the calls by name."""
+
+    def __init__(self, ops):
+        self._ops = ops
+
+    def __getattr__(self, name):
+        Func = getattr(self._ops, name)
+
+        @wraps(Func)
+        def counted(*args, **kwargs):
+            _COUNTS[name] += 1
+            return Func(*args, **kwargs)
+        return counted
+
+    def __dir__(self):
+        return dir(self._ops)
+
+
+def _begin():
+    """Swap bmesh.ops and start tracemalloc for the outermost stage."""
+    global _DEPTH, _OPS, _TRACING
+    if not _DEPTH:
+        _OPS = bmesh.ops
+        bmesh.ops = _CountingOps(_OPS)
+        _TRACING = not tracemalloc.is_tracing()
+        if _TRACING:
+            tracemalloc.start()
+    _DEPTH += 1
+
+
+def _end(Depth):
+    """Back to 'Depth' open stages, stages left open by an exception
+    inside this one are dropped."""
+    global _DEPTH, _OPS
+    _DEPTH = Depth
+    if not _DEPTH:
+        bmesh.ops = _OPS
+        _OPS = None
+        if _TRACING:
+            tracemalloc.stop()
+
+
+def _emit(Record):
+    if _RECORDS is not None:
+        _RECORDS.append(Record)
+    else:
+        Ops = " ".join("{}={}".format(k, v)
+                       for k, v in sorted(Record['ops'].items()))
+        print("[{}] {:.4f}s peak {:.1f} MiB {}".format(
+                Record['stage'], Record['seconds'], Record['peak']/2.0**20,
+                Ops))
+    if _PATH:
+        with open(_PATH, 'a') as f:
+            f.write(json.dumps(Record, sort_keys=True)+"\n")
+
+
+class stage(object):
+    """Context manager and decorator recording one named stage.
+
+    'BMesh', when given, adds its vert, edge and face counts at the end
+    of the stage. Extra counts can be set on the record while the stage
+    runs, e.g. 'with stage("x") as Record: Record["windows"] = n'.
+    Where tracemalloc.reset_peak exists (Python 3.9) each stage reports
+    its own peak, before that nested stages report the peak since the
+    outermost stage started. Operator methods open a 'with' block rather
+    than take the decorator, Blender counts the arguments of execute()
+    and the wrapper has none."""
+
+    def __init__(self, name, BMesh=None):
+        self.name = name
+        self.BMesh = BMesh
+        self.record = {}
+
+    def __enter__(self):
+        self.record = {'stage': self.name}
+        if not _ENABLED:
+            return self.record
+        self.depth = _DEPTH
+        _begin()
+        if hasattr(tracemalloc, 'reset_peak'):
+            #keep the peak of the open stages before resetting it
+            Peak = tracemalloc.get_traced_memory()[1]
+            for Open in _OPEN:Open.peak = max(Open.peak, Peak)
+            tracemalloc.reset_peak()
+        self.peak = 0
+        _OPEN.append(self)
+        self.counts = Counter(_COUNTS)
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc):
+        if 'start' not in self.__dict__:
+            return False
+        Record = self.record
+        Record['seconds'] = time.perf_counter()-self.start
+        Record['peak'] = max(self.peak, tracemalloc.get_traced_memory()[1])
+        Record['ops'] = dict(Counter(_COUNTS)-self.counts)
+        Record['time'] = time.time()
+        BMesh = self.BMesh
+        if BMesh is not None and BMesh.is_valid:
+            Record['verts'] = len(BMesh.verts)
+            Record['edges'] = len(BMesh.edges)
+            Record['faces'] = len(BMesh.faces)
+        del self.start
+        del _OPEN[self.depth:]
+        _end(self.depth)
+        _emit(Record)
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def staged(*args, **kwargs):
+            with stage(self.name, self.BMesh):
+                return func(*args, **kwargs)
+        return staged
+
+
+class Sequence(object):
+    """Back to back stages of one function, each next() closes the
+    previous stage, so long operators need no extra indentation."""
+
+    def __init__(self, prefix, BMesh=None):
+        self.prefix = prefix
+        self.BMesh = BMesh
+        self.current = None
+
+    def next(self, name):
+        self.close()
+        self.current = stage(self.prefix+"."+name, self.BMesh)
+        self.current.__enter__()
+        return self.current.record
+
+    def close(self):
+        if self.current is not None:
+            self.current.BMesh = self.BMesh
+            self.current.__exit__(None, None, None)
+            self.current = None
@@ -0,0 +1,349 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# array geometry
+
+"""NumPy builders for the generated geometry.
+
+Nothing here imports bpy or bmesh, the functions take and return plain
+arrays and bmesh_ops inserts the result into a BMesh.
+"""
+
+import numpy as np
+
+
+#one window, see window_frames
+FRAME = np.dtype([
+        ('quad', np.bool_),
+        ('lows', np.int8),
+        ('normal', np.float64, 3),
+        ('low', np.float64, (2, 3)),
+        ('side', np.float64, 3),
+        ('size_z', np.float64),
+        ('y_max', np.float64),
+        ('y_min', np.float64),
+        ])
+
+
+def window_frames(Corners):
+    """Frame of every quad in 'Corners', (N,4,3) in loop order.
+
+    'low' holds the first two corners at the lowest Z in loop order and
+    'lows' how many corners sit there, 'side' is low[1]-low[0]. 'y_max'
+    and 'y_min' are the Y of the two low corners ordered by the sign of
+    the side in Y, the way the operators pick the starting corner.
+    Normals and sides are rounded to float32 like mathutils vectors."""
+    Corners = np.asarray(Corners, dtype=np.float64).reshape(-1, 4, 3)
+    Frames = np.zeros(len(Corners), FRAME)
+    Frames['quad'] = True
+    if not len(Corners):
+        return Frames
+
+    #quad normal from the diagonals, as BM_face_calc_normal does
+    Normal = np.cross(Corners[:, 0]-Corners[:, 2], Corners[:, 1]-Corners[:, 3])
+    Length = np.sqrt((Normal*Normal).sum(axis=1))
+    Length[Length==0.0] = 1.0
+    Frames['normal'] = (Normal/Length[:, None]).astype(np.float32)
+
+    Z = Corners[:, :, 2]
+    MinZ = Z.min(axis=1)
+    Frames['size_z'] = Z.max(axis=1)-MinZ
+    IsLow = Z==MinZ[:, None]
+    Frames['lows'] = IsLow.sum(axis=1)
+
+    #low corners first, in loop order
+    Order = np.argsort(~IsLow, axis=1, kind='mergesort')[:, :2]
+    Low = Corners[np.arange(len(Corners))[:, None], Order]
+    Frames['low'] = Low
+    Side = (Low[:, 1]-Low[:, 0]).astype(np.float32)
+    Frames['side'] = Side
+
+    YA = np.minimum(Low[:, 0, 1], Low[:, 1, 1])
+    YB = np.maximum(Low[:, 0, 1], Low[:, 1, 1])
+    Ahead = np.round(Side[:, 1].astype(np.float64), 3) >= 0
+    Frames['y_max'] = np.where(Ahead, YA, YB)
+    Frames['y_min'] = np.where(Ahead, YB, YA)
+    return Frames
+
+
+def frame_centers(Frames):
+    """Middle of every window of 'Frames'."""
+    Centers = Frames['low'].mean(axis=1)
+    Centers[:, 2] += Frames['size_z']/2
+    return Centers
+
+
+def band_resolution(Points, Viewpoint, Resolution, Bands, Fewest=3):
+    """'Resolution' for every point of (N,3) 'Points', halved once for
+    every distance of 'Bands' the point lies beyond from 'Viewpoint',
+    never below 'Fewest' (or 'Resolution' when that is lower)."""
+    Points = np.asarray(Points, dtype=np.float64).reshape(-1, 3)
+    Distance = np.linalg.norm(Points-np.asarray(Viewpoint), axis=1)
+    Level = np.searchsorted(np.sort(Bands), Distance, side='right')
+    return np.maximum(Resolution >> Level, min(Fewest, Resolution))
+
+
+def strip_quads(RowCounts):
+    """Quads for strips of two-vertex rows stored back to back.
+
+    Row r of the whole buffer holds verts 2*r ('v1') and 2*r+1 ('v2').
+    Faces are wound (v2, v1, next v1, next v2), the way extrude_edge_only
+    winds a face on a wire edge."""
+    RowCounts = np.asarray(RowCounts, dtype=np.int64)
+    Quads = RowCounts-1
+    FirstRow = np.cumsum(RowCounts)-RowCounts
+    FirstQuad = np.cumsum(Quads)-Quads
+    Row = np.arange(Quads.sum())+np.repeat(FirstRow-FirstQuad, Quads)
+    V1 = 2*Row
+    return np.stack([V1+1, V1, V1+2, V1+3], axis=1)
+
+
+def _rows(RowCounts):
+    """Owner and local row number of every row of back to back strips."""
+    Owner = np.repeat(np.arange(len(RowCounts)), RowCounts)
+    Local = np.arange(RowCounts.sum())-np.repeat(np.cumsum(RowCounts)-RowCounts,
+                                                  RowCounts)
+    return Owner, Local
+
+
+def curtain_a(Origin, Side, Normal, SizeZ, Steps, Resolution, Thick=0.03):
+    """Rows of the folded Curtain A strips, one strip per window.
+
+    'Origin' is the top corner the strip hangs from, 'Side' the window
+    width vector, 'Normal' the XY of the window normal and 'Steps' the
+    number of quads (a multiple of four: down, back, down, forward).
+    'Resolution' is one number or one per strip.
+    Returns the (2*Rows,3) coordinates and the row count of every strip."""
+    Origin = np.asarray(Origin, dtype=np.float64).reshape(-1, 3)
+    Side = np.asarray(Side, dtype=np.float64).reshape(-1, 3)
+    Normal = np.asarray(Normal, dtype=np.float64).reshape(-1, 2)
+    LocalZ = -np.asarray(SizeZ, dtype=np.float64)/np.asarray(Resolution)
+    RowCounts = np.asarray(Steps, dtype=np.int64)+1
+    Owner, Local = _rows(RowCounts)
+
+    Offset = np.zeros((len(Owner), 3))
+    Offset[:, 2] = LocalZ[Owner]*((Local+1)//2)
+    Back = Local%4 >= 2
+    Offset[Back, :2] = -Normal[Owner[Back]]*Thick
+
+    Coords = np.empty((len(Owner), 2, 3))
+    Coords[:, 1] = Origin[Owner]+Offset
+    Coords[:, 0] = Coords[:, 1]+Side[Owner]
+    return Coords.reshape(-1, 3), RowCounts
+
+
+def curtain_b(Origin, Side, Normal, Height, Columns, Jitter, Resolution):
+    """Rows of the Curtain B leaves, two leaves per window.
+
+    Leaf L starts at 'Origin' and walks along 'Side', leaf R starts at
+    'Origin'+'Side' and walks back, each one 'Columns' steps of
+    Side/Resolution, 'Resolution' being one number or one per window.
+    Rows are vertical edges (top, bottom) 'Height' tall.
+    'Jitter' holds the random normal factors of every extruded column
+    in leaf order, shape (Columns.sum(), 2 verts, 2 axes).
+    Returns the (2*Rows,3) coordinates and the row count of every leaf."""
+    Origin = np.asarray(Origin, dtype=np.float64).reshape(-1, 3)
+    Side = np.asarray(Side, dtype=np.float64).reshape(-1, 3)
+    Normal = np.asarray(Normal, dtype=np.float64).reshape(-1, 2)
+    Height = np.asarray(Height, dtype=np.float64)
+
+    #leaf L then leaf R for every window
+    Base = np.repeat(Origin, 2, axis=0)
+    Base[1::2] += Side
+    Base[:, :2] -= np.repeat(Normal, 2, axis=0)*0.115
+    Step = np.repeat(Side/np.reshape(Resolution, (-1, 1)), 2, axis=0)
+    Step[1::2] *= -1
+    Step[:, 2] = 0.0
+    LeafNormal = np.repeat(Normal, 2, axis=0)
+    LeafHeight = np.repeat(Height, 2)
+
+    RowCounts = np.asarray(Columns, dtype=np.int64).reshape(-1)+1
+    Owner, Local = _rows(RowCounts)
+
+    Coords = np.empty((len(Owner), 2, 3))
+    Coords[:, 1] = Base[Owner]+Local[:, None]*Step[Owner]
+    Coords[:, 0] = Coords[:, 1]
+    Coords[:, 0, 2] += LeafHeight[Owner]
+
+    Extruded = Local > 0
+    Jitter = np.asarray(Jitter, dtype=np.float64).reshape(-1, 2, 2)
+    Coords[Extruded, :, :2] += LeafNormal[Owner[Extruded], None, :]*Jitter
+    return Coords.reshape(-1, 3), RowCounts
+
+
+def curtain_rows(CurtainType, Origin, Side, Normal, Height, Steps, Jitter,
+                 Resolution):
+    """Rows of Curtain A (type 1) or Curtain B (type 2) for all windows,
+    'Resolution' one for all of them or one per window."""
+    Origin = np.asarray(Origin, dtype=np.float64).reshape(-1, 3)
+    Resolution = np.broadcast_to(Resolution, (len(Origin),))
+    if CurtainType==1:
+        return curtain_a(Origin, Side, Normal, Height, Steps, Resolution)
+    return curtain_b(Origin, Side, Normal, Height, Steps, Jitter, Resolution)
+
+
+def quat_matrices(Quats):
+    """(N,4,4) rotation matrices of (N,4) w, x, y, z quaternions."""
+    W, X, Y, Z = np.asarray(Quats, dtype=np.float64).reshape(-1, 4).T
+    Matrices = np.zeros((len(W), 4, 4))
+    Matrices[:, 0, 0] = 1-2*(Y*Y+Z*Z)
+    Matrices[:, 0, 1] = 2*(X*Y-W*Z)
+    Matrices[:, 0, 2] = 2*(X*Z+W*Y)
+    Matrices[:, 1, 0] = 2*(X*Y+W*Z)
+    Matrices[:, 1, 1] = 1-2*(X*X+Z*Z)
+    Matrices[:, 1, 2] = 2*(Y*Z-W*X)
+    Matrices[:, 2, 0] = 2*(X*Z-W*Y)
+    Matrices[:, 2, 1] = 2*(Y*Z+W*X)
+    Matrices[:, 2, 2] = 1-2*(X*X+Y*Y)
+    Matrices[:, 3, 3] = 1.0
+    return Matrices
+
+
+def track_matrices(Normals):
+    """Rotations of Vector.to_track_quat('-Z', 'Y') for every normal.
+
+    Vectorized vec_to_quat() from Blender's BLI_math_rotation.c for the
+    -Z track and Y up axes. Returns an (N,4,4) stack."""
+    #to_track_quat flips the vector, the negative track axis keeps it
+    Track = -np.asarray(Normals, dtype=np.float64).reshape(-1, 3)
+    Length = np.sqrt((Track*Track).sum(axis=1))
+    Valid = Length > 0.0
+    Length[~Valid] = 1.0
+
+    #rotate -Z onto the normal
+    Axis = np.zeros_like(Track)
+    Axis[:, 0] = -Track[:, 1]
+    Axis[:, 1] = Track[:, 0]
+    Axis[np.abs(Track[:, 0])+np.abs(Track[:, 1]) < 1e-4, 0] = 1.0
+    Axis /= np.sqrt((Axis*Axis).sum(axis=1))[:, None]
+    Half = np.arccos(np.clip(Track[:, 2]/Length, -1.0, 1.0))/2
+    W = np.cos(Half)
+    X, Y, Z = (Axis*np.sin(Half)[:, None]).T
+
+    #twist around the normal so local Y points up
+    Twist = -0.5*np.arctan2(-2*(X*Z+W*Y), -2*(Y*Z-W*X))
+    Co = np.cos(Twist)
+    Si = np.sin(Twist)/Length
+    W2, X2, Y2, Z2 = Co, Track[:, 0]*Si, Track[:, 1]*Si, Track[:, 2]*Si
+    Quats = np.stack([W2*W-X2*X-Y2*Y-Z2*Z,
+                      W2*X+X2*W+Y2*Z-Z2*Y,
+                      W2*Y+Y2*W+Z2*X-X2*Z,
+                      W2*Z+Z2*W+X2*Y-Y2*X], axis=1)
+    Quats[~Valid] = (1.0, 0.0, 0.0, 0.0)
+    return quat_matrices(Quats)
+
+
+def translation_matrices(Points):
+    """(N,4,4) translation matrices for (N,3) points."""
+    Points = np.asarray(Points, dtype=np.float64).reshape(-1, 3)
+    Matrices = np.tile(np.eye(4), (len(Points), 1, 1))
+    Matrices[:, :3, 3] = Points
+    return Matrices
+
+
+def transform_points(Matrices, Coords):
+    """Apply every (4,4) matrix of the stack to 'Coords', (N,V,3) result."""
+    Matrices = np.asarray(Matrices, dtype=np.float64)
+    Coords = np.asarray(Coords, dtype=np.float64)
+    return (np.einsum('nij,vj->nvi', Matrices[:, :3, :3], Coords)
+            +Matrices[:, None, :3, 3])
+
+
+def cone(Segments, Radius1, Radius2, Depth):
+    """Side wall of bmesh.ops.create_cone without caps, as arrays.
+
+    Same vert and face order as create_cone in Blender 2.79, where the
+    'diameter' arguments act as radii and 'Depth' is the full height."""
+    Phi = np.arange(Segments)*(2*np.pi/Segments)
+    Coords = np.empty((Segments, 2, 3))
+    Coords[:, 0, 0] = -Radius1*np.sin(Phi)
+    Coords[:, 0, 1] = Radius1*np.cos(Phi)
+    Coords[:, 0, 2] = -Depth/2
+    Coords[:, 1, 0] = -Radius2*np.sin(Phi)
+    Coords[:, 1, 1] = Radius2*np.cos(Phi)
+    Coords[:, 1, 2] = Depth/2
+    A = np.arange(1, Segments+1)%Segments
+    Last = np.arange(Segments)
+    Polys = np.stack([2*A, 2*A+1, 2*Last+1, 2*Last], axis=1)
+    return Coords.reshape(-1, 3), Polys
+
+
+def pot_section(Profile, Thickness):
+    """Closed (R, Z) cross-section of a lathed open 'Profile', (P,2) from
+    the top down, thickened by 'Thickness' towards the inside the way
+    Solidify with even offset does it: every inner point sits on the
+    bisector of its two segment normals, so each wall keeps its
+    thickness. Returns the section, outside down then inside up, and
+    the mask of the rim corners, the ends of both walls."""
+    Profile = np.asarray(Profile, dtype=np.float64).reshape(-1, 2)
+    Tangent = np.diff(Profile, axis=0)
+    Normal = np.stack([-Tangent[:, 1], Tangent[:, 0]], axis=1)
+    Normal /= np.linalg.norm(Normal, axis=1)[:, None]
+    #end points take their only segment, inner points the bisector
+    Before = np.concatenate([Normal[:1], Normal])
+    After = np.concatenate([Normal, Normal[-1:]])
+    Bisector = Before+After
+    Bisector /= np.linalg.norm(Bisector, axis=1)[:, None]
+    Cos = np.einsum('ij,ij->i', Bisector, After)
+    Inner = Profile-Bisector*(Thickness/np.maximum(Cos, 1e-3))[:, None]
+    Section = np.concatenate([Profile, Inner[::-1]])
+    Corners = np.zeros(len(Section), dtype=bool)
+    Corners[[0, len(Profile)-1, len(Profile), -1]] = True
+    return Section, Corners
+
+
+def subdivide_section(Section, Corners, Levels):
+    """Catmull-Clark curve rules on the closed 'Section', 'Levels' times.
+
+    New points sit at edge midpoints, old points move to
+    (prev+6*point+next)/8 unless they are 'Corners', which stay put like
+    verts between two creased edges."""
+    for i in range(Levels):
+        Prev = np.roll(Section, 1, axis=0)
+        Next = np.roll(Section, -1, axis=0)
+        Points = np.where(Corners[:, None], Section, (Prev+6*Section+Next)/8)
+        Middle = (Section+Next)/2
+        Section = np.stack([Points, Middle], axis=1).reshape(-1, 2)
+        Corners = np.stack([Corners, np.zeros_like(Corners)],
+                           axis=1).reshape(-1)
+    return Section, Corners
+
+
+def section_levels(Section, Tolerance, Most=4):
+    """Fewest subdivision levels leaving 'Section' within 'Tolerance' of
+    its limit curve, each level cuts the distance by about four."""
+    Bend = (np.roll(Section, 1, axis=0)-2*Section
+            +np.roll(Section, -1, axis=0))
+    Error = np.linalg.norm(Bend, axis=1).max()/8
+    Levels = 0
+    while Error>Tolerance and Levels<Most:
+        Error /= 4
+        Levels += 1
+    return Levels
+
+
+def ring_segments(Radius, Tolerance, Fewest=3, Most=256):
+    """Segments keeping a circle of 'Radius' within 'Tolerance' of its
+    polygon."""
+    if Tolerance>=Radius:
+        return Fewest
+    Segments = int(np.ceil(np.pi/np.arccos(1-Tolerance/Radius)))
+    return min(max(Segments, Fewest), Most)
+
+
+def revolve(Section, Segments):
+    """Closed (R, Z) 'Section' turned around Z in 'Segments' steps, like
+    Screw at 360 degrees. Returns the coordinates and the quads, facing
+    out when the section runs clockwise, down the outside."""
+    Section = np.asarray(Section, dtype=np.float64).reshape(-1, 2)
+    Count = len(Section)
+    Phi = np.arange(Segments)*(2*np.pi/Segments)
+    Coords = np.empty((Segments, Count, 3))
+    Coords[:, :, 0] = np.cos(Phi)[:, None]*Section[:, 0]
+    Coords[:, :, 1] = np.sin(Phi)[:, None]*Section[:, 0]
+    Coords[:, :, 2] = Section[:, 1]
+    Step = np.arange(Segments)[:, None]
+    Point = np.arange(Count)[None, :]
+    Here = Step*Count+Point
+    Up = Step*Count+(Point+1)%Count
+    Turn = ((Step+1)%Segments)*Count
+    Polys = np.stack([Here, Up, Turn+(Point+1)%Count, Turn+Point], axis=2)
+    return Coords.reshape(-1, 3), Polys.reshape(-1, 4)
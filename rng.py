@@ -0,0 +1,72 @@
+# GPL # (c) 2024 Diogenes Grigonio
+# random streams
+
+"""Stateless random numbers for the operators.
+
+Every value is a SplitMix64 hash of (seed, stream, index[, sub]), so a
+whole array comes from one call, the same element always gets the same
+value whatever else is drawn, and the global 'random' state that other
+add-ons share is left alone. Each kind of draw has its own stream.
+
+    Heights = rng.uniform(Seed, rng.STREAM_DROP_HEIGHT, EdgeIndices)
+"""
+
+import numpy as np
+
+STREAM_SAMPLE = 1
+STREAM_DROP_HEIGHT = 2
+STREAM_DROP_OFFSET = 3
+STREAM_CURTAIN_A = 4
+STREAM_CURTAIN_B = 5
+STREAM_CURTAIN_B_JITTER = 6
+STREAM_POT_JITTER = 7
+STREAM_CURTAIN_VARIANT = 8
+STREAM_LIGHT = 9
+STREAM_CURTAIN_SPLIT = 10
+
+_MASK = (1 << 64)-1
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(X):
+    """SplitMix64 finalizer of the uint64 array 'X'."""
+    with np.errstate(over='ignore'):
+        X = (X ^ (X >> np.uint64(30)))*np.uint64(0xBF58476D1CE4E5B9)
+        X = (X ^ (X >> np.uint64(27)))*np.uint64(0x94D049BB133111EB)
+        return X ^ (X >> np.uint64(31))
+
+
+def _counter(Values):
+    Values = np.asarray(Values, dtype=np.int64)
+    return Values.astype(np.uint64)+np.uint64(1)
+
+
+def bits(Seed, Stream, Index, Sub=None):
+    """64 random bits for every 'Index', and 'Sub' when given, both int
+    arrays of the same shape or scalars."""
+    Key = np.array([(Seed & _MASK), Stream], dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        Key = _mix(_mix(Key[0]+_GAMMA)+_GAMMA*Key[1])
+        X = _mix(Key+_GAMMA*_counter(Index))
+        if Sub is not None:
+            X = _mix(X+_GAMMA*_counter(Sub))
+    return X
+
+
+def uniform(Seed, Stream, Index, Low=0.0, High=1.0, Sub=None):
+    """Floats in [Low, High), Low+(High-Low)*u like random.uniform."""
+    U = (bits(Seed, Stream, Index, Sub) >> np.uint64(11))*(1.0/(1 << 53))
+    return Low+(High-Low)*U
+
+
+def sample_mask(Count, Remove, Seed, Stream=STREAM_SAMPLE):
+    """Bool mask with 'Remove' of 'Count' items set, the items with the
+    'Remove' smallest keys, found in O(n). Keys of distinct counters never
+    tie, so the set does not depend on the partition order."""
+    Mask = np.zeros(Count, dtype=bool)
+    if Remove>=Count:
+        Mask[:] = True
+    elif Remove>0:
+        Keys = bits(Seed, Stream, np.arange(Count))
+        Mask[np.argpartition(Keys, Remove)[:Remove]] = True
+    return Mask